@@ -1,21 +1,94 @@
+from typing import Optional
 from flask import Flask
 import utils.db as db
 from settings import settings
-from controllers import main_bp, data_bp, analysis_bp, map_bp, population_bp
+from controllers import main_bp, data_bp, analysis_bp, map_bp, population_bp, health_bp
 from utils.migrations import MigrationManager
+from utils import compression, encoding, instrumentation
+from services.analysis_service import AnalysisService
+from services.cache_service import CacheService
 
-app = Flask(__name__)
-app.config.update(settings.flask_config)
-# db.clear_database()
-db.init_from_env()
-MigrationManager.run_all_migrations()
+# Этапы жизненного цикла приложения, управляемые через config
+DEFAULT_CONFIG = {
+    'DB_BIND': True,              # Привязать Pony ORM к БД
+    'DB_CONFIG': None,            # Параметры подключения (по умолчанию settings.db_config)
+    'DB_CREATE_DATABASE': True,   # Создать БД в PostgreSQL, если её нет
+    'DB_RUN_DDL': True,           # Создавать таблицы и выполнять миграции
+    'WARM_CACHES': False,         # Прогреть кэши справочников при старте
+}
 
-app.register_blueprint(main_bp)
-app.register_blueprint(data_bp)
-app.register_blueprint(analysis_bp)
-app.register_blueprint(map_bp)
-app.register_blueprint(population_bp)
+
+def create_app(config: Optional[dict] = None) -> Flask:
+    """
+    Создать Flask-приложение
+
+    Импорт модуля не трогает БД: подключение, DDL и прогрев кэшей выполняются
+    здесь и управляются ключами DEFAULT_CONFIG. Pre-fork сервер может вызвать
+    create_app один раз в мастер-процессе, и воркеры получат прогретое
+    состояние через copy-on-write.
+
+    Args:
+        config: Переопределения конфигурации Flask и этапов инициализации
+    """
+    app = Flask(__name__)
+    app.config.update(settings.flask_config)
+    app.config.update(DEFAULT_CONFIG)
+    if config:
+        app.config.update(config)
+
+    app.register_blueprint(main_bp)
+    app.register_blueprint(data_bp)
+    app.register_blueprint(analysis_bp)
+    app.register_blueprint(map_bp)
+    app.register_blueprint(population_bp)
+    app.register_blueprint(health_bp)
+
+    encoding.init_app(app)
+    instrumentation.init_app(app)
+    # Зарегистрировано последним, выполняется первым: Server-Timing включает сжатие
+    compression.init_app(app)
+
+    if settings.preload_analysis_stack:
+        @app.before_request
+        def preload_analysis_stack():
+            """Прогреть ML-стек в фоне после первого принятого запроса и снять хук"""
+            # Новый список вместо remove: preprocess_request может сейчас обходить старый
+            app.before_request_funcs[None] = [
+                func for func in app.before_request_funcs[None] if func is not preload_analysis_stack
+            ]
+            AnalysisService.preload_in_background()
+
+    if app.config['DB_BIND']:
+        bind_database(app)
+
+    if app.config['WARM_CACHES']:
+        warm_caches(app)
+
+    return app
+
+
+def bind_database(app: Flask) -> None:
+    """
+    Привязать ORM к БД; DDL и миграции только при DB_RUN_DDL
+
+    Миграции выполняются до построения маппинга: Pony сверяет колонки
+    таблиц с сущностями и не должна видеть устаревшую схему.
+    """
+    run_ddl = app.config['DB_RUN_DDL']
+    config = app.config['DB_CONFIG']
+    # db.clear_database()
+    db.init_from_env(
+        create_tables=run_ddl,
+        config=config,
+        create_database=app.config['DB_CREATE_DATABASE'] and run_ddl,
+        migrations=(lambda: MigrationManager.run_all_migrations(config)) if run_ddl else None
+    )
+
+
+def warm_caches(app: Flask) -> None:
+    """Прогреть кэши справочников"""
+    CacheService.warm()
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
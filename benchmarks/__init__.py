@@ -0,0 +1,4 @@
+"""
+Бенчмарки горячих путей: загрузка Excel, расчёт уровня преступности,
+подготовка данных для анализа и JSON эндпоинты
+"""
@@ -0,0 +1,245 @@
+"""
+Нагрузочный тест: имитация трафика дашборда на локальном экземпляре
+
+    # поднять экземпляр на SQLite с синтетическими данными и нагрузить его
+    python -m benchmarks.loadtest --serve-sqlite --viewers 20 --duration 60
+
+    # нагрузить уже запущенный экземпляр (например, gunicorn + локальный PostgreSQL)
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --viewers 50
+
+Каждый зритель в цикле опрашивает карту, переключает годы на странице
+документов и иногда редактирует население; отдельный поток периодически
+загружает FULL файл. В конце печатаются p50/p95/p99 и пропускная
+способность по каждому маршруту.
+"""
+
+import argparse
+import http.client
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+os.environ.setdefault('DB_USER', 'bench')
+os.environ.setdefault('DB_PASSWORD', 'bench')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from benchmarks.workbook_generator import generate_full_workbook  # noqa: E402
+
+# Доли действий зрителя
+TRAFFIC_MIX = (
+    ('crime_data', 0.5),
+    ('year_data', 0.4),
+    ('population_save', 0.1),
+)
+
+
+class Stats:
+    """Латентности и ошибки по маршрутам"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, elapsed: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies.setdefault(route, []).append(elapsed)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+    def report(self, duration: float) -> str:
+        lines = [
+            f"{'маршрут':<34}{'запросов':>10}{'ошибок':>8}{'rps':>9}"
+            f"{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}"
+        ]
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            lines.append(
+                f'{route:<34}{len(values):>10}{self.errors.get(route, 0):>8}'
+                f'{len(values) / duration:>9.1f}'
+                f'{percentile(values, 50) * 1000:>10.1f}'
+                f'{percentile(values, 95) * 1000:>10.1f}'
+                f'{percentile(values, 99) * 1000:>10.1f}'
+            )
+        return '\n'.join(lines)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Client:
+    """Минимальный HTTP клиент без следования редиректам"""
+
+    def __init__(self, base_url: str, stats: Stats, timeout: float = 30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.stats = stats
+        self.timeout = timeout
+
+    def request(self, route: str, method: str, path: str,
+                body: Optional[bytes] = None, headers: Optional[dict] = None) -> Tuple[int, bytes]:
+        started = time.perf_counter()
+        status, data = 0, b''
+        try:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            status, data = response.status, response.read()
+            connection.close()
+        except OSError:
+            pass
+        self.stats.record(route, time.perf_counter() - started, 200 <= status < 400)
+        return status, data
+
+    def get(self, route: str, path: str) -> Tuple[int, bytes]:
+        return self.request(route, 'GET', path)
+
+    def post_json(self, route: str, path: str, payload: str) -> Tuple[int, bytes]:
+        return self.request(route, 'POST', path, payload.encode('utf-8'), {'Content-Type': 'application/json'})
+
+    def post_file(self, route: str, path: str, filename: str, content: bytes) -> Tuple[int, bytes]:
+        boundary = uuid.uuid4().hex
+        body = (
+            f'--{boundary}\r\n'
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            'Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n'
+        ).encode('utf-8') + content + f'\r\n--{boundary}--\r\n'.encode('utf-8')
+        return self.request(route, 'POST', path, body, {'Content-Type': f'multipart/form-data; boundary={boundary}'})
+
+
+def discover(client: Client) -> dict:
+    """Получить годы и id районов/лет из страницы населения"""
+    _, html = client.get('discover', '/population')
+    html = html.decode('utf-8', errors='replace')
+    cells = re.findall(r'data-district-id="(\d+)"\s+data-year-id="(\d+)"', html)
+    years = sorted(set(int(y) for y in re.findall(r'data-year-value="(\d+)"', html)))
+    return {'cells': cells, 'years': years}
+
+
+def viewer(client: Client, targets: dict, stop: threading.Event, think_time: float) -> None:
+    routes, weights = zip(*TRAFFIC_MIX)
+    while not stop.is_set():
+        action = random.choices(routes, weights)[0]
+        if action == 'crime_data':
+            client.get('GET /api/crime-data', '/api/crime-data')
+        elif action == 'year_data' and targets['years']:
+            client.get('GET /api/year-data/<year>', f"/api/year-data/{random.choice(targets['years'])}")
+        elif action == 'population_save' and targets['cells']:
+            district_id, year_id = random.choice(targets['cells'])
+            value = random.randint(10000, 200000)
+            client.post_json(
+                'POST /api/population/save', '/api/population/save',
+                f'{{"district_id": {district_id}, "year_id": {year_id}, "value": {value}}}'
+            )
+        if think_time:
+            stop.wait(random.uniform(0, think_time * 2))
+
+
+def uploader(client: Client, workbook_params: Tuple[int, int, int], stop: threading.Event, interval: float) -> None:
+    # Каждый раз новый файл: одинаковое содержимое отсекается по хешу без разбора
+    seed = 1
+    with tempfile.TemporaryDirectory() as tmp:
+        while not stop.wait(interval):
+            path = generate_full_workbook(os.path.join(tmp, f'upload_{seed}.xlsx'), *workbook_params, seed=seed)
+            with open(path, 'rb') as f:
+                client.post_file('POST /upload', '/upload', f'loadtest_{seed}.xlsx', f.read())
+            seed += 1
+
+
+def serve_sqlite(years: int, districts: int, features: int) -> Tuple[str, object]:
+    """Поднять экземпляр приложения на SQLite с синтетическими данными"""
+    from pony.orm import db_session, select
+    from werkzeug.serving import make_server
+    from app import create_app
+    from settings import settings
+    from utils.db import init_database
+    from models.entities import District, Year, Population
+    from services.data_service import DataService
+    from services.crime_calculation_service import CrimeCalculationService
+
+    workdir = tempfile.mkdtemp(prefix='crime-loadtest-')
+    settings.upload_folder = workdir
+    init_database(provider='sqlite', database=os.path.join(workdir, 'loadtest.sqlite'), create_tables=True)
+
+    workbook = generate_full_workbook(os.path.join(workdir, 'seed.xlsx'), years, districts, features)
+    DataService.load_full_data(workbook)
+    with db_session:
+        for district in select(d for d in District):
+            for year in select(y for y in Year):
+                Population(district=district, year=year, value=100000)
+    CrimeCalculationService.calculate_all_years()
+
+    app = create_app({'DB_BIND': False, 'WARM_CACHES': True})
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Нагрузочный тест дашборда')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--serve-sqlite', action='store_true', help='Поднять локальный экземпляр на SQLite')
+    parser.add_argument('--viewers', type=int, default=10, help='Одновременных зрителей')
+    parser.add_argument('--duration', type=float, default=30, help='Длительность, сек')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Средняя пауза зрителя между запросами, сек')
+    parser.add_argument('--upload-interval', type=float, default=10, help='Период загрузки файла, сек (0 — без загрузок)')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--districts', type=int, default=7)
+    parser.add_argument('--features', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if args.serve_sqlite:
+        url, server = serve_sqlite(args.years, args.districts, args.features)
+        print(f'✓ Локальный экземпляр на SQLite: {url}')
+
+    stats = Stats()
+    client = Client(url, stats)
+    targets = discover(client)
+    if not targets['years']:
+        print('Нет данных: загрузите файл или используйте --serve-sqlite')
+        return 1
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=viewer, args=(client, targets, stop, args.think_time), daemon=True)
+        for _ in range(args.viewers)
+    ]
+    if args.upload_interval > 0:
+        threads.append(threading.Thread(target=uploader, args=(client, (args.years, args.districts, args.features), stop, args.upload_interval), daemon=True))
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    stats.latencies.pop('discover', None)
+    print(f'\nзрителей={args.viewers} длительность={elapsed:.1f} с')
+    print(stats.report(elapsed))
+
+    if server is not None:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Запуск бенчмарков на синтетических данных
+
+    python -m benchmarks.run --years 5 --districts 7 --features 100
+    python -m benchmarks.run --save baseline       # сохранить в benchmarks/baselines/baseline.json
+    python -m benchmarks.run --compare baseline    # сравнить с сохранённым результатом
+
+Все замеры выполняются на встроенной SQLite БД, результаты — медиана
+и минимум по повторам в секундах.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+os.environ.setdefault('DB_USER', 'bench')
+os.environ.setdefault('DB_PASSWORD', 'bench')
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from pony.orm import db_session, select  # noqa: E402
+from benchmarks.workbook_generator import generate_full_workbook, generate_financial_workbook  # noqa: E402
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BenchmarkRunner:
+    """Выполняет сценарий загрузка → расчёт → анализ → API и собирает времена"""
+
+    def __init__(self, years: int, districts: int, features: int, indicators: int,
+                 database: str = ':memory:', skip_analysis: bool = False):
+        self.years = years
+        self.districts = districts
+        self.features = features
+        self.indicators = indicators
+        self.database = database
+        self.skip_analysis = skip_analysis
+        self.timings: Dict[str, List[float]] = {}
+        self.workdir = tempfile.mkdtemp(prefix='crime-bench-')
+        self.full_path = os.path.join(self.workdir, 'full.xlsx')
+        self.financial_path = os.path.join(self.workdir, 'financial.xlsx')
+        self.app = None
+
+    def setup(self) -> None:
+        """Сгенерировать файлы и подключить БД"""
+        from utils.db import init_database
+        from app import create_app
+
+        generate_full_workbook(self.full_path, self.years, self.districts, self.features)
+        generate_financial_workbook(self.financial_path, self.years, self.indicators)
+
+        init_database(provider='sqlite', database=self.database, create_tables=True)
+        self.app = create_app({'DB_BIND': False, 'TESTING': True})
+
+    @contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        yield
+        self.timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    def run_once(self) -> None:
+        """Один полный проход сценария на пустой БД"""
+        from models.entities import db
+        from services.cache_service import CacheService
+        from services.data_service import DataService
+        from services.crime_calculation_service import CrimeCalculationService
+        from services.crime_line_analysis_service import CrimeLineAnalysisService
+        from services.analysis_service import AnalysisService
+
+        db.drop_all_tables(with_all_data=True)
+        db.create_tables()
+        CacheService.invalidate()
+
+        with self.measure('load_full_data'):
+            DataService.load_full_data(self.full_path)
+
+        with self.measure('load_financial_expenses'):
+            expenses = DataService.parse_financial_expenses_from_excel(self.financial_path)
+            DataService.load_financial_expenses(expenses)
+
+        self._seed_population()
+
+        with self.measure('calculate_all_years'):
+            CrimeCalculationService.calculate_all_years()
+
+        crime_type_id = self._first_crime_type_id()
+
+        with self.measure('prepare_analysis_data'):
+            CrimeLineAnalysisService.prepare_analysis_data(crime_type_id)
+
+        if not self.skip_analysis:
+            # Графики пишутся в static/plots относительно рабочей директории
+            cwd = os.getcwd()
+            os.chdir(self.workdir)
+            try:
+                with self.measure('run_analysis_from_db'):
+                    AnalysisService.run_analysis_from_db(crime_type_id)
+            finally:
+                os.chdir(cwd)
+
+        first_year = self._first_year()
+        endpoints = {
+            'api_crime_data': '/api/crime-data',
+            'api_year_data': f'/api/year-data/{first_year}',
+            'documents_financial': '/documents?data_type=financial',
+            'population_page': '/population',
+        }
+        client = self.app.test_client()
+        for name, url in endpoints.items():
+            CacheService.invalidate()
+            with self.measure(name):
+                response = client.get(url)
+            assert response.status_code == 200, f'{url}: {response.status_code}'
+
+    @db_session
+    def _seed_population(self) -> None:
+        from models.entities import District, Year, Population
+        for district in select(d for d in District if d.name != 'ПМР'):
+            for year in select(y for y in Year):
+                Population(district=district, year=year, value=50000 + district.id * 1000)
+
+    @db_session
+    def _first_crime_type_id(self) -> int:
+        from models.entities import CrimeType
+        return select(ct.id for ct in CrimeType).order_by(1).first()
+
+    @db_session
+    def _first_year(self) -> int:
+        from models.entities import Year
+        return select(y.year for y in Year).order_by(1).first()
+
+    def run(self, repeat: int, command: str = '') -> dict:
+        """Выполнить сценарий repeat раз; command — команда запуска для baseline"""
+        self.setup()
+        for _ in range(repeat):
+            self.run_once()
+
+        return {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'command': command,
+            'python': platform.python_version(),
+            'params': {
+                'years': self.years,
+                'districts': self.districts,
+                'features': self.features,
+                'indicators': self.indicators,
+                'repeat': repeat
+            },
+            'results': {
+                name: {
+                    'median': statistics.median(values),
+                    'min': min(values),
+                    'max': max(values)
+                }
+                for name, values in self.timings.items()
+            }
+        }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINES_DIR, f'{name}.json')
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """Сравнить медианы; вернуть список регрессий (медленнее более чем на threshold)"""
+    regressions = []
+    print(f"\nСравнение с {baseline.get('commit') or 'baseline'} ({baseline.get('created_at')})")
+    print(f"{'бенчмарк':<28}{'было, с':>12}{'стало, с':>12}{'×':>8}")
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            print(f'{name:<28}{"—":>12}{result["median"]:>12.4f}')
+            continue
+        ratio = result['median'] / old['median'] if old['median'] else float('inf')
+        mark = ''
+        if ratio > 1 + threshold:
+            mark = '  ← регрессия'
+            regressions.append(name)
+        print(f'{name:<28}{old["median"]:>12.4f}{result["median"]:>12.4f}{ratio:>8.2f}{mark}')
+    return regressions
+
+
+def print_results(result: dict) -> None:
+    params = result['params']
+    print(f"\nгоды={params['years']} районы={params['districts']} "
+          f"признаки={params['features']} показатели={params['indicators']} повторов={params['repeat']}")
+    print(f"{'бенчмарк':<28}{'медиана, с':>12}{'мин, с':>12}")
+    for name, values in result['results'].items():
+        print(f"{name:<28}{values['median']:>12.4f}{values['min']:>12.4f}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Бенчмарки загрузки, расчёта и API')
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--districts', type=int, default=7)
+    parser.add_argument('--features', type=int, default=100)
+    parser.add_argument('--indicators', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--database', default=':memory:', help='Файл SQLite (по умолчанию в памяти)')
+    parser.add_argument('--skip-analysis', action='store_true', help='Не запускать Random Forest')
+    parser.add_argument('--save', metavar='NAME', help='Сохранить результат как baseline')
+    parser.add_argument('--compare', metavar='NAME', help='Сравнить с сохранённым baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Допустимое замедление (0.2 = 20%%)')
+    parser.add_argument('--output', help='Записать результат в JSON файл')
+    args = parser.parse_args(argv)
+
+    runner = BenchmarkRunner(
+        years=args.years,
+        districts=args.districts,
+        features=args.features,
+        indicators=args.indicators,
+        database=args.database,
+        skip_analysis=args.skip_analysis
+    )
+    command = ' '.join(['python -m benchmarks.run'] + list(sys.argv[1:] if argv is None else argv))
+    result = runner.run(args.repeat, command=command)
+    print_results(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(baseline_path(args.save), 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'\n✓ Baseline сохранён: {baseline_path(args.save)}')
+
+    if args.compare:
+        with open(baseline_path(args.compare), encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['params'] != result['params']:
+            print('\nВнимание: параметры baseline отличаются от текущего запуска')
+        if compare(result, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
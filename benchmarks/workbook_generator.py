@@ -0,0 +1,69 @@
+"""Генератор синтетических Excel файлов в форматах FULL и финансовых расходов"""
+
+import numpy as np
+import pandas as pd
+from typing import List
+
+FIRST_YEAR = 2000
+CRIME_TYPES_COUNT = 5
+
+
+def district_names(districts: int) -> List[str]:
+    return [f'Район {i + 1}' for i in range(districts)]
+
+
+def feature_names(features: int) -> List[str]:
+    """Названия признаков; часть с линией преступлений в формате 'Линия (Признак)'"""
+    names = []
+    for i in range(features):
+        if i % 2 == 0:
+            names.append(f'Линия {i % CRIME_TYPES_COUNT + 1} (Признак {i + 1})')
+        else:
+            names.append(f'Признак {i + 1}')
+    return names
+
+
+def year_values(years: int) -> List[int]:
+    return [FIRST_YEAR + i for i in range(years)]
+
+
+def generate_full_workbook(path: str, years: int, districts: int, features: int, seed: int = 0) -> str:
+    """
+    Создать FULL файл: лист = год, столбцы = районы, строки = признаки
+
+    Как и в реальных файлах, в листах есть итоговый столбец 'ПМР',
+    служебные строки 'СУММА'/'НАСЕЛЕНИЕ' и пустые ячейки.
+    """
+    rng = np.random.default_rng(seed)
+    districts_list = district_names(districts)
+    features_list = feature_names(features)
+
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for year in year_values(years):
+            values = rng.integers(0, 500, size=(features, districts)).astype(float)
+            values[rng.random(size=values.shape) < 0.05] = np.nan
+
+            df = pd.DataFrame(values, columns=districts_list)
+            df.insert(0, 'ПОКАЗАТЕЛЬ', features_list)
+            df['ПМР'] = df[districts_list].sum(axis=1)
+
+            service_rows = pd.DataFrame({'ПОКАЗАТЕЛЬ': ['СУММА', 'НАСЕЛЕНИЕ']})
+            df = pd.concat([df, service_rows], ignore_index=True)
+            df.to_excel(writer, sheet_name=str(year), index=False)
+
+    return path
+
+
+def generate_financial_workbook(path: str, years: int, indicators: int, seed: int = 0) -> str:
+    """Создать файл финансовых расходов: строки = показатели, столбцы = годы"""
+    rng = np.random.default_rng(seed)
+    years_list = year_values(years)
+
+    df = pd.DataFrame(
+        rng.uniform(1000, 100000, size=(indicators, years)).round(2),
+        columns=years_list
+    )
+    df.insert(0, 'ПОКАЗАТЕЛЬ', [f'Расход {i + 1}' for i in range(indicators)])
+    df.to_excel(path, index=False)
+
+    return path
@@ -3,5 +3,6 @@ from .data_controller import data_bp
 from .analysis_controller import analysis_bp
 from .map_controller import map_bp
 from .population_controller import population_bp
+from .health_controller import health_bp
 
-__all__ = ['main_bp', 'data_bp', 'analysis_bp', 'map_bp', 'population_bp']
+__all__ = ['main_bp', 'data_bp', 'analysis_bp', 'map_bp', 'population_bp', 'health_bp']
@@ -1,11 +1,13 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from services.analysis_service import AnalysisService
 from services.crime_line_analysis_service import CrimeLineAnalysisService
+from utils.instrumentation import query_budget
 
 analysis_bp = Blueprint('analysis', __name__)
 
 
 @analysis_bp.route('/analysis')
+@query_budget(3)
 def analysis():
     """Страница анализа данных"""
     crime_types = CrimeLineAnalysisService.get_all_crime_types()
@@ -30,6 +32,7 @@ def analysis():
 
 
 @analysis_bp.route('/analysis/select-indicators', methods=['POST'])
+@query_budget(2)
 def select_indicators():
     """Показать форму выбора финансовых показателей"""
     crime_type_id = request.form.get('crime_type_id')
@@ -51,6 +54,7 @@ def select_indicators():
 
 
 @analysis_bp.route('/analysis/run', methods=['POST'])
+@query_budget(None)
 def run_analysis():
     """Запустить анализ с выбранными показателями"""
     crime_type_id = request.form.get('crime_type_id')
@@ -86,6 +90,7 @@ def run_analysis():
 
 
 @analysis_bp.route('/analysis/results/<int:crime_type_id>')
+@query_budget(4)
 def show_results(crime_type_id):
     """Показать последние результаты анализа для линии преступлений"""
     results = AnalysisService.get_latest_result(crime_type_id)
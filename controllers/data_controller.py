@@ -1,119 +1,222 @@
-from flask import Blueprint, render_template, jsonify
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, jsonify, request, stream_template, stream_with_context
 from pony.orm import db_session, select
 from models.entities import FeatureDistrictYear, Year, District, Feature, FinancialExpenses
+from services.cache_service import CacheService
+from services.export_service import ExportService
+from utils.encoding import ENCODINGS, encode_matrix
+from utils.instrumentation import query_budget
 
 data_bp = Blueprint('data', __name__)
 
 
+# Признаков в одном окне таблицы года (первый экран и подгрузка при прокрутке)
+DOCUMENTS_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
 @data_bp.route('/documents')
+@query_budget(6)
 @db_session
 def documents():
-    """Страница просмотра всех данных из базы"""
-    from flask import request
+    """
+    Страница просмотра всех данных из базы
 
+    Для первого года сервер отдаёт только первое окно признаков, остальные
+    строки страница подгружает через /api/year-data при прокрутке. Шаблон
+    отдаётся потоком, поэтому первый байт не ждёт рендеринга всей таблицы.
+    """
     data_type = request.args.get('data_type', None)
     years_list = None
     first_year_data = None
     financial_data = None
 
     if data_type == 'crime':
-        years = list(select(y for y in Year).order_by(Year.year))
-        years_list = [y.year for y in years]
+        years_list = select(y.year for y in Year).order_by(1)[:]
 
-        if years:
-            first_year = years[0]
-            first_year_data = get_year_data(first_year.year)
+        if years_list:
+            first_year_data = get_year_data(years_list[0], limit=DOCUMENTS_PAGE_SIZE)
 
     elif data_type == 'financial':
-        financial_data = get_financial_data()
+        financial_data = CacheService.get('financial_grid')
 
-    return render_template(
+    return stream_template(
         'documents.html',
         years_list=years_list,
         first_year_data=first_year_data,
         financial_data=financial_data,
-        data_type=data_type
+        data_type=data_type,
+        page_size=DOCUMENTS_PAGE_SIZE
     )
 
 
 @data_bp.route('/api/year-data/<int:year>')
+@query_budget(5)
 @db_session
 def get_year_data_api(year):
-    """API для получения данных по конкретному году"""
-    data = get_year_data(year)
+    """
+    API для получения данных по конкретному году
+
+    Параметры offset и limit возвращают окно признаков (limit не больше
+    MAX_PAGE_SIZE); без limit отдаётся весь год из кэша. format=columnar
+    отдаёт имена признаков и значения одной матрицей признаки × районы
+    (encoding=json | f32, см. utils.encoding.encode_matrix).
+    """
+    response_format = request.args.get('format', 'rows')
+    encoding = request.args.get('encoding')
+    if response_format not in ('rows', 'columnar') or encoding not in (None,) + ENCODINGS:
+        return jsonify({'error': 'Неподдерживаемый формат ответа'}), 400
+
+    def build(offset=0, limit=None):
+        data = get_year_data(year, offset=offset, limit=limit)
+        if data and response_format == 'columnar':
+            data = columnar_year_data(data, encoding)
+        return data
+
+    limit = request.args.get('limit', type=int)
+    if limit is None:
+        key = f'year_data:{year}' if response_format == 'rows' else f'year_data:{year}:{encoding or "json"}'
+        data = CacheService.get_or_load(key, build)
+    else:
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        data = build(offset=offset, limit=min(max(limit, 1), MAX_PAGE_SIZE))
+
     if data:
         return jsonify(data)
     else:
         return jsonify({'error': 'Данные не найдены'}), 404
 
 
-def get_year_data(year_value):
-    """Получить данные за конкретный год"""
+def columnar_year_data(data: dict, encoding=None) -> dict:
+    """Данные года из get_year_data в колоночном виде"""
+    matrix = np.array([feature['district_values'] for feature in data['features']], dtype=float)
+    return {
+        'year': data['year'],
+        'district_names': data['district_names'],
+        'feature_names': [feature['name'] for feature in data['features']],
+        'offset': data['offset'],
+        'total': data['total'],
+        'next_offset': data['next_offset'],
+        **encode_matrix(matrix, encoding)
+    }
+
+
+@data_bp.route('/api/export')
+@query_budget(1)
+def export_data():
+    """
+    Потоковая выгрузка значений признаков
+
+    Параметры: format (csv | jsonl | parquet), feature, district, year.
+    Строки читаются курсором пачками и сразу отдаются клиенту, поэтому
+    память сервера не зависит от размера выгрузки.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ExportService.FORMATS:
+        return jsonify({'error': f'Неподдерживаемый формат: {export_format}'}), 400
+    if export_format == 'parquet' and not ExportService.parquet_available():
+        return jsonify({'error': 'Выгрузка в Parquet требует пакет pyarrow'}), 501
+
+    filters = {
+        'feature': request.args.get('feature') or None,
+        'district': request.args.get('district') or None,
+        'year': request.args.get('year', type=int),
+    }
+    filename = '_'.join(['export'] + [str(v) for v in filters.values() if v]) + f'.{export_format}'
+
+    return Response(
+        stream_with_context(ExportService.stream(export_format, **filters)),
+        mimetype=ExportService.FORMATS[export_format],
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
+
+
+def get_year_data(year_value, offset=0, limit=None):
+    """
+    Получить данные за конкретный год
+
+    Args:
+        year_value: Год
+        offset, limit: Окно признаков (по порядку id); без limit — все признаки
+
+    Returns: year, district_names, features (окно), total — всего признаков,
+        next_offset — начало следующего окна или None
+    """
     year = Year.get(year=year_value)
     if not year:
         return None
 
-    districts = list(select(d for d in District).order_by(District.id))
-    features = list(select(f for f in Feature).order_by(Feature.id))
+    districts = select((d.id, d.name) for d in District).order_by(1)[:]
+    features_query = select((f.id, f.name) for f in Feature).order_by(1)
+    if limit is None:
+        features = features_query[:]
+        total = len(features)
+    else:
+        features = features_query[offset:offset + limit]
+        total = Feature.select().count()
+
+    # Значения окна одним запросом: {(feature_id, district_id): value}
+    values_query = select(
+        (fdy.feature.id, fdy.district.id, fdy.value)
+        for fdy in FeatureDistrictYear
+        if fdy.year == year
+    ).without_distinct()
+    if limit is not None:
+        feature_ids = [feature_id for feature_id, _ in features]
+        values_query = values_query.filter(lambda f, d, v: f in feature_ids) if feature_ids else []
+    values = {(feature_id, district_id): value for feature_id, district_id, value in values_query}
 
     features_data = []
-    for feature in features:
+    for feature_id, feature_name in features:
         district_values = []
-        for district in districts:
-            records = list(select(
-                fdy for fdy in FeatureDistrictYear
-                if fdy.year == year and fdy.district == district and fdy.feature == feature
-            ))
-            value = float(records[0].value) if records and records[0].value is not None else None
-            district_values.append(value)
+        for district_id, _ in districts:
+            value = values.get((feature_id, district_id))
+            district_values.append(float(value) if value is not None else None)
 
         features_data.append({
-            'name': feature.name,
+            'name': feature_name,
             'district_values': district_values
         })
 
+    next_offset = offset + len(features)
     return {
         'year': year.year,
-        'district_names': [d.name for d in districts],
-        'features': features_data
+        'district_names': [name for _, name in districts],
+        'features': features_data,
+        'offset': offset,
+        'total': total,
+        'next_offset': next_offset if next_offset < total else None
     }
 
 
+@db_session
 def get_financial_data():
-    """Получить финансовые данные сгруппированные по показателям и годам"""
-    all_expenses = list(select(fe for fe in FinancialExpenses).order_by(FinancialExpenses.name, FinancialExpenses.year))
+    """
+    Финансовые показатели сеткой показатель × год
+
+    Значения читаются одной проекцией (name, year, amount); суммы
+    районов по показателю и году сводятся в матрицу pandas.
+    """
+    rows = select(
+        (fe.name, fe.year.year, fe.amount) for fe in FinancialExpenses
+    ).without_distinct()[:]
 
-    if not all_expenses:
+    if not rows:
         return None
 
-    years_set = sorted(set(fe.year.year for fe in all_expenses))
-    indicators_dict = {}
-
-    for expense in all_expenses:
-        indicator_name = expense.name
-        if indicator_name not in indicators_dict:
-            indicators_dict[indicator_name] = {}
-
-        indicators_dict[indicator_name][expense.year.year] = {
-            'amount': expense.amount,
-            'district': expense.district.name
-        }
-
-    indicators_list = []
-    for indicator_name, year_data in indicators_dict.items():
-        year_values = []
-        for year in years_set:
-            if year in year_data:
-                year_values.append(year_data[year]['amount'])
-            else:
-                year_values.append(None)
-
-        indicators_list.append({
-            'name': indicator_name,
-            'year_values': year_values
-        })
+    df = pd.DataFrame(rows, columns=['name', 'year', 'amount'])
+    grid = df.groupby(['name', 'year'])['amount'].sum().unstack('year').sort_index()
+    values = grid.to_numpy(dtype=float)
 
     return {
-        'years': years_set,
-        'indicators': indicators_list
+        'years': [int(year) for year in grid.columns],
+        'indicators': [
+            {'name': name, 'year_values': [None if np.isnan(v) else float(v) for v in row]}
+            for name, row in zip(grid.index, values)
+        ]
     }
+
+
+CacheService.register('financial_grid', get_financial_data)
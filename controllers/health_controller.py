@@ -0,0 +1,37 @@
+from flask import Blueprint, Response, jsonify
+from pony.orm import db_session
+from services.cache_service import CacheService
+from utils.metrics import registry
+from utils.instrumentation import query_budget
+
+health_bp = Blueprint('health', __name__)
+
+
+@health_bp.route('/healthz')
+@query_budget(0)
+def healthz():
+    """Процесс жив и обрабатывает запросы"""
+    return jsonify({'status': 'ok'})
+
+
+@health_bp.route('/readyz')
+@query_budget(1)
+def readyz():
+    """Готовность принимать трафик: БД доступна и кэши прогреты"""
+    try:
+        with db_session:
+            version = CacheService.data_version()
+    except Exception as e:
+        return jsonify({'status': 'unavailable', 'message': str(e)}), 503
+
+    if not CacheService.is_warm():
+        return jsonify({'status': 'warming', 'data_version': version}), 503
+
+    return jsonify({'status': 'ready', 'data_version': version})
+
+
+@health_bp.route('/metrics')
+@query_budget(0)
+def metrics():
+    """Метрики процесса в текстовом формате Prometheus"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
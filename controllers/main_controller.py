@@ -1,18 +1,22 @@
+import os
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from services.data_service import DataService
 from services.file_service import FileService
-from models.excel_enum import ExcelFileType
+from models.excel_enum import ExcelFileType, LoadMode
+from utils.instrumentation import query_budget
 
 main_bp = Blueprint('main', __name__)
 
 
 @main_bp.route('/')
+@query_budget(0)
 def index():
     """Главная страница"""
     return render_template('index.html')
 
 
 @main_bp.route('/upload', methods=['POST'])
+@query_budget(None)
 def upload_file():
     """Обработка загрузки файла"""
     if 'file' not in request.files:
@@ -25,28 +29,93 @@ def upload_file():
         flash('Файл не выбран', 'danger')
         return redirect(url_for('main.index'))
 
-    if file and FileService.allowed_file(file.filename):
-        filename, filepath = FileService.save_uploaded_file(file)
+    try:
+        mode = LoadMode(request.form.get('mode', LoadMode.APPEND.value))
+        file_type = ExcelFileType(request.form.get('file_type', ExcelFileType.FULL.value))
+    except ValueError:
+        flash('Неизвестный режим загрузки', 'danger')
+        return redirect(url_for('main.index'))
 
-        document = DataService.create_document(
-            filename=filename,
-            file_path=filepath,
-            file_type=ExcelFileType.FULL
-        )
+    part_year = None
+    if file_type == ExcelFileType.PART:
+        part_year = request.form.get('year', type=int)
+        if not part_year:
+            flash('Для файла за один год укажите год', 'danger')
+            return redirect(url_for('main.index'))
+        if mode == LoadMode.DELTA:
+            flash('Исправление значений доступно только для FULL файлов', 'danger')
+            return redirect(url_for('main.index'))
 
-        try:
-            # Передаем ID документа, а не сам объект, чтобы избежать смешивания транзакций
-            stats = DataService.load_full_data(filepath, document.id)
+    if file and FileService.allowed_file(file.filename):
+        filename, filepath, content_hash = FileService.save_uploaded_file(file)
+
+        # DELTA сверяет базу с файлом: тот же файл может откатывать более позднюю правку
+        existing = DataService.find_ingested_document(content_hash, file_type, part_year) if mode != LoadMode.DELTA else None
+        if existing:
+            # Тот же файл уже загружен: повторный разбор ничего не добавит
+            if os.path.abspath(filepath) != os.path.abspath(existing['file_path']):
+                FileService.remove_file(filepath)
+            stats = existing['stats']
             flash(
-                f'Файл "{filename}" загружен и обработан. '
-                f'Добавлено: {stats["features"]} признаков, '
+                f'Файл "{filename}" уже загружен ранее как "{existing["filename"]}" '
+                f'({existing["created_at"]:%d.%m.%Y %H:%M}), повторная обработка не требуется. '
+                f'В документе: {stats["features"]} признаков, '
                 f'{stats["districts"]} районов, '
                 f'{stats["years"]} лет, '
                 f'{stats["values"]} значений',
-                'success'
+                'info'
             )
+            return redirect(url_for('main.index'))
+
+        unfinished = DataService.find_unfinished_document(content_hash) if file_type == ExcelFileType.FULL else None
+        # Захват FAILED → LOADING атомарен: параллельная повторная загрузка не продолжит тот же документ
+        if unfinished and DataService.claim_document(unfinished['id']):
+            # Тот же файл уже начинали загружать: продолжить с последнего зафиксированного листа
+            document_id = unfinished['id']
+            if os.path.exists(unfinished['file_path']) and \
+                    os.path.abspath(filepath) != os.path.abspath(unfinished['file_path']):
+                FileService.remove_file(filepath)
+                filepath = unfinished['file_path']
+        else:
+            document_id = DataService.create_document(
+                filename=filename,
+                file_path=filepath,
+                file_type=file_type,
+                content_hash=content_hash,
+                part_year=part_year
+            ).id
+
+        try:
+            # Передаем ID документа, а не сам объект, чтобы избежать смешивания транзакций
+            if file_type == ExcelFileType.PART:
+                stats = DataService.load_part_data(filepath, part_year, document_id, content_hash=content_hash)
+            else:
+                stats = DataService.load_full_data(filepath, document_id, content_hash=content_hash, mode=mode)
+            if mode == LoadMode.DELTA:
+                flash(
+                    f'Файл "{filename}" сверен с базой. '
+                    f'Ячеек добавлено: {stats["inserted"]}, '
+                    f'изменено: {stats["updated"]}, '
+                    f'удалено: {stats["deleted"]}; '
+                    f'пересчитано лет: {stats["recalculated_years"]}',
+                    'success'
+                )
+            else:
+                flash(
+                    f'Файл "{filename}" загружен и обработан. '
+                    f'Добавлено: {stats["features"]} признаков, '
+                    f'{stats["districts"]} районов, '
+                    f'{stats["years"]} лет, '
+                    f'{stats["values"]} значений',
+                    'success'
+                )
         except Exception as e:
-            flash(f'Ошибка при обработке файла: {str(e)}', 'danger')
+            DataService.mark_document_failed(document_id)
+            flash(
+                f'Ошибка при обработке файла: {str(e)}. '
+                f'Загруженные листы сохранены, повторная загрузка того же файла продолжит с места остановки',
+                'danger'
+            )
 
         return redirect(url_for('main.index'))
     else:
@@ -55,6 +124,7 @@ def upload_file():
 
 
 @main_bp.route('/upload_financial', methods=['POST'])
+@query_budget(None)
 def upload_financial():
     """Обработка загрузки финансовых расходов"""
     if 'file' not in request.files:
@@ -68,16 +138,18 @@ def upload_financial():
         return redirect(url_for('main.index'))
 
     if file and FileService.allowed_file(file.filename):
-        filename, filepath = FileService.save_uploaded_file(file)
+        filename, filepath, _ = FileService.save_uploaded_file(file)
 
         try:
-            expenses_by_year = DataService.parse_financial_expenses_from_excel(filepath)
-            stats = DataService.load_financial_expenses(expenses_by_year)
+            expenses = DataService.parse_financial_expenses_from_excel(
+                filepath, district_sheets=bool(request.form.get('district_sheets'))
+            )
+            stats = DataService.load_financial_expenses(expenses)
             flash(
                 f'Финансовые расходы из "{filename}" загружены. '
                 f'Добавлено: {stats["districts"]} районов, '
-                f'{stats["years"]} лет, '
-                f'{stats["records"]} записей',
+                f'{stats["years"]} лет; '
+                f'записей добавлено или обновлено: {stats["records"]}',
                 'success'
             )
         except Exception as e:
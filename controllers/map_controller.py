@@ -1,7 +1,10 @@
-from flask import Blueprint, render_template, jsonify
+import numpy as np
+from flask import Blueprint, render_template, jsonify, request
 from services.crime_calculation_service import CrimeCalculationService
-from pony.orm import db_session, select
-from models.entities import District
+from services.cache_service import CacheService
+from pony.orm import db_session
+from utils.encoding import ENCODINGS, encode_matrix
+from utils.instrumentation import query_budget
 
 map_bp = Blueprint('map', __name__)
 
@@ -33,29 +36,62 @@ def get_district_map_id(district_name: str) -> int:
 
 
 @map_bp.route('/map')
+@query_budget(0)
 def show_map():
     return render_template('map.html')
 
 
 @map_bp.route('/api/crime-data')
-@db_session
+@query_budget(6)
 def crime_data():
+    """
+    Данные карты {year: {map_id: normalized_value}}
+
+    format=columnar отдаёт years, map_ids и матрицу годы × районы
+    (encoding=json | f32, см. utils.encoding.encode_matrix).
+    """
+    response_format = request.args.get('format', 'rows')
+    encoding = request.args.get('encoding')
+    if response_format not in ('rows', 'columnar') or encoding not in (None,) + ENCODINGS:
+        return jsonify({'error': 'Неподдерживаемый формат ответа'}), 400
+
+    crime_map = CacheService.get('crime_map')
+    if response_format == 'rows':
+        return jsonify(crime_map)
+
+    years = sorted(crime_map)
+    map_ids = sorted(set(DISTRICT_MAP_ID.values()))
+    matrix = np.array([
+        [crime_map[year].get(map_id, np.nan) for map_id in map_ids]
+        for year in years
+    ], dtype=float).reshape(len(years), len(map_ids))
+    return jsonify({'years': years, 'map_ids': map_ids, **encode_matrix(matrix, encoding)})
+
+
+@db_session
+def build_crime_map() -> dict:
+    """Данные карты {year: {map_id: normalized_value}}"""
     crime_stats = CrimeCalculationService.get_crime_data_for_map()
+    district_names = CacheService.dimensions()['districts']
 
     result = {}
     for year, districts_data in crime_stats.items():
         result[year] = {}
         for district_id, normalized_value in districts_data.items():
-            district = District.get(id=district_id)
-            if district:
-                map_id = get_district_map_id(district.name)
+            district_name = district_names.get(district_id)
+            if district_name:
+                map_id = get_district_map_id(district_name)
                 if map_id:
                     result[year][map_id] = normalized_value
 
-    return jsonify(result)
+    return result
+
+
+CacheService.register('crime_map', build_crime_map)
 
 
 @map_bp.route('/api/calculate-crime-level', methods=['POST'])
+@query_budget(None)
 @db_session
 def calculate_crime_level():
     try:
@@ -1,30 +1,47 @@
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from pony.orm import db_session, select, commit
 from models.entities import District, Year, Population
+from services.cache_service import CacheService
+from services.file_service import FileService
+from services.population_service import PopulationService
+from utils.instrumentation import query_budget
 
 population_bp = Blueprint('population', __name__)
 
 
 @population_bp.route('/population')
-@db_session
+@query_budget(6)
 def population():
-    districts = select(d for d in District).order_by(District.name)[:]
-    years = select(y for y in Year).order_by(Year.year)[:]
-
-    population_data = {}
-    for pop in select(p for p in Population):
-        key = (pop.district.id, pop.year.id)
-        population_data[key] = pop.value
-
+    grid = CacheService.get('population_grid')
     return render_template(
         'population.html',
-        districts=districts,
-        years=years,
-        population_data=population_data
+        districts=grid['districts'],
+        years=grid['years'],
+        population_data=grid['values']
     )
 
 
+@db_session
+def build_population_grid() -> dict:
+    """Сетка населения: районы, годы и {(district_id, year_id): value}"""
+    dimensions = CacheService.dimensions()
+    districts = sorted(dimensions['districts'].items(), key=lambda item: item[1])
+    years = sorted(dimensions['years'].items(), key=lambda item: item[1])
+
+    values = select((p.district.id, p.year.id, p.value) for p in Population).without_distinct()[:]
+
+    return {
+        'districts': [{'id': district_id, 'name': name} for district_id, name in districts],
+        'years': [{'id': year_id, 'year': year} for year_id, year in years],
+        'values': {(district_id, year_id): value for district_id, year_id, value in values}
+    }
+
+
+CacheService.register('population_grid', build_population_grid)
+
+
 @population_bp.route('/api/population/save', methods=['POST'])
+@query_budget(6)
 @db_session
 def save_population():
     try:
@@ -49,6 +66,7 @@ def save_population():
         else:
             Population(district=district, year=year, value=int(value))
 
+        CacheService.bump_version()
         commit()
 
         return jsonify({'success': True, 'message': 'Данные сохранены'})
@@ -58,6 +76,7 @@ def save_population():
 
 
 @population_bp.route('/api/population/delete', methods=['POST'])
+@query_budget(6)
 @db_session
 def delete_population():
     try:
@@ -75,6 +94,7 @@ def delete_population():
 
         if population:
             population.delete()
+            CacheService.bump_version()
             commit()
             return jsonify({'success': True, 'message': 'Данные удалены'})
         else:
@@ -82,3 +102,53 @@ def delete_population():
 
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
+
+
+@population_bp.route('/api/population/batch', methods=['POST'])
+@query_budget(None)
+def save_population_batch():
+    """Сохранить набор ячеек одной транзакцией и пересчитать затронутые годы"""
+    try:
+        cells = PopulationService.cells_from_payload(request.get_json(silent=True))
+        stats = PopulationService.save_batch(cells)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+    return jsonify({
+        'success': True,
+        'message': f"Сохранено: {stats['saved']}, удалено: {stats['deleted']}",
+        **stats
+    })
+
+
+@population_bp.route('/population/import', methods=['POST'])
+@query_budget(None)
+def import_population():
+    """Импорт населения из Excel: строки — районы, столбцы — годы"""
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        flash('Файл не выбран', 'danger')
+        return redirect(url_for('population.population'))
+
+    if not FileService.allowed_file(file.filename):
+        flash('Недопустимый формат файла. Разрешены только .xlsx файлы', 'danger')
+        return redirect(url_for('population.population'))
+
+    filename, filepath, _ = FileService.save_uploaded_file(file)
+    try:
+        stats = PopulationService.import_from_excel(filepath)
+        flash(
+            f'Население из "{filename}" загружено. '
+            f'Добавлено: {stats["districts"]} районов, {stats["years"]} лет; '
+            f'значений сохранено: {stats["saved"]}, '
+            f'пересчитано лет: {stats["recalculated_years"]}',
+            'success'
+        )
+    except Exception as e:
+        flash(f'Ошибка при обработке файла: {str(e)}', 'danger')
+
+    return redirect(url_for('population.population'))
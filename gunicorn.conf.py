@@ -0,0 +1,24 @@
+"""Конфигурация gunicorn для production-режима"""
+
+import multiprocessing
+from settings import settings
+
+bind = settings.web_bind
+workers = settings.web_workers or multiprocessing.cpu_count() * 2 + 1
+threads = settings.web_threads
+worker_class = 'gthread'
+timeout = settings.web_timeout
+graceful_timeout = 30
+preload_app = True
+accesslog = '-'
+
+
+def when_ready(server):
+    """
+    Мастер готов: закрыть его соединение с БД перед fork воркеров
+
+    Новые данные воркеры подхватывают сами: кэши привязаны к версии
+    данных и перестраиваются при первом запросе после её изменения.
+    """
+    import utils.db as db
+    db.db.disconnect()
@@ -11,6 +11,7 @@ from .population import Population
 from .crime_statistics import CrimeStatistics
 from .financial_expenses import FinancialExpenses
 from .analysis_result import AnalysisResult
+from .data_version import DataVersion
 
 __all__ = [
     'db',
@@ -24,4 +25,5 @@ __all__ = [
     'CrimeStatistics',
     'FinancialExpenses',
     'AnalysisResult',
+    'DataVersion',
 ]
@@ -0,0 +1,17 @@
+"""Модель версии загруженных данных"""
+
+from pony.orm import PrimaryKey, Required
+from datetime import datetime
+from .database import db
+
+
+class DataVersion(db.Entity):
+    """Счётчик версии данных (одна строка), увеличивается при каждом изменении данных"""
+    _table_ = 'data_version'
+
+    id = PrimaryKey(int)
+    version = Required(int, default=0)
+    updated_at = Required(datetime, default=lambda: datetime.now())
+
+    def __repr__(self):
+        return f"DataVersion(version={self.version}, updated_at={self.updated_at})"
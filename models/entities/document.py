@@ -1,6 +1,6 @@
 """Модель документа (загруженного Excel файла)"""
 
-from pony.orm import PrimaryKey, Required, Set
+from pony.orm import PrimaryKey, Required, Optional, Set
 from datetime import datetime
 from .database import db
 
@@ -14,6 +14,10 @@ class Document(db.Entity):
     file_path = Required(str, 500)
     file_type = Required(str, 10)
     created_at = Required(datetime, default=lambda: datetime.now())
+    content_hash = Optional(str, 64, index=True)  # SHA-256 содержимого
+    status = Optional(str, 20)  # DocumentStatus; NULL — загружен до появления статусов
+    last_sheet = Optional(str, 100)  # Последний зафиксированный лист для продолжения загрузки
+    part_year = Optional(int)  # Год PART файла: тот же файл за другой год — другая загрузка
     values = Set('FeatureDistrictYear')
 
     def __repr__(self):
@@ -8,3 +8,18 @@ class ExcelFileType(str, Enum):
 
     FULL = "full"
     PART = "part"
+
+
+class LoadMode(str, Enum):
+    """Режим загрузки FULL файла: APPEND (только новые ячейки) или DELTA (синхронизация изменённых)"""
+
+    APPEND = "append"
+    DELTA = "delta"
+
+
+class DocumentStatus(str, Enum):
+    """Состояние загрузки документа: LOADING (идёт или прервана), LOADED, FAILED"""
+
+    LOADING = "loading"
+    LOADED = "loaded"
+    FAILED = "failed"
@@ -0,0 +1,149 @@
+"""
+Параметризованные SQL запросы к значениям признак-район-год
+
+Текст запроса собирается один раз для каждого набора фильтров (кэш
+_values_sql), значения фильтров передаются параметрами. Результат
+возвращается по колонкам (numpy или Arrow) без создания сущностей Pony.
+"""
+
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.entities import FeatureDistrictYear, Feature, District, Year, CrimeType
+from utils.db import fetch_all, param_placeholder
+
+VALUE_COLUMNS = ('year', 'district', 'feature', 'crime_type', 'value')
+
+# Фильтр → условие WHERE (значение передаётся параметром)
+_FILTER_CONDITIONS = (
+    ('year', 'y."year" = {p}'),
+    ('district_name', 'd."name" = {p}'),
+    ('feature_name', 'f."name" = {p}'),
+    ('crime_type_name', 'ct."name" = {p}'),
+)
+
+
+@lru_cache(maxsize=64)
+def _values_sql(placeholder: str, filters: Tuple[str, ...], exclude_null: bool, order_by: str) -> str:
+    conditions = [condition.format(p=placeholder) for name, condition in _FILTER_CONDITIONS if name in filters]
+    if exclude_null:
+        conditions.append('v."value" IS NOT NULL')
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return f'''
+        SELECT y."year", d."name", f."name", ct."name", v."value"
+        FROM "{FeatureDistrictYear._table_}" v
+        JOIN "{Year._table_}" y ON y."id" = v."year"
+        JOIN "{District._table_}" d ON d."id" = v."district"
+        JOIN "{Feature._table_}" f ON f."id" = v."feature"
+        LEFT JOIN "{CrimeType._table_}" ct ON ct."id" = f."crime_type"
+        {where}
+        ORDER BY {order_by}
+    '''
+
+
+def build_values_query(
+    year: Optional[int] = None,
+    district_name: Optional[str] = None,
+    feature_name: Optional[str] = None,
+    crime_type_name: Optional[str] = None,
+    exclude_null: bool = False,
+    order_by: str = 'v."id"'
+) -> Tuple[str, list]:
+    """
+    SQL выборки значений (VALUE_COLUMNS) и параметры фильтров
+
+    Args:
+        order_by: Выражение ORDER BY (фиксированное, не из запроса пользователя)
+    """
+    values = {
+        'year': year,
+        'district_name': district_name,
+        'feature_name': feature_name,
+        'crime_type_name': crime_type_name,
+    }
+    filters = tuple(name for name, _ in _FILTER_CONDITIONS if values[name])
+    sql = _values_sql(param_placeholder(), filters, exclude_null, order_by)
+    return sql, [values[name] for name in filters]
+
+
+def get_values_with_filter(
+    year: Optional[int] = None,
+    district_name: Optional[str] = None,
+    feature_name: Optional[str] = None,
+    crime_type_name: Optional[str] = None,
+    exclude_null: bool = False,
+    as_arrow: bool = False
+):
+    """
+    Значения с фильтрацией на стороне БД, по колонкам
+
+    Вызывать внутри db_session.
+
+    Returns: {колонка VALUE_COLUMNS: np.ndarray} (value — float64, NULL → NaN)
+        или pyarrow.Table при as_arrow (требует pyarrow)
+    """
+    sql, params = build_values_query(year, district_name, feature_name, crime_type_name, exclude_null)
+    rows = fetch_all(sql, params)
+
+    year_column, district, feature, crime_type, value = zip(*rows) if rows else ((),) * len(VALUE_COLUMNS)
+    columns = {
+        'year': np.array(year_column, dtype=np.int64),
+        'district': np.array(district, dtype=object),
+        'feature': np.array(feature, dtype=object),
+        'crime_type': np.array(crime_type, dtype=object),
+        # Decimal (PostgreSQL) и NULL → float64 с NaN
+        'value': pd.Series(value, dtype=object).astype(np.float64).to_numpy(),
+    }
+    if as_arrow:
+        import pyarrow as pa
+        return pa.table({name: pa.array(array, from_pandas=True) for name, array in columns.items()})
+    return columns
+
+
+def get_pivot_table(
+    index: str = 'feature',
+    columns: str = 'district',
+    year: Optional[int] = None,
+    **filters
+) -> pd.DataFrame:
+    """
+    Сводная таблица значений: index × columns (колонки из VALUE_COLUMNS)
+
+    Строится переформированием массивов без группировки: при повторе
+    пары (index, columns) — например, признак × район за несколько лет —
+    берётся первое непустое значение в порядке id, как pivot_table с
+    aggfunc='first'. Строки и столбцы без значений в таблицу не попадают.
+    Вызывать внутри db_session.
+    """
+    for name in (index, columns):
+        if name not in VALUE_COLUMNS or name == 'value':
+            raise ValueError(f"Некорректная колонка сводной таблицы: {name}")
+
+    data = get_values_with_filter(year=year, **filters)
+    if not len(data['value']):
+        return pd.DataFrame()
+
+    # Пустые значения и строки с NULL в index/columns (например, признак без линии) пропускаются
+    known = ~np.isnan(data['value']) & pd.notna(data[index]) & pd.notna(data[columns])
+    values = data['value'][known]
+    if not len(values):
+        return pd.DataFrame()
+
+    row_codes, row_labels = pd.factorize(data[index][known], sort=True)
+    column_codes, column_labels = pd.factorize(data[columns][known], sort=True)
+
+    # Номер ячейки в матрице; return_index даёт первое вхождение каждой ячейки
+    cells = row_codes * len(column_labels) + column_codes
+    cells, first = np.unique(cells, return_index=True)
+
+    matrix = np.full((len(row_labels), len(column_labels)), np.nan)
+    matrix.flat[cells] = values[first]
+
+    return pd.DataFrame(
+        matrix,
+        index=pd.Index(row_labels, name=index),
+        columns=pd.Index(column_labels, name=columns)
+    )
@@ -6,6 +6,9 @@ from .district_repository import DistrictRepository
 from .year_repository import YearRepository
 from .document_repository import DocumentRepository
 from .feature_district_year_repository import FeatureDistrictYearRepository
+from .crime_type_repository import CrimeTypeRepository
+from .financial_expenses_repository import FinancialExpensesRepository
+from .population_repository import PopulationRepository
 
 __all__ = [
     'BaseRepository',
@@ -14,4 +17,7 @@ __all__ = [
     'YearRepository',
     'DocumentRepository',
     'FeatureDistrictYearRepository',
+    'CrimeTypeRepository',
+    'FinancialExpensesRepository',
+    'PopulationRepository',
 ]
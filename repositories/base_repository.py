@@ -1,10 +1,63 @@
 """Базовый репозиторий с CRUD операциями"""
 
-from typing import TypeVar, Generic, List, Optional, Callable
-from pony.orm import db_session, select
+import base64
+import json
+import re
+from decimal import Decimal
+from itertools import chain
+from typing import (
+    TypeVar, Generic, List, Optional, Callable, Dict, Iterable, Iterator,
+    NamedTuple, Sequence, Tuple, Union
+)
+import numpy as np
+from pony.orm import db_session, select, core
+from models.entities import db
+from utils.db import DEFAULT_CHUNK_SIZE, bulk_insert, bulk_update, insert_or_select
+
+Row = Union[dict, Sequence]
+FilterFunc = Union[Callable, Sequence[Callable]]
 
 T = TypeVar('T')
 
+DEFAULT_PAGE_SIZE = 1000
+
+_COLUMN_PATH = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+
+class Page(NamedTuple):
+    """Страница keyset-пагинации"""
+    items: list
+    next_cursor: Optional[str]
+
+
+def encode_cursor(last_id: int) -> str:
+    """Курсор страницы: непрозрачный токен с последним id"""
+    return base64.urlsafe_b64encode(json.dumps({'id': last_id}).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> int:
+    """Разобрать курсор encode_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))['id'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError(f"Некорректный курсор: {token}")
+
+
+def _to_columns(columns: Sequence[str], rows: List[tuple]) -> Dict[str, np.ndarray]:
+    """Транспонировать строки проекции в массивы numpy по колонкам"""
+    result = {}
+    for index, column in enumerate(columns):
+        values = [row[index] for row in rows]
+        if values and all(v is None or (isinstance(v, (int, float, Decimal)) and not isinstance(v, bool)) for v in values):
+            # Числа (в т.ч. Decimal) → float64, NULL → NaN
+            if any(v is None or isinstance(v, Decimal) for v in values):
+                values = [np.nan if v is None else float(v) for v in values]
+            result[column] = np.asarray(values)
+        else:
+            result[column] = np.asarray(values, dtype=object if values else float)
+    return result
+
 
 class BaseRepository(Generic[T]):
     """
@@ -12,10 +65,18 @@ class BaseRepository(Generic[T]):
 
     Включает 5 основных методов:
     - get_by_id: получение по ID
-    - get_list: получение списка с фильтрацией и сортировкой
+    - get_list: получение списка с фильтрацией, сортировкой и проекцией
     - create: создание
     - update: обновление
     - delete: удаление
+
+    Постраничное чтение с keyset-курсором: get_page, iterate
+
+    И пакетные операции одним SQL запросом на пачку строк:
+    - bulk_create, bulk_upsert, bulk_update, bulk_delete
+
+    Пакетные операции работают в обход кэша сессии: объекты, уже
+    загруженные в текущем db_session, не обновляются.
     """
 
     entity_class: type = None  # Переопределяется в дочерних классах
@@ -32,15 +93,25 @@ class BaseRepository(Generic[T]):
     @db_session
     def get_list(
         cls,
-        filter_func: Optional[Callable] = None,
-        order_by_func: Optional[Callable] = None
-    ) -> List[T]:
+        filter_func: Optional[FilterFunc] = None,
+        order_by_func: Optional[Callable] = None,
+        columns: Optional[Sequence[str]] = None,
+        as_numpy: bool = False,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Union[List[T], List[tuple], Dict[str, np.ndarray]]:
         """
         Получить список сущностей с фильтрацией и сортировкой
 
         Args:
-            filter_func: Функция фильтрации для Pony ORM
+            filter_func: Функция фильтрации для Pony ORM (или список функций)
             order_by_func: Функция/поле для сортировки
+            columns: Поля для проекции (допустимы пути через связи:
+                'year.year'). Вместо сущностей возвращаются кортежи,
+                в identity map ничего не загружается
+            as_numpy: Вернуть проекцию по колонкам {поле: np.ndarray}
+            limit: Максимальное количество строк
+            cursor: Курсор из get_page — строки после него в порядке id
 
         Examples:
             # Все сущности
@@ -59,19 +130,116 @@ class BaseRepository(Generic[T]):
                 filter_func=lambda f: f.name.startswith('У'),
                 order_by_func=lambda f: f.name
             )
+
+            # Проекция: [(id, name), ...]
+            FeatureRepository.get_list(columns=['id', 'name'])
+
+            # Колонки numpy: {'year.year': array([...]), 'value': array([...])}
+            FeatureDistrictYearRepository.get_list(columns=['year.year', 'value'], as_numpy=True)
+        """
+        if cursor is not None and order_by_func is not None:
+            raise ValueError("Курсор задаёт порядок по id, order_by_func не поддерживается")
+
+        query = cls._build_query(filter_func, order_by_func, cursor)
+        if columns:
+            rows = cls._project(query, columns, limit)
+            return _to_columns(columns, rows) if as_numpy else rows
+
+        return query[:limit]
+
+    @classmethod
+    @db_session
+    def get_page(
+        cls,
+        filter_func: Optional[FilterFunc] = None,
+        columns: Optional[Sequence[str]] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None
+    ) -> Page:
+        """
+        Получить страницу с keyset-пагинацией по id
+
+        Следующая страница запрашивается по next_cursor: WHERE id > последний
+        id страницы, поэтому стоимость запроса не растёт с номером страницы.
+
+        Returns: Page(items, next_cursor); next_cursor is None на последней странице
+
+        Examples:
+            page = FeatureRepository.get_page(columns=['id', 'name'], limit=100)
+            page = FeatureRepository.get_page(columns=['id', 'name'], limit=100, cursor=page.next_cursor)
+        """
+        query = cls._build_query(filter_func, None, cursor)
+        if columns:
+            # id нужен для курсора, даже если не запрошен
+            with_id = list(columns) if 'id' in columns else list(columns) + ['id']
+            rows = cls._project(query, with_id, limit)
+            id_index = with_id.index('id')
+            last_id = rows[-1][id_index] if rows else None
+            if 'id' not in columns:
+                rows = [row[:-1] for row in rows]
+        else:
+            rows = query[:limit]
+            last_id = rows[-1].id if rows else None
+
+        next_cursor = encode_cursor(last_id) if last_id is not None and len(rows) == limit else None
+        return Page(rows, next_cursor)
+
+    @classmethod
+    def iterate(
+        cls,
+        filter_func: Optional[FilterFunc] = None,
+        columns: Optional[Sequence[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Iterator:
         """
+        Перебрать все строки постранично (в памяти одновременно не более page_size)
+
+        Каждая страница читается в своём db_session, если вызов не вложен
+        во внешний; без columns сущности вне сессии доступны только по
+        загруженным атрибутам.
+        """
+        cursor = None
+        while True:
+            page = cls.get_page(filter_func=filter_func, columns=columns, limit=page_size, cursor=cursor)
+            yield from page.items
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    @classmethod
+    def _build_query(cls, filter_func: Optional[FilterFunc], order_by_func: Optional[Callable], cursor: Optional[str]):
         if not cls.entity_class:
             raise NotImplementedError("entity_class должен быть определен в дочернем классе")
 
         query = select(e for e in cls.entity_class)
 
         if filter_func:
-            query = query.filter(filter_func)
+            filters = filter_func if isinstance(filter_func, (list, tuple)) else [filter_func]
+            for func in filters:
+                query = query.filter(func)
 
-        if order_by_func:
+        if cursor is not None:
+            last_id = decode_cursor(cursor)
+            query = query.filter(lambda e: e.id > last_id).order_by(lambda e: e.id)
+        elif order_by_func:
             query = query.order_by(order_by_func)
 
-        return query[:]
+        return query
+
+    @staticmethod
+    def _project(query, columns: Sequence[str], limit: Optional[int]) -> List[tuple]:
+        """Выполнить проекцию запроса на колонки; порядок и фильтры запроса сохраняются"""
+        for column in columns:
+            if not _COLUMN_PATH.match(column):
+                raise ValueError(f"Некорректное имя колонки: {column}")
+        expression = ', '.join(f'e.{column}' for column in columns)
+        # Pony разворачивает запрос из запроса в один SELECT
+        projection = select(f'({expression},) for e in query')
+        rows = projection[:limit]
+        if len(columns) == 1:
+            # Pony возвращает скаляры для одной колонки
+            return [(value,) for value in rows]
+        return list(rows)
 
     @classmethod
     @db_session
@@ -133,4 +301,295 @@ class BaseRepository(Generic[T]):
             return False
 
         entity.delete()
-        return True
\ No newline at end of file
+        return True
+
+    @classmethod
+    @db_session
+    def get_or_create(cls, defaults: Optional[dict] = None, **key) -> Tuple[T, bool]:
+        """
+        Получить сущность по уникальному ключу или создать её
+
+        Безопасно при параллельных загрузках: существующая сущность
+        ищется обычным get, новая вставляется через INSERT ... ON CONFLICT
+        DO NOTHING RETURNING id с повторным SELECT (см. insert_or_select),
+        поэтому одновременное создание той же строки не откатывает транзакцию.
+
+        Args:
+            defaults: Значения остальных полей для новой сущности
+            **key: Поля уникального ключа (unique или composite_key)
+
+        Returns: (сущность, создана ли она)
+
+        Examples:
+            district, created = DistrictRepository.get_or_create(name='Район 1')
+        """
+        if not cls.entity_class:
+            raise NotImplementedError("entity_class должен быть определен в дочернем классе")
+
+        existing = cls.entity_class.get(**key)
+        if existing:
+            return existing, False
+
+        fields, rows = cls._with_defaults(*cls._prepare_rows([dict(key, **(defaults or {}))], None))
+        attrs = cls._resolve_attrs(fields)
+        row = next(iter(cls._to_db_rows(attrs, rows)))
+        column = {attr.name: attr.columns[0] for attr in attrs}
+        entity_id, created = insert_or_select(
+            cls.entity_class._table_,
+            [attr.columns[0] for attr in attrs],
+            row,
+            conflict_columns=[column[name] for name in key]
+        )
+        return cls.entity_class[entity_id], created
+
+    @classmethod
+    @db_session
+    def get_ids_or_create(cls, field: str, values: Iterable) -> Tuple[Dict[object, int], int]:
+        """
+        Получить ID сущностей по значениям уникального поля, создав недостающие
+
+        Недостающие вставляются одним пакетным INSERT ... ON CONFLICT DO
+        NOTHING, затем ID всех значений читаются одним запросом.
+
+        Returns: ({значение: id}, количество созданных)
+
+        Examples:
+            year_ids, created = YearRepository.get_ids_or_create('year', [2020, 2021])
+        """
+        cls._resolve_attrs([field])
+        values = sorted({v.item() if hasattr(v, 'item') else v for v in values})
+        if not values:
+            return {}, 0
+        created = cls.bulk_upsert([(value,) for value in values], fields=[field], key=[field], update_fields=[])
+        ids = dict(select((getattr(e, field), e.id) for e in cls.entity_class if getattr(e, field) in values))
+        return ids, created
+
+    @classmethod
+    @db_session
+    def bulk_create(
+        cls,
+        rows: Iterable[Row],
+        fields: Optional[Sequence[str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> int:
+        """
+        Создать сущности пачками
+
+        Args:
+            rows: Словари {поле: значение} или кортежи в порядке fields.
+                Связи передаются сущностями или их ID
+            fields: Поля (для словарей по умолчанию — ключи первой строки)
+            chunk_size: Размер пачки
+
+        Returns: Количество созданных записей
+
+        Examples:
+            FeatureDistrictYearRepository.bulk_create(
+                [(feature_id, district_id, year_id, value), ...],
+                fields=['feature', 'district', 'year', 'value']
+            )
+        """
+        fields, rows = cls._prepare_rows(rows, fields)
+        if not fields:
+            return 0
+        fields, rows = cls._with_defaults(fields, rows)
+        attrs = cls._resolve_attrs(fields)
+        return bulk_insert(
+            cls.entity_class._table_,
+            [attr.columns[0] for attr in attrs],
+            cls._to_db_rows(attrs, rows),
+            chunk_size=chunk_size
+        )
+
+    @classmethod
+    @db_session
+    def bulk_upsert(
+        cls,
+        rows: Iterable[Row],
+        fields: Optional[Sequence[str]] = None,
+        key: Optional[Sequence[str]] = None,
+        update_fields: Optional[Sequence[str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> int:
+        """
+        Вставить или обновить сущности пачками (INSERT ... ON CONFLICT)
+
+        Args:
+            rows: Словари или кортежи в порядке fields
+            fields: Поля строк
+            key: Уникальный ключ конфликта (по умолчанию — первый
+                composite_key/unique ключ сущности)
+            update_fields: Поля, обновляемые при конфликте (по умолчанию —
+                переданные поля вне ключа; значения по умолчанию
+                дописываются только новым строкам; пустой список — DO NOTHING)
+            chunk_size: Размер пачки
+
+        Returns: Количество вставленных и обновлённых записей
+        """
+        fields, rows = cls._prepare_rows(rows, fields)
+        if not fields:
+            return 0
+        key = list(key or cls._default_key())
+        if update_fields is None:
+            update_fields = [f for f in fields if f not in key and f != 'id']
+        fields, rows = cls._with_defaults(fields, rows)
+
+        attrs = cls._resolve_attrs(fields)
+        column = {attr.name: attr.columns[0] for attr in attrs}
+        return bulk_insert(
+            cls.entity_class._table_,
+            [attr.columns[0] for attr in attrs],
+            cls._to_db_rows(attrs, rows),
+            conflict_columns=[column[f] for f in key],
+            update_columns=[column[f] for f in update_fields],
+            chunk_size=chunk_size
+        )
+
+    @classmethod
+    @db_session
+    def bulk_update(
+        cls,
+        rows: Iterable[Row],
+        fields: Optional[Sequence[str]] = None,
+        key: Sequence[str] = ('id',),
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> int:
+        """
+        Обновить сущности пачками по ключу
+
+        Args:
+            rows: Словари или кортежи в порядке fields; поля ключа обязательны
+            fields: Поля строк (ключ + обновляемые)
+            key: Поля, по которым ищется запись
+            chunk_size: Размер пачки
+
+        Returns: Количество обновлённых записей
+
+        Examples:
+            FeatureRepository.bulk_update([{'id': 1, 'crime_type': 3}, ...])
+        """
+        fields, rows = cls._prepare_rows(rows, fields)
+        if not fields:
+            return 0
+        key = list(key)
+        missing = [f for f in key if f not in fields]
+        if missing:
+            raise ValueError(f"В строках нет полей ключа: {', '.join(missing)}")
+
+        # Ключ вперёд: bulk_update ожидает key_columns + columns
+        order = key + [f for f in fields if f not in key]
+        positions = [list(fields).index(f) for f in order]
+        attrs = cls._resolve_attrs(order)
+        provider = db.provider
+        fk_types = getattr(provider, 'fk_types', {})
+        sql_types = [fk_types.get(a.converters[0].get_sql_type(), a.converters[0].get_sql_type()) for a in attrs]
+
+        return bulk_update(
+            cls.entity_class._table_,
+            [a.columns[0] for a in attrs[:len(key)]],
+            [a.columns[0] for a in attrs[len(key):]],
+            cls._to_db_rows(attrs, (tuple(row[i] for i in positions) for row in rows)),
+            sql_types=sql_types,
+            chunk_size=chunk_size
+        )
+
+    @classmethod
+    @db_session
+    def bulk_delete(cls, filter_func: Optional[Callable] = None) -> int:
+        """
+        Удалить сущности одним DELETE без загрузки объектов
+
+        Args:
+            filter_func: Функция фильтрации для Pony ORM (None — все записи)
+
+        Returns: Количество удалённых записей
+
+        Examples:
+            FeatureDistrictYearRepository.bulk_delete(lambda v: v.year.year == 2020)
+        """
+        if not cls.entity_class:
+            raise NotImplementedError("entity_class должен быть определен в дочернем классе")
+
+        query = select(e for e in cls.entity_class)
+        if filter_func:
+            query = query.filter(filter_func)
+        db.flush()
+        return query.delete(bulk=True)
+
+    @classmethod
+    def _prepare_rows(
+        cls,
+        rows: Iterable[Row],
+        fields: Optional[Sequence[str]]
+    ) -> Tuple[List[str], Iterable[tuple]]:
+        """Привести строки к кортежам в порядке fields"""
+        if not cls.entity_class:
+            raise NotImplementedError("entity_class должен быть определен в дочернем классе")
+
+        # Новые сущности в строках получают ID только после flush
+        db.flush()
+        iterator = iter(rows)
+        first = next(iterator, None)
+        if first is None:
+            return [], ()
+        is_dict = isinstance(first, dict)
+        if fields is None:
+            if not is_dict:
+                raise ValueError("Для кортежей необходимо указать fields")
+            fields = list(first.keys())
+        fields = list(fields)
+
+        def convert(row):
+            return tuple(row.get(f) for f in fields) if is_dict else tuple(row)
+
+        return fields, (convert(row) for row in chain([first], iterator))
+
+    @classmethod
+    def _with_defaults(cls, fields: List[str], rows: Iterable[tuple]) -> Tuple[List[str], Iterable[tuple]]:
+        """Дописать в конец строк недостающие поля со значением по умолчанию"""
+        defaults = [
+            (attr.name, attr.default) for attr in cls.entity_class._attrs_
+            if attr.name not in fields and not attr.is_collection and not attr.auto and attr.default is not None
+        ]
+        if not defaults:
+            return fields, rows
+        return fields + [name for name, _ in defaults], (
+            row + tuple(d() if callable(d) else d for _, d in defaults) for row in rows
+        )
+
+    @classmethod
+    def _resolve_attrs(cls, fields: Sequence[str]) -> list:
+        attrs = []
+        for name in fields:
+            attr = cls.entity_class._adict_.get(name)
+            if attr is None or attr.is_collection:
+                raise ValueError(f"У {cls.entity_class.__name__} нет поля {name}")
+            attrs.append(attr)
+        return attrs
+
+    @classmethod
+    def _default_key(cls) -> Sequence[str]:
+        keys = cls.entity_class._keys_
+        if not keys:
+            raise ValueError(f"У {cls.entity_class.__name__} нет уникального ключа для upsert")
+        return [attr.name for attr in keys[0]]
+
+    @staticmethod
+    def _to_db_rows(attrs: list, rows: Iterable[tuple]) -> Iterable[tuple]:
+        """Преобразовать значения конвертерами Pony (Decimal, связи, NaN → NULL)"""
+        converters = [attr.converters[0] for attr in attrs]
+        relations = [attr.reverse is not None for attr in attrs]
+        for row in rows:
+            values = []
+            for value, converter, is_relation in zip(row, converters, relations):
+                if isinstance(value, core.Entity):
+                    value = value.id
+                elif hasattr(value, 'item'):
+                    value = value.item()  # скаляры numpy/pandas
+                if value is None or value != value:  # None или NaN
+                    values.append(None)
+                    continue
+                if not is_relation:
+                    value = converter.validate(value)
+                values.append(converter.py2sql(value))
+            yield tuple(values)
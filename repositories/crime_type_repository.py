@@ -0,0 +1,18 @@
+"""Репозиторий для работы с линиями преступлений"""
+
+from typing import Optional
+from pony.orm import db_session
+from models.entities import CrimeType
+from .base_repository import BaseRepository
+
+
+class CrimeTypeRepository(BaseRepository[CrimeType]):
+    """Репозиторий для работы с линиями преступлений"""
+
+    entity_class = CrimeType
+
+    @classmethod
+    @db_session
+    def get_by_name(cls, name: str) -> Optional[CrimeType]:
+        """Найти линию по названию"""
+        return CrimeType.get(name=name)
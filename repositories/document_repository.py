@@ -1,8 +1,10 @@
 """Репозиторий для работы с документами"""
 
 from typing import List, Dict, Optional
-from pony.orm import db_session, select, desc
+from pony.orm import db_session, select, desc, count
 from models.entities import Document, FeatureDistrictYear
+from models.excel_enum import DocumentStatus, ExcelFileType
+from utils.db import execute_sql, param_placeholder
 from .base_repository import BaseRepository
 
 
@@ -23,6 +25,75 @@ class DocumentRepository(BaseRepository[Document]):
         """Найти документы по имени файла"""
         return cls.get_list(filter_func=lambda d: d.filename == filename)
 
+    @classmethod
+    @db_session
+    def get_by_content_hash(
+        cls,
+        content_hash: str,
+        file_type: str = ExcelFileType.FULL.value,
+        part_year: Optional[int] = None
+    ) -> Optional[Document]:
+        """
+        Найти уже загруженный документ с таким же содержимым
+
+        Ключ — содержимое, формат файла и год PART файла: те же байты,
+        загруженные как PART за другой год или как FULL, — другая загрузка.
+        """
+        loaded = DocumentStatus.LOADED.value
+        query = select(
+            d for d in Document
+            if d.content_hash == content_hash and d.file_type == file_type
+            and (d.status is None or d.status == loaded)
+        )
+        if part_year is None:
+            query = query.filter(lambda d: d.part_year is None)
+        else:
+            query = query.filter(lambda d: d.part_year == part_year)
+        return query.order_by(Document.id).first()
+
+    @classmethod
+    @db_session
+    def get_unfinished_by_content_hash(cls, content_hash: str) -> Optional[Document]:
+        """
+        Найти прерванную ошибкой загрузку FULL файла с таким же содержимым (последнюю)
+
+        Документы в статусе LOADING ещё загружаются другим запросом и не
+        возвращаются.
+        """
+        failed = DocumentStatus.FAILED.value
+        full = ExcelFileType.FULL.value
+        return select(
+            d for d in Document
+            if d.content_hash == content_hash and d.file_type == full and d.status == failed
+        ).order_by(desc(Document.id)).first()
+
+    @classmethod
+    @db_session
+    def claim_failed(cls, document_id: int) -> bool:
+        """
+        Атомарно перевести документ из FAILED в LOADING
+
+        Returns: True, если документ захвачен этим вызовом; при параллельной
+            повторной загрузке того же файла успешен только один запрос
+        """
+        p = param_placeholder()
+        cursor = execute_sql(
+            f'UPDATE "{Document._table_}" SET "status" = {p} WHERE "id" = {p} AND "status" = {p}',
+            [DocumentStatus.LOADING.value, document_id, DocumentStatus.FAILED.value]
+        )
+        return cursor.rowcount == 1
+
+    @classmethod
+    @db_session
+    def get_stats(cls, document_id: int) -> Dict[str, int]:
+        """Количество значений, признаков, районов и лет документа одним запросом"""
+        values, features, districts, years = select(
+            (count(v), count(v.feature, distinct=True), count(v.district, distinct=True), count(v.year, distinct=True))
+            for v in FeatureDistrictYear
+            if v.document.id == document_id
+        ).first()
+        return {'values': values, 'features': features, 'districts': districts, 'years': years}
+
     @classmethod
     @db_session
     def get_data_by_years(cls, document_id: int) -> Optional[Dict]:
@@ -35,61 +106,41 @@ class DocumentRepository(BaseRepository[Document]):
         if not document:
             return None
 
-        # Получить все значения для этого документа
-        values = select(
-            v for v in FeatureDistrictYear
+        # Значения документа одной проекцией, без загрузки сущностей
+        rows = select(
+            (v.year.year, v.feature.name, v.district.name, v.value)
+            for v in FeatureDistrictYear
             if v.document == document
-        ).order_by(
-            lambda v: (v.year.year, v.feature.name, v.district.name)
-        )[:]
+        ).without_distinct()[:]
 
         # Сгруппировать данные: год -> признак -> район -> значение
         years_data = {}
-
-        for v in values:
-            year_val = v.year.year
-            district_name = v.district.name
-            feature_name = v.feature.name
-            value = float(v.value) if v.value else None
-
-            if year_val not in years_data:
-                years_data[year_val] = {
-                    'districts': set(),
-                    'features': {}
-                }
-
-            years_data[year_val]['districts'].add(district_name)
-
-            if feature_name not in years_data[year_val]['features']:
-                years_data[year_val]['features'][feature_name] = {}
-
-            years_data[year_val]['features'][feature_name][district_name] = value
+        for year_val, feature_name, district_name, value in rows:
+            year_info = years_data.setdefault(year_val, {'districts': set(), 'features': {}})
+            year_info['districts'].add(district_name)
+            year_info['features'].setdefault(feature_name, {})[district_name] = \
+                float(value) if value is not None else None
 
         # Преобразовать в список для шаблона
         years_list = []
-        for year_val in sorted(years_data.keys()):
+        for year_val in sorted(years_data):
             year_info = years_data[year_val]
-
-            # Упорядоченный список районов
             district_names = sorted(year_info['districts'])
-
-            # Список признаков с их значениями по районам
-            features_list = []
-            for feature_name in sorted(year_info['features'].keys()):
-                feature_values = []
-                for district_name in district_names:
-                    value = year_info['features'][feature_name].get(district_name)
-                    feature_values.append(value)
-
-                features_list.append({
-                    'name': feature_name,
-                    'district_values': feature_values
-                })
+            feature_names = sorted(year_info['features'])
 
             years_list.append({
                 'year': year_val,
                 'district_names': district_names,
-                'features': features_list
+                'features': [
+                    {
+                        'name': feature_name,
+                        'district_values': [
+                            year_info['features'][feature_name].get(district_name)
+                            for district_name in district_names
+                        ]
+                    }
+                    for feature_name in feature_names
+                ]
             })
 
         return {
@@ -1,10 +1,13 @@
 """Репозиторий для работы со значениями признак-район-год"""
 
-from typing import Optional, List
+from typing import Optional, List, Callable, Dict, Iterable, Iterator, Sequence, Union
 from decimal import Decimal
+import numpy as np
+import pandas as pd
 from pony.orm import db_session, select
-from models.entities import FeatureDistrictYear, Feature, District, Year, Document
-from .base_repository import BaseRepository
+from models.entities import db, FeatureDistrictYear, Feature, District, Year, Document
+from utils.db import DEFAULT_CHUNK_SIZE
+from .base_repository import BaseRepository, DEFAULT_PAGE_SIZE
 
 
 class FeatureDistrictYearRepository(BaseRepository[FeatureDistrictYear]):
@@ -25,14 +28,17 @@ class FeatureDistrictYearRepository(BaseRepository[FeatureDistrictYear]):
 
     @classmethod
     @db_session
-    def get_by_feature(cls, feature_name: str) -> List[FeatureDistrictYear]:
-        """Получить все значения для признака"""
-        return select(
-            v for v in FeatureDistrictYear
-            if v.feature.name == feature_name
-        ).order_by(
-            lambda v: (v.year.year, v.district.name)
-        )[:]
+    def get_by_feature(
+        cls,
+        feature_name: str,
+        columns: Optional[Sequence[str]] = None
+    ) -> Union[List[FeatureDistrictYear], List[tuple]]:
+        """Получить все значения для признака (columns — проекция, см. get_list)"""
+        return cls.get_list(
+            filter_func=lambda v: v.feature.name == feature_name,
+            order_by_func=lambda v: (v.year.year, v.district.name),
+            columns=columns
+        )
 
     @classmethod
     @db_session
@@ -74,26 +80,59 @@ class FeatureDistrictYearRepository(BaseRepository[FeatureDistrictYear]):
         feature_name: Optional[str] = None,
         district_name: Optional[str] = None,
         year: Optional[int] = None,
-        exclude_null: bool = False
-    ) -> List[FeatureDistrictYear]:
-        """Получить значения с фильтрацией по параметрам"""
-        query = select(v for v in FeatureDistrictYear)
+        exclude_null: bool = False,
+        columns: Optional[Sequence[str]] = None
+    ) -> Union[List[FeatureDistrictYear], List[tuple]]:
+        """Получить значения с фильтрацией по параметрам (columns — проекция, см. get_list)"""
+        return cls.get_list(
+            filter_func=cls._value_filters(feature_name, district_name, year, exclude_null),
+            order_by_func=lambda v: (v.year.year, v.district.name, v.feature.name),
+            columns=columns
+        )
+
+    @classmethod
+    def iter_with_filter(
+        cls,
+        feature_name: Optional[str] = None,
+        district_name: Optional[str] = None,
+        year: Optional[int] = None,
+        exclude_null: bool = False,
+        columns: Sequence[str] = ('id', 'feature.name', 'district.name', 'year.year', 'value'),
+        page_size: int = DEFAULT_PAGE_SIZE
+    ) -> Iterator[tuple]:
+        """
+        Перебрать значения с фильтрацией постранично в порядке id
+
+        В отличие от get_with_filter, память ограничена размером страницы.
+        """
+        return cls.iterate(
+            filter_func=cls._value_filters(feature_name, district_name, year, exclude_null),
+            columns=columns,
+            page_size=page_size
+        )
+
+    @staticmethod
+    def _value_filters(
+        feature_name: Optional[str],
+        district_name: Optional[str],
+        year: Optional[int],
+        exclude_null: bool
+    ) -> List[Callable]:
+        filters = []
 
         if feature_name:
-            query = query.filter(lambda v: v.feature.name == feature_name)
+            filters.append(lambda v: v.feature.name == feature_name)
 
         if district_name:
-            query = query.filter(lambda v: v.district.name == district_name)
+            filters.append(lambda v: v.district.name == district_name)
 
         if year:
-            query = query.filter(lambda v: v.year.year == year)
+            filters.append(lambda v: v.year.year == year)
 
         if exclude_null:
-            query = query.filter(lambda v: v.value is not None)
+            filters.append(lambda v: v.value is not None)
 
-        return query.order_by(
-            lambda v: (v.year.year, v.district.name, v.feature.name)
-        )[:]
+        return filters
 
     @classmethod
     @db_session
@@ -132,3 +171,108 @@ class FeatureDistrictYearRepository(BaseRepository[FeatureDistrictYear]):
             document=document,
             value=value
         )
+
+    @classmethod
+    @db_session
+    def bulk_create_or_get(
+        cls,
+        values: Iterable[Sequence],
+        document: Optional[Document] = None,
+        update: bool = False
+    ) -> int:
+        """
+        Пакетный create_or_get
+
+        Args:
+            values: Кортежи (feature, district, year, value); связи —
+                сущности или их ID
+            document: Документ-источник значений
+            update: Обновлять значение и документ существующих записей
+                (иначе существующие записи не меняются)
+
+        Returns: Количество созданных (и обновлённых при update) записей
+        """
+        return cls.bulk_upsert(
+            (tuple(row) + (document,) for row in values),
+            fields=['feature', 'district', 'year', 'value', 'document'],
+            update_fields=['value', 'document'] if update else []
+        )
+
+    @classmethod
+    @db_session
+    def sync_year(
+        cls,
+        year: Year,
+        values: Iterable[Sequence],
+        document: Optional[Document] = None
+    ) -> Dict[str, int]:
+        """
+        Привести значения года к присланной матрице, записав только изменения
+
+        Хранимые значения года читаются одной проекцией и сравниваются
+        с присланными одним слиянием по (feature, district): новые ячейки
+        вставляются, изменившиеся обновляются, отсутствующие в матрице
+        удаляются. Значения сравниваются с точностью хранения (scale поля).
+
+        Args:
+            year: Год (сущность или ID)
+            values: Кортежи (feature, district, value); связи — сущности или их ID
+            document: Документ-источник для вставленных и обновлённых записей
+
+        Returns: {'inserted', 'updated', 'deleted', 'unchanged'}
+        """
+        # Новые год, признаки и районы должны получить ID до сравнения
+        db.flush()
+        year_id = year.id if isinstance(year, Year) else year
+        document_id = document.id if document is not None else None
+        scale = FeatureDistrictYear.value.converters[0].scale
+
+        incoming = pd.DataFrame(
+            [(getattr(f, 'id', f), getattr(d, 'id', d), value) for f, d, value in values],
+            columns=['feature', 'district', 'value']
+        )
+        incoming['value'] = pd.to_numeric(incoming['value']).astype('float64').round(scale)
+        # Повтор признака в листе: побеждает последняя строка, как при upsert
+        incoming = incoming.drop_duplicates(['feature', 'district'], keep='last')
+
+        stored = pd.DataFrame(cls.get_list(
+            filter_func=lambda v: v.year.id == year_id,
+            columns=['id', 'feature.id', 'district.id', 'value'],
+            as_numpy=True
+        ))
+        stored.columns = ['id', 'feature', 'district', 'value']
+        stored = stored.astype({'id': 'int64', 'feature': 'int64', 'district': 'int64', 'value': 'float64'})
+        incoming = incoming.astype({'feature': 'int64', 'district': 'int64'})
+
+        merged = incoming.merge(
+            stored, on=['feature', 'district'], how='outer', suffixes=('', '_stored'), indicator=True
+        )
+        new = merged[merged['_merge'] == 'left_only']
+        gone = merged[merged['_merge'] == 'right_only']
+        both = merged[merged['_merge'] == 'both']
+        same = (both['value'] == both['value_stored']) | (both['value'].isna() & both['value_stored'].isna())
+        changed = both[~same]
+
+        if len(new):
+            cls.bulk_create(
+                ((int(f), int(d), year_id, v, document_id)
+                 for f, d, v in zip(new['feature'], new['district'], new['value'])),
+                fields=['feature', 'district', 'year', 'value', 'document']
+            )
+        if len(changed):
+            cls.bulk_update(
+                ((int(i), v, document_id) for i, v in zip(changed['id'], changed['value'])),
+                fields=['id', 'value', 'document']
+            )
+        deleted = 0
+        gone_ids = [int(i) for i in gone['id']]
+        for start in range(0, len(gone_ids), DEFAULT_CHUNK_SIZE):
+            chunk = gone_ids[start:start + DEFAULT_CHUNK_SIZE]
+            deleted += cls.bulk_delete(lambda v: v.id in chunk)
+
+        return {
+            'inserted': len(new),
+            'updated': len(changed),
+            'deleted': deleted,
+            'unchanged': int(np.count_nonzero(same))
+        }
@@ -0,0 +1,21 @@
+"""Репозиторий для работы с финансовыми расходами"""
+
+from typing import List
+from pony.orm import db_session
+from models.entities import FinancialExpenses
+from .base_repository import BaseRepository
+
+
+class FinancialExpensesRepository(BaseRepository[FinancialExpenses]):
+    """Репозиторий для работы с финансовыми расходами"""
+
+    entity_class = FinancialExpenses
+
+    @classmethod
+    @db_session
+    def get_by_year(cls, year: int) -> List[FinancialExpenses]:
+        """Получить расходы за год"""
+        return cls.get_list(
+            filter_func=lambda e: e.year.year == year,
+            order_by_func=lambda e: (e.district.name, e.name)
+        )
@@ -0,0 +1,34 @@
+"""Репозиторий для работы с населением"""
+
+from typing import Iterable, Tuple
+from pony.orm import db_session
+from models.entities import Population
+from utils.db import DEFAULT_CHUNK_SIZE, execute_sql, param_placeholder
+from .base_repository import BaseRepository
+
+
+class PopulationRepository(BaseRepository[Population]):
+    """Репозиторий для работы с населением"""
+
+    entity_class = Population
+
+    @classmethod
+    @db_session
+    def delete_cells(cls, cells: Iterable[Tuple[int, int]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+        """
+        Удалить население по парам (district_id, year_id) пачками
+
+        Returns: Количество удалённых записей
+        """
+        cells = list(cells)
+        p = param_placeholder()
+        deleted = 0
+        for start in range(0, len(cells), chunk_size):
+            chunk = cells[start:start + chunk_size]
+            values = ', '.join(f'({p}, {p})' for _ in chunk)
+            cursor = execute_sql(
+                f'DELETE FROM "{Population._table_}" WHERE ("district", "year") IN (VALUES {values})',
+                [value for cell in chunk for value in cell]
+            )
+            deleted += max(cursor.rowcount, 0)
+        return deleted
@@ -1,18 +1,72 @@
 import os
+import threading
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.tree import plot_tree
 from datetime import datetime
+from types import SimpleNamespace
 from pony.orm import db_session, commit, desc
 from models.entities import AnalysisResult, CrimeType
 from services.crime_line_analysis_service import CrimeLineAnalysisService
+from utils.instrumentation import timed_job
+
+_ml_stack = None
+_ml_stack_lock = threading.Lock()
+_preload_thread = None
+
+
+def _load_ml_stack() -> SimpleNamespace:
+    """
+    Импортировать sklearn и matplotlib при первом обращении
+
+    Тяжёлый ML-стек не загружается вместе с модулем, поэтому процессы,
+    обслуживающие только карту или население, его не импортируют.
+    """
+    global _ml_stack
+    if _ml_stack is not None:
+        return _ml_stack
+
+    with _ml_stack_lock:
+        if _ml_stack is None:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+            from sklearn.ensemble import RandomForestRegressor
+            from sklearn.tree import plot_tree
+
+            _ml_stack = SimpleNamespace(
+                plt=plt,
+                RandomForestRegressor=RandomForestRegressor,
+                plot_tree=plot_tree
+            )
+    return _ml_stack
+
 
 class AnalysisService:
 
+    @staticmethod
+    def is_ml_stack_loaded() -> bool:
+        """Загружен ли ML-стек в текущем процессе"""
+        return _ml_stack is not None
+
+    @staticmethod
+    def preload_in_background() -> threading.Thread:
+        """
+        Прогреть ML-стек в фоновом потоке (повторные вызовы не создают новый поток)
+
+        Вызывается после того, как сервер начал принимать запросы,
+        чтобы первый запуск анализа не платил за импорт sklearn/matplotlib.
+        """
+        global _preload_thread
+        with _ml_stack_lock:
+            if _preload_thread is None:
+                _preload_thread = threading.Thread(
+                    target=_load_ml_stack,
+                    name='analysis-preload',
+                    daemon=True
+                )
+                _preload_thread.start()
+        return _preload_thread
+
     @staticmethod
     def get_available_files():
         """Получить список Excel файлов из папки files"""
@@ -24,6 +78,7 @@ class AnalysisService:
         return sorted(excel_files)
 
     @staticmethod
+    @timed_job('run_analysis')
     def run_analysis(filename):
         """Запустить анализ Random Forest на выбранном файле"""
         filepath = os.path.join('files', filename)
@@ -40,7 +95,8 @@ class AnalysisService:
         X = data.drop(columns=["Уровень преступности"])
         y = data["Уровень преступности"]
 
-        forest = RandomForestRegressor(n_estimators=100, random_state=0)
+        ml = _load_ml_stack()
+        forest = ml.RandomForestRegressor(n_estimators=100, random_state=0)
         forest.fit(X, y)
 
         importance_forest = pd.Series(forest.feature_importances_, index=X.columns)
@@ -57,21 +113,21 @@ class AnalysisService:
         importance_plot_path = os.path.join(plot_dir, f'importance_{timestamp}.png')
         tree_plot_path = os.path.join(plot_dir, f'tree_{timestamp}.png')
 
-        plt.figure(figsize=(10, 6))
+        ml.plt.figure(figsize=(10, 6))
         importance_forest.sort_values().plot(kind="barh", color="skyblue")
-        plt.title("Важность факторов, влияющих на уровень преступности")
-        plt.xlabel("Значимость")
-        plt.ylabel("Показатели")
-        plt.tight_layout()
-        plt.savefig(importance_plot_path, dpi=100, bbox_inches='tight')
-        plt.close()
-
-        plt.figure(figsize=(20, 10))
-        plot_tree(forest.estimators_[0], feature_names=X.columns, filled=True, rounded=True)
-        plt.title("Дерево решений (первое из ансамбля)")
-        plt.tight_layout()
-        plt.savefig(tree_plot_path, dpi=100, bbox_inches='tight')
-        plt.close()
+        ml.plt.title("Важность факторов, влияющих на уровень преступности")
+        ml.plt.xlabel("Значимость")
+        ml.plt.ylabel("Показатели")
+        ml.plt.tight_layout()
+        ml.plt.savefig(importance_plot_path, dpi=100, bbox_inches='tight')
+        ml.plt.close()
+
+        ml.plt.figure(figsize=(20, 10))
+        ml.plot_tree(forest.estimators_[0], feature_names=X.columns, filled=True, rounded=True)
+        ml.plt.title("Дерево решений (первое из ансамбля)")
+        ml.plt.tight_layout()
+        ml.plt.savefig(tree_plot_path, dpi=100, bbox_inches='tight')
+        ml.plt.close()
 
         most_important = importance_df.iloc[0]["Показатель"]
 
@@ -85,6 +141,7 @@ class AnalysisService:
         }
 
     @staticmethod
+    @timed_job('run_analysis')
     @db_session
     def run_analysis_from_db(crime_type_id: int):
         """Запустить анализ Random Forest на данных из БД"""
@@ -103,7 +160,8 @@ class AnalysisService:
         if len(X.columns) == 0:
             raise ValueError("Не выбраны финансовые показатели для анализа")
 
-        forest = RandomForestRegressor(n_estimators=100, random_state=0)
+        ml = _load_ml_stack()
+        forest = ml.RandomForestRegressor(n_estimators=100, random_state=0)
         forest.fit(X, y)
 
         importance_forest = pd.Series(forest.feature_importances_, index=X.columns)
@@ -120,21 +178,21 @@ class AnalysisService:
         importance_plot_path = os.path.join(plot_dir, f'importance_{timestamp}.png')
         tree_plot_path = os.path.join(plot_dir, f'tree_{timestamp}.png')
 
-        plt.figure(figsize=(10, 6))
+        ml.plt.figure(figsize=(10, 6))
         importance_forest.sort_values().plot(kind="barh", color="skyblue")
-        plt.title("Важность факторов, влияющих на уровень преступности")
-        plt.xlabel("Значимость")
-        plt.ylabel("Показатели")
-        plt.tight_layout()
-        plt.savefig(importance_plot_path, dpi=100, bbox_inches='tight')
-        plt.close()
-
-        plt.figure(figsize=(20, 10))
-        plot_tree(forest.estimators_[0], feature_names=X.columns, filled=True, rounded=True)
-        plt.title("Дерево решений (первое из ансамбля)")
-        plt.tight_layout()
-        plt.savefig(tree_plot_path, dpi=100, bbox_inches='tight')
-        plt.close()
+        ml.plt.title("Важность факторов, влияющих на уровень преступности")
+        ml.plt.xlabel("Значимость")
+        ml.plt.ylabel("Показатели")
+        ml.plt.tight_layout()
+        ml.plt.savefig(importance_plot_path, dpi=100, bbox_inches='tight')
+        ml.plt.close()
+
+        ml.plt.figure(figsize=(20, 10))
+        ml.plot_tree(forest.estimators_[0], feature_names=X.columns, filled=True, rounded=True)
+        ml.plt.title("Дерево решений (первое из ансамбля)")
+        ml.plt.tight_layout()
+        ml.plt.savefig(tree_plot_path, dpi=100, bbox_inches='tight')
+        ml.plt.close()
 
         most_important = importance_df.iloc[0]["Показатель"]
 
@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from pony.orm import db_session, select
+from models.entities import DataVersion, District, Year, Feature
+from utils.db import execute_sql, fetch_all, param_placeholder
+
+
+class CacheService:
+    """
+    Кэш производных данных процесса (справочники, сетки для страниц)
+
+    Каждая запись хранится вместе с версией данных, на которой она была
+    построена. Версия лежит в БД (таблица data_version), поэтому изменение
+    данных в одном воркере инвалидирует кэши во всех остальных.
+    """
+
+    _entries: Dict[str, Tuple[int, Any]] = {}
+    _loaders: Dict[str, Callable[[], Any]] = {}
+    _lock = threading.Lock()
+    _warm = False
+
+    @staticmethod
+    @db_session
+    def data_version() -> int:
+        """Текущая версия данных"""
+        # Мимо identity map: bump_version меняет строку SQL запросом
+        rows = fetch_all(f'SELECT "version" FROM "{DataVersion._table_}" WHERE "id" = 1')
+        return rows[0][0] if rows else 0
+
+    @staticmethod
+    @db_session
+    def bump_version() -> int:
+        """
+        Увеличить версию данных
+
+        Вызывается внутри транзакции, изменившей данные, чтобы новая версия
+        стала видна другим процессам вместе с самими изменениями. Строка
+        создаётся и увеличивается одним upsert: параллельные первые записи
+        не конфликтуют по первичному ключу.
+        """
+        p = param_placeholder()
+        table = DataVersion._table_
+        now = DataVersion.updated_at.converters[0].py2sql(datetime.now())
+        cursor = execute_sql(
+            f'INSERT INTO "{table}" ("id", "version", "updated_at") VALUES (1, 1, {p}) '
+            f'ON CONFLICT ("id") DO UPDATE SET "version" = "{table}"."version" + 1, '
+            f'"updated_at" = excluded."updated_at" '
+            f'RETURNING "version"',
+            [now]
+        )
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def get_or_load(key: str, loader: Callable[[], Any], version: Optional[int] = None) -> Any:
+        """
+        Получить значение из кэша или построить его заново
+
+        Args:
+            key: Ключ записи
+            loader: Функция построения значения (вызывается при промахе)
+            version: Версия данных (если уже известна вызывающему коду)
+        """
+        if version is None:
+            version = CacheService.data_version()
+
+        entry = CacheService._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        value = loader()
+        with CacheService._lock:
+            CacheService._entries[key] = (version, value)
+        return value
+
+    @staticmethod
+    def register(key: str, loader: Callable[[], Any]) -> None:
+        """Зарегистрировать запись, которую нужно строить при прогреве"""
+        CacheService._loaders[key] = loader
+
+    @staticmethod
+    def get(key: str) -> Any:
+        """Получить зарегистрированную запись (см. register)"""
+        return CacheService.get_or_load(key, CacheService._loaders[key])
+
+    @staticmethod
+    def invalidate(key: Optional[str] = None) -> None:
+        """Сбросить одну запись или весь кэш"""
+        with CacheService._lock:
+            if key is None:
+                CacheService._entries.clear()
+                CacheService._warm = False
+            else:
+                CacheService._entries.pop(key, None)
+
+    @staticmethod
+    def dimensions() -> Dict[str, Dict[int, Any]]:
+        """Справочники {id: значение} для районов, годов и признаков"""
+        return CacheService.get_or_load('dimensions', CacheService._load_dimensions)
+
+    @staticmethod
+    @db_session
+    def _load_dimensions() -> Dict[str, Dict[int, Any]]:
+        return {
+            'districts': dict(select((d.id, d.name) for d in District)[:]),
+            'years': dict(select((y.id, y.year) for y in Year)[:]),
+            'features': dict(select((f.id, f.name) for f in Feature)[:])
+        }
+
+    @staticmethod
+    def warm() -> int:
+        """
+        Построить все кэши заранее (например, в мастер-процессе до fork)
+
+        Returns: Версия данных, на которой построены кэши
+        """
+        version = CacheService.data_version()
+        CacheService.get_or_load('dimensions', CacheService._load_dimensions, version)
+        for key, loader in list(CacheService._loaders.items()):
+            CacheService.get_or_load(key, loader, version)
+        CacheService._warm = True
+        return version
+
+    @staticmethod
+    def is_warm() -> bool:
+        """Были ли кэши прогреты"""
+        return CacheService._warm
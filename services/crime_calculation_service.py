@@ -1,6 +1,8 @@
 from decimal import Decimal
-from pony.orm import db_session, select, commit
+from pony.orm import db_session, select
 from models.entities import District, Year, Population, FeatureDistrictYear, CrimeStatistics
+from services.cache_service import CacheService
+from utils.instrumentation import timed_job
 
 
 class CrimeCalculationService:
@@ -10,6 +12,9 @@ class CrimeCalculationService:
         """
         Вычислить уровень преступности для всех районов за год
 
+        Работает в сессии вызывающего: фиксацию и увеличение версии
+        данных выполняет он после всей своей работы.
+
         Returns:
             dict: {district_id: normalized_value}
         """
@@ -59,6 +64,7 @@ class CrimeCalculationService:
         return {district_id: float(data['normalized']) for district_id, data in normalized.items()}
 
     @staticmethod
+    @timed_job('calculate_crime_level')
     @db_session
     def calculate_all_years() -> dict:
         """Вычислить для всех годов где есть данные"""
@@ -68,6 +74,7 @@ class CrimeCalculationService:
         for year in years:
             results[year.year] = CrimeCalculationService.calculate_for_year(year.year)
 
+        CacheService.bump_version()
         return results
 
     @staticmethod
@@ -126,8 +133,6 @@ class CrimeCalculationService:
                 normalized=normalized
             )
 
-        commit()
-
     @staticmethod
     @db_session
     def get_crime_data_for_map() -> dict:
@@ -136,13 +141,11 @@ class CrimeCalculationService:
         """
         result = {}
 
-        for stat in list(select(s for s in CrimeStatistics)):
-            year_value = stat.year.year
-            district_id = stat.district.id
-
+        rows = select((s.year.year, s.district.id, s.normalized) for s in CrimeStatistics)
+        for year_value, district_id, normalized in rows:
             if year_value not in result:
                 result[year_value] = {}
 
-            result[year_value][district_id] = float(stat.normalized)
+            result[year_value][district_id] = float(normalized)
 
         return result
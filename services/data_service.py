@@ -1,17 +1,31 @@
 import pandas as pd
 import re
 from decimal import Decimal
-from pony.orm import db_session, commit
-from typing import Dict, Optional, Tuple
-from models.entities import Feature, District, Year, FeatureDistrictYear, Document, FinancialExpenses, CrimeType
-from models.excel_enum import ExcelFileType
+from pony.orm import db_session, commit, rollback
+from typing import Dict, Iterator, Optional, Tuple
+from models.entities import Feature, Year, Document
+from models import queries
+from models.excel_enum import ExcelFileType, LoadMode, DocumentStatus
 from repositories import (
     FeatureRepository,
     DistrictRepository,
     YearRepository,
     DocumentRepository,
-    FeatureDistrictYearRepository
+    FeatureDistrictYearRepository,
+    CrimeTypeRepository,
+    FinancialExpensesRepository
 )
+from services.cache_service import CacheService
+from services.crime_calculation_service import CrimeCalculationService
+from settings import settings
+from utils.db import DEFAULT_CHUNK_SIZE
+from utils.instrumentation import timed_job
+
+# "Линия преступлений (Признак)": группа 1 — линия, группа 2 — признак
+FEATURE_NAME_PATTERN = r'^(.+?)\s*\((.+?)\)\s*$'
+
+# Район общих (не разбитых по районам) финансовых расходов
+FINANCIAL_DEFAULT_DISTRICT = 'ПМР'
 
 
 class DataService:
@@ -19,28 +33,123 @@ class DataService:
 
     @staticmethod
     @db_session
-    def create_document(filename: str, file_path: str, file_type: ExcelFileType) -> Document:
-        """Создать запись о документе в БД"""
+    def create_document(
+        filename: str,
+        file_path: str,
+        file_type: ExcelFileType,
+        content_hash: Optional[str] = None,
+        part_year: Optional[int] = None
+    ) -> Document:
+        """Создать запись о документе в БД (статус LOADING до окончания загрузки)"""
         document = Document(
             filename=filename,
             file_path=file_path,
-            file_type=file_type.value
+            file_type=file_type.value,
+            content_hash=content_hash,
+            part_year=part_year,
+            status=DocumentStatus.LOADING.value
         )
         commit()
         return document
 
     @staticmethod
     @db_session
-    def load_full_data(file_path: str, document_id: Optional[int] = None) -> Dict[str, int]:
+    def mark_document_failed(document_id: int) -> None:
+        """Отметить прерванную ошибкой загрузку; зафиксированные листы сохраняются"""
+        document = Document.get(id=document_id)
+        if document:
+            document.status = DocumentStatus.FAILED.value
+            # Зафиксированные листы уже в базе: кэши должны их увидеть
+            CacheService.bump_version()
+
+    @staticmethod
+    @db_session
+    def find_unfinished_document(content_hash: str) -> Optional[Dict]:
+        """
+        Найти прерванную ошибкой загрузку файла с тем же содержимым
+
+        Перед продолжением документ нужно захватить через claim_document.
+
+        Returns: {'id', 'filename', 'file_path', 'last_sheet'} или None
+        """
+        document = DocumentRepository.get_unfinished_by_content_hash(content_hash)
+        if not document:
+            return None
+        return {
+            'id': document.id,
+            'filename': document.filename,
+            'file_path': document.file_path,
+            'last_sheet': document.last_sheet
+        }
+
+    @staticmethod
+    @db_session
+    def claim_document(document_id: int) -> bool:
+        """Захватить прерванную загрузку для продолжения (FAILED → LOADING)"""
+        claimed = DocumentRepository.claim_failed(document_id)
+        commit()
+        return claimed
+
+    @staticmethod
+    @db_session
+    def find_ingested_document(
+        content_hash: str,
+        file_type: ExcelFileType = ExcelFileType.FULL,
+        part_year: Optional[int] = None
+    ) -> Optional[Dict]:
+        """
+        Найти документ, уже загруженный из файла с тем же содержимым,
+        в том же формате и (для PART) за тот же год
+
+        Returns: {'id', 'filename', 'file_path', 'created_at', 'stats'} или None
+        """
+        document = DocumentRepository.get_by_content_hash(content_hash, file_type.value, part_year)
+        if not document:
+            return None
+        return {
+            'id': document.id,
+            'filename': document.filename,
+            'file_path': document.file_path,
+            'created_at': document.created_at,
+            'stats': DocumentRepository.get_stats(document.id)
+        }
+
+    @staticmethod
+    @timed_job('load_full_data')
+    @db_session
+    def load_full_data(
+        file_path: str,
+        document_id: Optional[int] = None,
+        content_hash: Optional[str] = None,
+        mode: LoadMode = LoadMode.APPEND,
+        chunk_rows: Optional[int] = None
+    ) -> Dict[str, int]:
         """
         Загрузить FULL формат: каждый лист = год, столбцы = районы, строки = признаки
 
         Args:
             file_path: Путь к Excel файлу
             document_id: ID документа в БД (опционально)
-
-        Returns: Статистика загрузки
+            content_hash: SHA-256 файла; сохраняется в документе вместе
+                с отметкой об успешной загрузке
+            mode: APPEND — добавить только отсутствующие значения;
+                DELTA — привести годы из файла к его содержимому, записав
+                только изменённые ячейки, и пересчитать уровень
+                преступности для затронутых лет
+            chunk_rows: Фиксировать транзакцию каждые chunk_rows значений
+                (только APPEND; по умолчанию settings.ingest_chunk_rows,
+                0 — после каждого листа)
+
+        Загрузка фиксируется по частям, после каждого листа в документе
+        запоминается last_sheet. Повторный вызов для документа со статусом
+        LOADING/FAILED продолжает загрузку со следующего листа.
+
+        Returns: Статистика загрузки (для DELTA также inserted, updated,
+            deleted и recalculated_years; при продолжении — skipped_sheets)
         """
+        mode = LoadMode(mode)
+        if chunk_rows is None:
+            chunk_rows = settings.ingest_chunk_rows
         # Получить объект документа по ID внутри транзакции
         document = Document.get(id=document_id) if document_id else None
 
@@ -52,8 +161,22 @@ class DataService:
             'years': 0,
             'values': 0
         }
-
-        for sheet_name in excel_file.sheet_names:
+        if mode == LoadMode.DELTA:
+            stats.update({'inserted': 0, 'updated': 0, 'deleted': 0, 'recalculated_years': 0})
+        changed_years = []
+
+        sheet_names = list(excel_file.sheet_names)
+        if document and document.last_sheet in sheet_names and document.status != DocumentStatus.LOADED.value:
+            # Продолжение прерванной загрузки: зафиксированные листы пропускаются
+            skipped = sheet_names[:sheet_names.index(document.last_sheet) + 1]
+            sheet_names = sheet_names[len(skipped):]
+            stats['skipped_sheets'] = len(skipped)
+            print(f"✓ Продолжение загрузки после листа '{document.last_sheet}'")
+            if mode == LoadMode.DELTA:
+                # Какие из них изменились, не сохранялось — пересчитать все
+                changed_years.extend(int(name) for name in skipped if name.isdigit())
+
+        for sheet_name in sheet_names:
             try:
                 year_value = int(sheet_name)
             except ValueError:
@@ -69,41 +192,105 @@ class DataService:
                 continue
 
             districts = DataService._process_districts(df, stats)
+            values = []
 
-            for _, row in df.iterrows():
-                feature_name = row[feature_column]
-                if pd.isna(feature_name) or str(feature_name).strip() == '':
-                    continue
-
-                feature_name_str = str(feature_name).strip()
-                skip_names = ['СУММА', 'НАСЕЛЕНИЕ', 'НОРМИРОВКА', 'сумма', 'население', 'нормировка']
-                if feature_name_str in skip_names:
-                    continue
-
-                feature = DataService._process_feature(feature_name_str, stats)
-
-                for col_name, district in districts.items():
-                    value = row[col_name]
-                    DataService._create_feature_value(
-                        feature=feature,
-                        district=district,
-                        year=year_obj,
-                        value=value,
-                        document=document,
-                        stats=stats
-                    )
+            for value in DataService._iter_sheet_values(df, feature_column, districts, year_obj, stats):
+                values.append(value)
 
-            print(f"✓ Загружен год {year_value} из листа '{sheet_name}'")
+                # DELTA сверяет год целиком, поэтому фиксирует только по листам
+                if mode == LoadMode.APPEND and chunk_rows and len(values) >= chunk_rows:
+                    stats['values'] += FeatureDistrictYearRepository.bulk_create_or_get(values, document=document)
+                    values = []
+                    document = DataService._commit_chunk(document_id)
 
+            if mode == LoadMode.DELTA:
+                delta = FeatureDistrictYearRepository.sync_year(
+                    year_obj, ((f, d, v) for f, d, _, v in values), document=document
+                )
+                for key in ('inserted', 'updated', 'deleted'):
+                    stats[key] += delta[key]
+                stats['values'] += delta['inserted'] + delta['updated']
+                if delta['inserted'] or delta['updated'] or delta['deleted']:
+                    changed_years.append(year_value)
+                print(f"✓ Год {year_value} из листа '{sheet_name}': +{delta['inserted']} "
+                      f"~{delta['updated']} -{delta['deleted']}, без изменений {delta['unchanged']}")
+            else:
+                # Существующие значения не перезаписываются
+                stats['values'] += FeatureDistrictYearRepository.bulk_create_or_get(values, document=document)
+                print(f"✓ Загружен год {year_value} из листа '{sheet_name}'")
+
+            document = DataService._commit_chunk(document_id, last_sheet=sheet_name)
+
+        # Уровень преступности зависит только от значений своего года
+        for year_value in changed_years:
+            CrimeCalculationService.calculate_for_year(year_value)
+        if mode == LoadMode.DELTA:
+            stats['recalculated_years'] = len(changed_years)
+
+        if document:
+            if content_hash:
+                document.content_hash = content_hash
+            document.status = DocumentStatus.LOADED.value
+        CacheService.bump_version()
         commit()
         return stats
 
+    @staticmethod
+    def _iter_sheet_values(
+        df: pd.DataFrame,
+        feature_column: str,
+        districts: Dict,
+        year_obj: Year,
+        stats: Dict
+    ) -> Iterator[tuple]:
+        """Значения листа (feature, district, year, value); служебные строки пропускаются"""
+        skip_names = ['СУММА', 'НАСЕЛЕНИЕ', 'НОРМИРОВКА', 'сумма', 'население', 'нормировка']
+
+        for _, row in df.iterrows():
+            feature_name = row[feature_column]
+            if pd.isna(feature_name) or str(feature_name).strip() == '':
+                continue
+
+            feature_name_str = str(feature_name).strip()
+            if feature_name_str in skip_names:
+                continue
+
+            feature = DataService._process_feature(feature_name_str, stats)
+
+            for col_name, district in districts.items():
+                yield (feature, district, year_obj, row[col_name])
+
+    @staticmethod
+    def _commit_chunk(document_id: Optional[int], last_sheet: Optional[str] = None) -> Optional[Document]:
+        """
+        Зафиксировать часть загрузки и очистить identity map
+
+        Значения пишутся пакетно мимо кэша сессии, а созданные признаки,
+        районы и годы после фиксации больше не нужны: сброс кэша держит
+        память постоянной на файлах любого размера.
+
+        Версия данных здесь не увеличивается: её поднимает окончание
+        загрузки (или ошибка), иначе кэши воркеров перестраивались бы
+        после каждого листа.
+
+        Args:
+            document_id: ID документа загрузки (опционально)
+            last_sheet: Полностью загруженный лист — точка продолжения
+
+        Returns: Документ, заново загруженный в очищенную сессию
+        """
+        if document_id and last_sheet:
+            Document[document_id].last_sheet = last_sheet
+        commit()
+        # После commit откатывать нечего: rollback только сбрасывает кэш сессии
+        rollback()
+        return Document.get(id=document_id) if document_id else None
+
     @staticmethod
     def _process_year(year_value: int, stats: Dict) -> Year:
-        """Создать или получить год из БД"""
-        year_obj = Year.get(year=year_value)
-        if not year_obj:
-            year_obj = Year(year=year_value)
+        """Создать или получить год из БД (безопасно при параллельных загрузках)"""
+        year_obj, created = YearRepository.get_or_create(year=year_value)
+        if created:
             stats['years'] += 1
         return year_obj
 
@@ -130,10 +317,8 @@ class DataService:
             if isinstance(col, str) and col.startswith('Unnamed'):
                 continue
 
-            district_name = str(col)
-            district = District.get(name=district_name)
-            if not district:
-                district = District(name=district_name)
+            district, created = DistrictRepository.get_or_create(name=str(col))
+            if created:
                 stats['districts'] += 1
             districts[col] = district
 
@@ -147,7 +332,7 @@ class DataService:
 
         Returns: (crime_type_name, feature_name)
         """
-        match = re.match(r'^(.+?)\s*\((.+?)\)\s*$', full_name.strip())
+        match = re.match(FEATURE_NAME_PATTERN, full_name.strip())
         if match:
             crime_type_name = match.group(1).strip()
             feature_name = match.group(2).strip()
@@ -162,14 +347,14 @@ class DataService:
 
         crime_type = None
         if crime_type_name:
-            crime_type = CrimeType.get(name=crime_type_name)
-            if not crime_type:
-                crime_type = CrimeType(name=crime_type_name)
+            crime_type, created = CrimeTypeRepository.get_or_create(name=crime_type_name)
+            if created:
                 print(f"  + Создана линия преступлений: {crime_type_name}")
 
-        feature = Feature.get(name=parsed_feature_name)
-        if not feature:
-            feature = Feature(name=parsed_feature_name, crime_type=crime_type)
+        feature, created = FeatureRepository.get_or_create(
+            defaults={'crime_type': crime_type}, name=parsed_feature_name
+        )
+        if created:
             stats['features'] += 1
         elif crime_type and not feature.crime_type:
             feature.crime_type = crime_type
@@ -177,39 +362,65 @@ class DataService:
         return feature
 
     @staticmethod
-    def _create_feature_value(
-        feature: Feature,
-        district: District,
-        year: Year,
-        value: any,
-        document: Optional[Document],
-        stats: Dict
-    ) -> None:
-        """Создать запись feature-district-year если не существует"""
-        decimal_value = Decimal(str(value)) if pd.notna(value) else None
-
-        existing = FeatureDistrictYear.get(
-            feature=feature,
-            district=district,
-            year=year
-        )
+    @timed_job('load_part_data')
+    @db_session
+    def load_part_data(
+        file_path: str,
+        year: int,
+        document_id: Optional[int] = None,
+        content_hash: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Загрузить PART формат: данные одного года, столбцы = районы, строки = признаки
+
+        Берётся лист с названием года, иначе первый лист. Значения только
+        добавляются (существующие не перезаписываются), уровень преступности
+        пересчитывается только для этого года.
+
+        Args:
+            file_path: Путь к Excel файлу
+            year: Год данных
+            document_id: ID документа в БД (опционально)
+            content_hash: SHA-256 файла, сохраняется в документе
 
-        if not existing:
-            FeatureDistrictYear(
-                feature=feature,
-                district=district,
-                year=year,
-                document=document,
-                value=decimal_value
-            )
-            stats['values'] += 1
+        Returns: Статистика загрузки
+        """
+        document = Document.get(id=document_id) if document_id else None
 
+        excel_file = pd.ExcelFile(file_path)
+        sheet_name = str(year) if str(year) in excel_file.sheet_names else excel_file.sheet_names[0]
 
-    @staticmethod
-    @db_session
-    def load_part_data(file_path: str, year: int) -> Dict[str, int]:
-        """Загрузить PART формат (будет реализовано позже)"""
-        raise NotImplementedError("Метод load_part_data() будет реализован позже")
+        stats = {
+            'features': 0,
+            'districts': 0,
+            'years': 0,
+            'values': 0
+        }
+
+        df = pd.read_excel(file_path, sheet_name=sheet_name)
+        feature_column = DataService._find_feature_column(df)
+        if not feature_column:
+            raise ValueError(f"В листе '{sheet_name}' не найдена колонка с признаками")
+
+        year_obj = DataService._process_year(year, stats)
+        districts = DataService._process_districts(df, stats)
+        # Список, а не генератор: признаки должны быть созданы до пакетной вставки
+        values = list(DataService._iter_sheet_values(df, feature_column, districts, year_obj, stats))
+
+        stats['values'] = FeatureDistrictYearRepository.bulk_create_or_get(values, document=document)
+        print(f"✓ Загружен год {year} из листа '{sheet_name}'")
+
+        document = DataService._commit_chunk(document_id, last_sheet=sheet_name)
+        if stats['values']:
+            CrimeCalculationService.calculate_for_year(year)
+
+        if document:
+            if content_hash:
+                document.content_hash = content_hash
+            document.status = DocumentStatus.LOADED.value
+        CacheService.bump_version()
+        commit()
+        return stats
 
     @staticmethod
     @db_session
@@ -219,24 +430,18 @@ class DataService:
         exclude_null: bool = True
     ) -> pd.DataFrame:
         """Извлечь данные из БД в формате DataFrame"""
-        from models.queries import get_values_with_filter
-
-        values = get_values_with_filter(
+        values = queries.get_values_with_filter(
             year=year,
             district_name=district,
             exclude_null=exclude_null
         )
 
-        data = []
-        for v in values:
-            data.append({
-                'признак': v.feature.name,
-                'район': v.district.name,
-                'год': v.year.year,
-                'значение': float(v.value) if v.value else None
-            })
-
-        return pd.DataFrame(data)
+        return pd.DataFrame({
+            'признак': values['feature'],
+            'район': values['district'],
+            'год': values['year'],
+            'значение': values['value']
+        })
 
     @staticmethod
     @db_session
@@ -246,139 +451,164 @@ class DataService:
         values: str = 'значение',
         year: Optional[int] = None
     ) -> pd.DataFrame:
-        """Получить сводную таблицу"""
-        df = DataService.get_data_for_analysis(year=year, exclude_null=False)
-
-        if df.empty:
-            return pd.DataFrame()
-
-        pivot = df.pivot_table(
-            index=index,
-            columns=columns,
-            values=values,
-            aggfunc='first'
-        )
-
+        """Получить сводную таблицу (при повторе пары index × columns берётся первое непустое значение)"""
+        names = {'признак': 'feature', 'район': 'district', 'год': 'year'}
+        if values != 'значение' or index not in names or columns not in names:
+            # Прочие сочетания колонок — через pivot_table, как раньше
+            df = DataService.get_data_for_analysis(year=year, exclude_null=False)
+            if df.empty:
+                return pd.DataFrame()
+            return df.pivot_table(index=index, columns=columns, values=values, aggfunc='first')
+
+        pivot = queries.get_pivot_table(index=names[index], columns=names[columns], year=year)
+        if not pivot.empty:
+            pivot.index.name = index
+            pivot.columns.name = columns
         return pivot
 
     @staticmethod
-    def parse_financial_expenses_from_excel(file_path: str) -> list:
+    @timed_job('parse_financial_expenses')
+    def parse_financial_expenses_from_excel(file_path: str, district_sheets: bool = False) -> pd.DataFrame:
         """
         Парсит Excel файл с финансовыми расходами
         Формат: первая колонка - показатели, остальные - годы
-        Возвращает список словарей [{name: str, year: int, amount: float}, ...]
-        """
-        df = pd.read_excel(file_path)
 
-        year_columns = []
-        for col in df.columns:
-            if col != 'ПОКАЗАТЕЛЬ' and not str(col).startswith('Unnamed'):
-                try:
-                    year_int = int(col)
-                    year_columns.append(year_int)
-                except (ValueError, TypeError):
-                    pass
+        По умолчанию читается первый лист — расходы ПМР. С district_sheets
+        читаются все листы, название листа — район (лист 'ПМР' — общие
+        расходы); листы с неизвестными районами отклоняются. Колонка РАЙОН,
+        если есть, задаёт район построчно.
 
-        if not year_columns:
+        Args:
+            file_path: Путь к файлу
+            district_sheets: Листы файла — расходы по районам
+
+        Returns: DataFrame с колонками district, name, year, amount
+            (одна строка на ячейку показатель × год, пустые ячейки отброшены)
+        """
+        if not district_sheets:
+            sheets = {FINANCIAL_DEFAULT_DISTRICT: pd.read_excel(file_path)}
+        else:
+            sheets = {str(name).strip(): df for name, df in pd.read_excel(file_path, sheet_name=None).items()}
+            known = {name for name, in DistrictRepository.get_list(columns=['name'])} | {FINANCIAL_DEFAULT_DISTRICT}
+            unknown = [name for name in sheets if name not in known]
+            if unknown:
+                raise ValueError(f"Листы не соответствуют известным районам: {', '.join(unknown)}")
+
+        frames = [DataService._melt_expenses_sheet(df, name) for name, df in sheets.items()]
+        frames = [frame for frame in frames if frame is not None]
+        if not frames:
             raise ValueError("Не найдены колонки с годами")
 
-        expenses = []
+        return pd.concat(frames, ignore_index=True)
 
-        for _, row in df.iterrows():
-            indicator_name = row.get('ПОКАЗАТЕЛЬ')
-            if pd.isna(indicator_name) or str(indicator_name).strip() == '':
-                continue
+    @staticmethod
+    def _melt_expenses_sheet(df: pd.DataFrame, district: str) -> Optional[pd.DataFrame]:
+        """Лист расходов в длинный формат; None, если в листе нет показателей или годов"""
+        if 'ПОКАЗАТЕЛЬ' not in df.columns:
+            return None
+
+        # Заголовки-годы: числа или строки с числом ('2020', 2020, 2020.0)
+        labels = pd.Series(df.columns, dtype=object)
+        years = pd.to_numeric(labels.astype(str).str.strip(), errors='coerce')
+        is_year = years.notna() & (years % 1 == 0) & ~labels.astype(str).str.startswith('Unnamed')
+        year_columns = dict(zip(labels[is_year], years[is_year].astype(int)))
+        if not year_columns:
+            return None
 
-            indicator_name = str(indicator_name).strip()
+        id_columns = ['ПОКАЗАТЕЛЬ'] + (['РАЙОН'] if 'РАЙОН' in df.columns else [])
+        long = df[id_columns + list(year_columns)].melt(id_vars=id_columns, var_name='year', value_name='amount')
 
-            for year in year_columns:
-                value = row[year]
-                if pd.notna(value):
-                    try:
-                        amount = float(value)
-                        expenses.append({
-                            'name': indicator_name,
-                            'year': year,
-                            'amount': amount
-                        })
-                    except (ValueError, TypeError):
-                        pass
+        long['name'] = long['ПОКАЗАТЕЛЬ'].astype(str).str.strip()
+        long['amount'] = pd.to_numeric(long['amount'], errors='coerce')
+        long = long[long['ПОКАЗАТЕЛЬ'].notna() & (long['name'] != '') & long['amount'].notna()]
+
+        long['year'] = long['year'].map(year_columns).astype(int)
+        if 'РАЙОН' in long.columns:
+            long['district'] = long['РАЙОН'].astype(object).where(long['РАЙОН'].notna(), district)
+            long['district'] = long['district'].astype(str).str.strip()
+        else:
+            long['district'] = district
 
-        return expenses
+        return long[['district', 'name', 'year', 'amount']]
 
     @staticmethod
+    @timed_job('load_financial_expenses')
     @db_session
-    def load_financial_expenses(expenses: list) -> Dict[str, int]:
+    def load_financial_expenses(expenses) -> Dict[str, int]:
         """
-        Загружает финансовые расходы в БД
-        Принимает список словарей [{name: str, year: int, amount: float}, ...]
+        Загружает финансовые расходы в БД одним пакетным upsert
+
+        Принимает DataFrame parse_financial_expenses_from_excel или список
+        словарей [{name: str, year: int, amount: float, district?: str}, ...]
+        (без района — ПМР). Районы и годы создаются пакетно, суммы
+        существующих записей (район, год, показатель) обновляются,
+        отметка include_in_analysis сохраняется.
         """
-        stats = {
-            'districts': 0,
-            'years': 0,
-            'records': 0
-        }
+        df = pd.DataFrame(expenses, columns=['district', 'name', 'year', 'amount'])
+        df['district'] = df['district'].fillna(FINANCIAL_DEFAULT_DISTRICT)
 
-        pmr_district = District.get(name='ПМР')
-        if not pmr_district:
-            pmr_district = District(name='ПМР')
-            stats['districts'] += 1
-
-        for expense in expenses:
-            year_obj = Year.get(year=expense['year'])
-            if not year_obj:
-                year_obj = Year(year=expense['year'])
-                stats['years'] += 1
-
-            existing = FinancialExpenses.get(
-                district=pmr_district,
-                year=year_obj,
-                name=expense['name']
-            )
-            if not existing:
-                FinancialExpenses(
-                    district=pmr_district,
-                    year=year_obj,
-                    name=expense['name'],
-                    amount=expense['amount'],
-                    include_in_analysis=True
-                )
-                stats['records'] += 1
+        district_ids, districts_created = DistrictRepository.get_ids_or_create('name', df['district'])
+        year_ids, years_created = YearRepository.get_ids_or_create('year', df['year'])
 
+        records = FinancialExpensesRepository.bulk_upsert(
+            zip(df['district'].map(district_ids), df['year'].map(year_ids), df['name'], df['amount']),
+            fields=['district', 'year', 'name', 'amount'],
+            update_fields=['amount']
+        )
+
+        CacheService.bump_version()
         commit()
-        return stats
+        return {
+            'districts': districts_created,
+            'years': years_created,
+            'records': records
+        }
 
     @staticmethod
-    @db_session
-    def update_existing_features_with_crime_types() -> Dict[str, int]:
+    @timed_job('update_crime_types')
+    def update_existing_features_with_crime_types(chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, int]:
         """
         Обновить существующие признаки, добавив к ним линии преступлений
         Используется для обновления уже загруженных данных
+
+        Признаки без линии читаются страницами по chunk_size (id, name),
+        линии извлекаются из названий векторно, недостающие линии
+        вставляются пакетом, признаки обновляются одним UPDATE на страницу.
+        Каждая страница — отдельная транзакция: таблица не блокируется
+        на всё время обновления, прерванный запуск можно повторить.
         """
         stats = {
             'updated': 0,
             'crime_types_created': 0
         }
 
-        features = list(Feature.select())
-        crime_types_cache = {}
-
-        for feature in features:
-            crime_type_name, parsed_feature_name = DataService._parse_feature_name(feature.name)
-
-            if crime_type_name:
-                if crime_type_name not in crime_types_cache:
-                    crime_type = CrimeType.get(name=crime_type_name)
-                    if not crime_type:
-                        crime_type = CrimeType(name=crime_type_name)
-                        stats['crime_types_created'] += 1
-                    crime_types_cache[crime_type_name] = crime_type
-                else:
-                    crime_type = crime_types_cache[crime_type_name]
+        cursor = None
+        while True:
+            with db_session:
+                page = FeatureRepository.get_page(
+                    filter_func=lambda f: f.crime_type is None,
+                    columns=['id', 'name'],
+                    limit=chunk_size,
+                    cursor=cursor
+                )
+                if not page.items:
+                    break
+
+                features = pd.DataFrame(page.items, columns=['id', 'name'])
+                features['crime_type'] = features['name'].str.strip().str.extract(FEATURE_NAME_PATTERN)[0].str.strip()
+                features = features.dropna(subset=['crime_type'])
+
+                if not features.empty:
+                    crime_type_ids, created = CrimeTypeRepository.get_ids_or_create('name', features['crime_type'])
+                    stats['crime_types_created'] += created
+                    stats['updated'] += FeatureRepository.bulk_update(
+                        zip(features['id'].tolist(), features['crime_type'].map(crime_type_ids).tolist()),
+                        fields=['id', 'crime_type']
+                    )
+                    CacheService.bump_version()
 
-                if not feature.crime_type:
-                    feature.crime_type = crime_type
-                    stats['updated'] += 1
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
 
-        commit()
         return stats
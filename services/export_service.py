@@ -0,0 +1,159 @@
+"""Потоковая выгрузка значений признак-район-год"""
+
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import Iterator, List, Optional, Tuple
+from pony.orm import db_session
+from models.queries import VALUE_COLUMNS, build_values_query
+from utils.db import DEFAULT_CHUNK_SIZE, stream_query
+
+EXPORT_COLUMNS = VALUE_COLUMNS
+
+
+class _ChunkSink(io.RawIOBase):
+    """Файл-приёмник для ParquetWriter: накапливает байты до выдачи клиенту"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+class ExportService:
+    """Сервис выгрузки значений признаков в CSV, JSON Lines и Parquet"""
+
+    # Формат → MIME тип ответа
+    FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'jsonl': 'application/x-ndjson; charset=utf-8',
+        'parquet': 'application/vnd.apache.parquet',
+    }
+
+    @staticmethod
+    def parquet_available() -> bool:
+        """Установлен ли pyarrow (необязательная зависимость)"""
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    @staticmethod
+    def build_query(
+        feature: Optional[str] = None,
+        district: Optional[str] = None,
+        year: Optional[int] = None
+    ) -> Tuple[str, list]:
+        """SQL выгрузки с параметрами фильтров"""
+        return build_values_query(year=year, district_name=district, feature_name=feature)
+
+    @staticmethod
+    def iter_rows(
+        feature: Optional[str] = None,
+        district: Optional[str] = None,
+        year: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[List[tuple]]:
+        """
+        Строки выгрузки пачками (year, district, feature, crime_type, value)
+
+        Генератор открывает собственный db_session: в потоковом ответе
+        он выполняется уже после завершения обработчика запроса.
+        """
+        sql, params = ExportService.build_query(feature, district, year)
+        with db_session:
+            for rows in stream_query(sql, params, chunk_size):
+                yield [
+                    (year_value, district_name, feature_name, crime_type,
+                     float(value) if isinstance(value, Decimal) else value)
+                    for year_value, district_name, feature_name, crime_type, value in rows
+                ]
+
+    @staticmethod
+    def stream(export_format: str, chunk_size: int = DEFAULT_CHUNK_SIZE, **filters) -> Iterator[bytes]:
+        """
+        Выгрузка в формате export_format частями по chunk_size строк
+
+        Args:
+            export_format: csv, jsonl или parquet
+            chunk_size: Строк в одной части ответа (и в группе строк Parquet)
+            **filters: feature, district, year
+        """
+        chunks = ExportService.iter_rows(chunk_size=chunk_size, **filters)
+        if export_format == 'csv':
+            return ExportService._encode_csv(chunks)
+        if export_format == 'jsonl':
+            return ExportService._encode_jsonl(chunks)
+        if export_format == 'parquet':
+            return ExportService._encode_parquet(chunks)
+        raise ValueError(f"Неподдерживаемый формат выгрузки: {export_format}")
+
+    @staticmethod
+    def _encode_csv(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM, чтобы Excel открыл кириллицу в UTF-8
+        buffer.write('\ufeff')
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _encode_jsonl(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+        for rows in chunks:
+            yield ''.join(
+                json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+                for row in rows
+            ).encode('utf-8')
+
+    @staticmethod
+    def _encode_parquet(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ('year', pa.int32()),
+            ('district', pa.string()),
+            ('feature', pa.string()),
+            ('crime_type', pa.string()),
+            ('value', pa.float64()),
+        ])
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            for rows in chunks:
+                # Каждая пачка — отдельная группа строк Parquet
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)],
+                    schema=schema
+                ))
+                data = sink.drain()
+                if data:
+                    yield data
+        finally:
+            writer.close()
+        yield sink.drain()
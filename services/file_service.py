@@ -1,9 +1,14 @@
+import hashlib
 import os
 import re
+import uuid
 from datetime import datetime
 from werkzeug.datastructures import FileStorage
 from settings import settings
 
+# Размер блока при сохранении и хешировании загруженного файла
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class FileService:
     """Сервис для работы с файлами"""
@@ -32,16 +37,32 @@ class FileService:
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in settings.allowed_extensions_set
 
     @staticmethod
-    def save_uploaded_file(file: FileStorage) -> tuple[str, str]:
+    def save_uploaded_file(file: FileStorage) -> tuple[str, str, str]:
         """
-        Сохранить загруженный файл на диск
+        Сохранить загруженный файл на диск, считая SHA-256 по мере записи
+
+        Файл сохраняется под уникальным именем: другой файл с тем же именем
+        не перезапишет файл, с которого продолжится прерванная загрузка.
 
-        Returns: (filename, filepath)
+        Returns: (filename, filepath, content_hash)
         """
         filename = FileService.safe_filename(file.filename)
-        filepath = os.path.join(settings.upload_folder, filename)
+        filepath = os.path.join(
+            settings.upload_folder,
+            f'{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}_{filename}'
+        )
 
         os.makedirs(settings.upload_folder, exist_ok=True)
-        file.save(filepath)
+        sha256 = hashlib.sha256()
+        with open(filepath, 'wb') as f:
+            for chunk in iter(lambda: file.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+                f.write(chunk)
 
-        return filename, filepath
+        return filename, filepath, sha256.hexdigest()
+
+    @staticmethod
+    def remove_file(filepath: str) -> None:
+        """Удалить файл, если он существует"""
+        if os.path.exists(filepath):
+            os.remove(filepath)
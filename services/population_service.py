@@ -0,0 +1,163 @@
+"""Пакетное редактирование и импорт населения районов"""
+
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from pony.orm import db_session, select
+from models.entities import District, Year
+from repositories import DistrictRepository, YearRepository, PopulationRepository
+from services.cache_service import CacheService
+from services.crime_calculation_service import CrimeCalculationService
+from utils.instrumentation import timed_job
+
+# (district_id, year_id, value); value None — удалить значение
+Cell = Tuple[int, int, Optional[int]]
+
+
+class PopulationService:
+    """Сервис пакетного сохранения населения"""
+
+    @staticmethod
+    def cells_from_payload(data: dict) -> List[Cell]:
+        """
+        Ячейки из JSON запроса /api/population/batch
+
+        Поддерживаются два вида:
+            {"cells": [{"district_id": 1, "year_id": 2, "value": 1000}, ...]}
+            {"district_ids": [1, 2], "year_ids": [5, 6], "values": [[...], [...]]}
+        Во втором values[i][j] — население района district_ids[i] в году
+        year_ids[j]. null в значении удаляет ячейку.
+        """
+        if not isinstance(data, dict):
+            raise ValueError('Ожидается JSON объект')
+
+        if 'cells' in data:
+            try:
+                return [(cell['district_id'], cell['year_id'], cell.get('value')) for cell in data['cells']]
+            except (KeyError, TypeError, AttributeError):
+                raise ValueError('Каждая ячейка должна содержать district_id, year_id и value')
+
+        district_ids = data.get('district_ids') or []
+        year_ids = data.get('year_ids') or []
+        values = data.get('values') or []
+        if len(values) != len(district_ids) or any(len(row) != len(year_ids) for row in values):
+            raise ValueError('Размер values должен быть district_ids × year_ids')
+        return [
+            (district_id, year_id, value)
+            for district_id, row in zip(district_ids, values)
+            for year_id, value in zip(year_ids, row)
+        ]
+
+    @staticmethod
+    @timed_job('population_batch')
+    @db_session
+    def save_batch(cells: List[Cell]) -> Dict[str, int]:
+        """
+        Сохранить ячейки населения одной транзакцией
+
+        Значения записываются одним пакетным upsert по (district, year),
+        пустые значения удаляются одним DELETE. Уровень преступности
+        пересчитывается только для затронутых лет.
+
+        Returns: {'saved', 'deleted', 'recalculated_years'}
+        """
+        cells = PopulationService._validate(cells)
+        if not cells:
+            return {'saved': 0, 'deleted': 0, 'recalculated_years': 0}
+
+        saved = PopulationRepository.bulk_upsert(
+            [cell for cell in cells if cell[2] is not None],
+            fields=['district', 'year', 'value']
+        )
+        deleted = PopulationRepository.delete_cells((d, y) for d, y, value in cells if value is None)
+
+        year_ids = sorted({year_id for _, year_id, _ in cells})
+        touched_years = select(y.year for y in Year if y.id in year_ids)[:]
+
+        for year_value in touched_years:
+            CrimeCalculationService.calculate_for_year(year_value)
+        CacheService.bump_version()
+
+        return {'saved': saved, 'deleted': deleted, 'recalculated_years': len(touched_years)}
+
+    @staticmethod
+    def _validate(cells: List[Cell]) -> List[Cell]:
+        """Проверить ID и значения; при повторе ячейки остаётся последнее значение"""
+        result = {}
+        for district_id, year_id, value in cells:
+            if value is not None:
+                if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                    raise ValueError(f'Некорректное значение населения: {value}')
+                if isinstance(value, float) and not value.is_integer():
+                    raise ValueError(f'Население должно быть целым числом: {value}')
+                try:
+                    value = int(value)
+                except (ValueError, OverflowError):
+                    raise ValueError(f'Некорректное значение населения: {value}')
+                if value < 0:
+                    raise ValueError('Население не может быть отрицательным')
+            try:
+                result[(int(district_id), int(year_id))] = value
+            except (TypeError, ValueError):
+                raise ValueError('district_id и year_id должны быть числами')
+
+        district_ids = sorted({d for d, _ in result})
+        year_ids = sorted({y for _, y in result})
+        if select(d for d in District if d.id in district_ids).count() != len(district_ids) or \
+                select(y for y in Year if y.id in year_ids).count() != len(year_ids):
+            raise LookupError('Район или год не найден')
+
+        return [(d, y, value) for (d, y), value in result.items()]
+
+    @staticmethod
+    def parse_population_excel(file_path: str) -> pd.DataFrame:
+        """
+        Разобрать Excel с населением: строки — районы, столбцы — годы
+
+        Районы берутся из колонки РАЙОН (иначе из первой колонки).
+
+        Returns: DataFrame с колонками district, year, value
+        """
+        df = pd.read_excel(file_path)
+        district_column = 'РАЙОН' if 'РАЙОН' in df.columns else df.columns[0]
+
+        labels = pd.Series(df.columns, dtype=object)
+        years = pd.to_numeric(labels.astype(str).str.strip(), errors='coerce')
+        is_year = years.notna() & (years % 1 == 0) & (labels != district_column)
+        year_columns = dict(zip(labels[is_year], years[is_year].astype(int)))
+        if not year_columns:
+            raise ValueError('Не найдены колонки с годами')
+
+        long = df[[district_column] + list(year_columns)].melt(
+            id_vars=[district_column], var_name='year', value_name='value'
+        )
+        long['district'] = long[district_column].astype(str).str.strip()
+        long['value'] = pd.to_numeric(long['value'], errors='coerce')
+        long = long[long[district_column].notna() & (long['district'] != '') & long['value'].notna()]
+        long['year'] = long['year'].map(year_columns).astype(int)
+        long['value'] = long['value'].round().astype(int)
+
+        return long[['district', 'year', 'value']]
+
+    @staticmethod
+    @timed_job('population_import')
+    @db_session
+    def import_from_excel(file_path: str) -> Dict[str, int]:
+        """
+        Импортировать сетку населения из Excel
+
+        Недостающие районы и годы создаются пакетно, значения сохраняются
+        через save_batch (пустые ячейки файла существующие данные не удаляют).
+
+        Returns: {'districts', 'years', 'saved', 'deleted', 'recalculated_years'}
+        """
+        df = PopulationService.parse_population_excel(file_path)
+
+        district_ids, districts_created = DistrictRepository.get_ids_or_create('name', df['district'])
+        year_ids, years_created = YearRepository.get_ids_or_create('year', df['year'])
+
+        stats = PopulationService.save_batch(list(zip(
+            df['district'].map(district_ids).tolist(),
+            df['year'].map(year_ids).tolist(),
+            df['value'].tolist()
+        )))
+        return dict(stats, districts=districts_created, years=years_created)
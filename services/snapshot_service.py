@@ -0,0 +1,200 @@
+"""Снимок данных в Parquet: перенос справочников и фактов между окружениями"""
+
+import json
+import os
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List
+from pony.orm import db_session
+from models.entities import (
+    db, CrimeType, Feature, District, Year, FeatureDistrictYear, Population,
+    FinancialExpenses, CrimeStatistics, AnalysisResult, Document
+)
+from services.cache_service import CacheService
+from utils.db import bulk_copy, execute_sql, param_placeholder, reset_sequence, stream_query
+from utils.instrumentation import timed_job
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+# Порядок загрузки: справочники раньше фактов, которые на них ссылаются
+SNAPSHOT_ENTITIES = [
+    CrimeType, Feature, District, Year,
+    FeatureDistrictYear, Population, FinancialExpenses, CrimeStatistics, AnalysisResult,
+]
+
+# Порядок очистки перед загрузкой: сначала ссылающиеся таблицы
+CLEAR_ORDER = [
+    AnalysisResult, CrimeStatistics, FinancialExpenses, Population, FeatureDistrictYear,
+    Feature, CrimeType, District, Year,
+]
+
+# Поля, которые не переносятся: документы ссылаются на файлы конкретного окружения,
+# поэтому при импорте их отпечатки сбрасываются (см. _detach_documents)
+EXCLUDED_FIELDS = {
+    FeatureDistrictYear: {'document'},
+}
+
+ROW_GROUP_SIZE = 50000
+
+
+class SnapshotService:
+    """Сервис экспорта и импорта снимка данных (требует pyarrow)"""
+
+    @staticmethod
+    @timed_job('snapshot_export')
+    @db_session
+    def export_snapshot(directory: str, compression: str = 'zstd') -> Dict[str, int]:
+        """
+        Выгрузить справочники и факты в <directory>/<таблица>.parquet
+
+        Таблицы читаются курсором группами по ROW_GROUP_SIZE строк,
+        id сохраняются, чтобы связи восстановились без пересчёта.
+
+        Returns: Количество строк по таблицам
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(directory, exist_ok=True)
+        started = time.perf_counter()
+        stats = {}
+
+        for entity in SNAPSHOT_ENTITIES:
+            attrs = SnapshotService._attrs(entity)
+            schema = pa.schema([(attr.columns[0], SnapshotService._arrow_type(attr)) for attr in attrs])
+            converters = [attr.converters[0] for attr in attrs]
+            column_list = ', '.join(f'"{attr.columns[0]}"' for attr in attrs)
+            sql = f'SELECT {column_list} FROM "{entity._table_}" ORDER BY "id"'
+
+            path = os.path.join(directory, f'{entity._table_}.parquet')
+            rows_written = 0
+            with pq.ParquetWriter(path, schema, compression=compression) as writer:
+                for rows in stream_query(sql, (), ROW_GROUP_SIZE):
+                    columns = [
+                        [None if value is None else converter.sql2py(value) for value in column]
+                        for column, converter in zip(zip(*rows), converters)
+                    ]
+                    writer.write_table(pa.Table.from_arrays(
+                        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                        schema=schema
+                    ))
+                    rows_written += len(rows)
+
+            stats[entity._table_] = rows_written
+            print(f"✓ {entity._table_}: {rows_written} строк")
+
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'provider': db.provider_name,
+            'tables': stats
+        }
+        with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        print(f"✓ Снимок сохранён в {directory} за {time.perf_counter() - started:.2f} с")
+        return stats
+
+    @staticmethod
+    @timed_job('snapshot_import')
+    @db_session
+    def import_snapshot(directory: str, replace: bool = True) -> Dict[str, int]:
+        """
+        Загрузить снимок export_snapshot одной транзакцией
+
+        Строки загружаются через COPY (PostgreSQL) или пакетный INSERT
+        (SQLite) с исходными id, затем счётчики id продолжаются после
+        максимального значения. Значения в снимке не связаны с документами,
+        поэтому у документов сбрасываются отпечатки содержимого: повторная
+        загрузка того же файла снова запишет его данные.
+
+        Args:
+            directory: Каталог снимка
+            replace: Предварительно очистить таблицы снимка. Без replace
+                таблицы должны быть пустыми
+
+        Returns: Количество строк по таблицам
+        """
+        import pyarrow.parquet as pq
+
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"Не найден {MANIFEST_FILE} в {directory}")
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия снимка: {manifest.get('format_version')}")
+
+        started = time.perf_counter()
+        if replace:
+            SnapshotService._clear_tables()
+
+        SnapshotService._detach_documents()
+
+        stats = {}
+        for entity in SNAPSHOT_ENTITIES:
+            if entity._table_ not in manifest['tables']:
+                # Таблица появилась в снимке позже, чем он был сделан
+                continue
+            path = os.path.join(directory, f'{entity._table_}.parquet')
+            attrs = {attr.columns[0]: attr for attr in SnapshotService._attrs(entity)}
+            parquet_file = pq.ParquetFile(path)
+            columns = [name for name in parquet_file.schema_arrow.names if name in attrs]
+            converters = [attrs[name].converters[0] for name in columns]
+
+            def rows():
+                for batch in parquet_file.iter_batches(batch_size=ROW_GROUP_SIZE, columns=columns):
+                    values = [
+                        [None if v is None else converter.py2sql(v) for v in column.to_pylist()]
+                        for column, converter in zip(batch.columns, converters)
+                    ]
+                    yield from zip(*values)
+
+            stats[entity._table_] = bulk_copy(entity._table_, columns, rows(), chunk_size=ROW_GROUP_SIZE)
+            reset_sequence(entity._table_)
+            print(f"✓ {entity._table_}: {stats[entity._table_]} строк")
+
+        CacheService.bump_version()
+        print(f"✓ Снимок загружен за {time.perf_counter() - started:.2f} с")
+        return stats
+
+    @staticmethod
+    def _clear_tables() -> None:
+        """Удалить данные снимка в порядке, обратном зависимостям"""
+        for entity in CLEAR_ORDER:
+            execute_sql(f'DELETE FROM "{entity._table_}"')
+
+    @staticmethod
+    def _detach_documents() -> None:
+        """Сбросить отпечатки документов: их значения заменяются снимком"""
+        # Optional(str) в Pony хранит «нет значения» пустой строкой
+        p = param_placeholder()
+        execute_sql(f'UPDATE "{Document._table_}" SET "content_hash" = {p}, "last_sheet" = {p}', ['', ''])
+
+    @staticmethod
+    def _attrs(entity) -> List:
+        excluded = EXCLUDED_FIELDS.get(entity, set())
+        return [attr for attr in entity._attrs_ if not attr.is_collection and attr.name not in excluded]
+
+    @staticmethod
+    def _arrow_type(attr):
+        import pyarrow as pa
+
+        if attr.reverse:
+            return pa.int64()
+        if attr.py_type is bool:
+            return pa.bool_()
+        if attr.py_type is int:
+            return pa.int64()
+        if attr.py_type is float:
+            return pa.float64()
+        if attr.py_type is Decimal:
+            converter = attr.converters[0]
+            return pa.decimal128(converter.precision, converter.scale)
+        if attr.py_type is str:
+            return pa.string()
+        if attr.py_type is datetime:
+            return pa.timestamp('us')
+        raise TypeError(f"Тип {attr.py_type} поля {attr} не поддерживается снимком")
@@ -11,28 +11,48 @@ class Settings(BaseSettings):
         extra='ignore'
     )
 
-    db_provider: str = 'postgres'
-    db_user: str
-    db_password: str
+    db_provider: str = 'postgres'  # postgres | sqlite
+    db_user: str = ''
+    db_password: str = ''
     db_host: str = 'localhost'
     db_port: int = 5432
     db_name: str = 'crime_analysis'
+    sqlite_path: str = 'crime_analysis.sqlite'
 
     secret_key: str
     upload_folder: str = 'files'
     max_content_length: int = 16777216
     allowed_extensions: str = 'xlsx'
 
+    preload_analysis_stack: bool = False
+
+    web_bind: str = '0.0.0.0:5000'
+    web_workers: int = 0  # 0 = 2 * CPU + 1
+    web_threads: int = 4
+    web_timeout: int = 120
+
+    slow_request_ms: int = 1000
+    compress_min_size: int = 1024  # байт; 0 = не сжимать ответы
+
+    ingest_chunk_rows: int = 0  # 0 = фиксировать загрузку после каждого листа
+
     @property
     def database_url(self) -> str:
-        """Строка подключения к PostgreSQL"""
+        """Строка подключения к БД"""
         if self.db_provider == 'postgres':
             return f"postgresql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
+        if self.db_provider == 'sqlite':
+            return f"sqlite:///{self.sqlite_path}"
         return ""
 
     @property
     def db_config(self) -> dict:
         """Конфигурация для Pony ORM"""
+        if self.db_provider == 'sqlite':
+            return {
+                'provider': 'sqlite',
+                'database': self.sqlite_path
+            }
         return {
             'provider': self.db_provider,
             'user': self.db_user,
@@ -0,0 +1,33 @@
+"""
+Снимок данных для переноса между окружениями
+
+    python snapshot.py export snapshots/2024-05-01
+    python snapshot.py import snapshots/2024-05-01
+"""
+
+import argparse
+import utils.db as db
+from services.snapshot_service import SnapshotService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Экспорт и импорт снимка данных в Parquet')
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('directory', help='Каталог снимка')
+    parser.add_argument('--keep', action='store_true', help='Импорт без очистки таблиц (таблицы должны быть пустыми)')
+    args = parser.parse_args()
+
+    db.init_from_env()
+
+    if args.command == 'export':
+        print(f"=== Экспорт снимка в {args.directory} ===\n")
+        stats = SnapshotService.export_snapshot(args.directory)
+    else:
+        print(f"=== Импорт снимка из {args.directory} ===\n")
+        stats = SnapshotService.import_snapshot(args.directory, replace=not args.keep)
+
+    print(f"\nВсего строк: {sum(stats.values())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+// Декодер колоночного формата API (format=columnar): значения матрицы
+// построчно списком (encoding=json, пропуски null) или base64 Float32
+// little-endian (encoding=f32, пропуски NaN)
+function decodeColumnarValues(data) {
+    if (data.encoding !== 'f32') {
+        return data.values;
+    }
+    const binary = atob(data.values);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+        bytes[i] = binary.charCodeAt(i);
+    }
+    const view = new DataView(bytes.buffer);
+    const values = new Array(bytes.length / 4);
+    for (let i = 0; i < values.length; i++) {
+        const value = view.getFloat32(i * 4, true);
+        values[i] = Number.isNaN(value) ? null : value;
+    }
+    return values;
+}
+
+// Строки матрицы rows × columns
+function columnarRows(data, rowCount, columnCount) {
+    const values = decodeColumnarValues(data);
+    const rows = [];
+    for (let i = 0; i < rowCount; i++) {
+        rows.push(values.slice(i * columnCount, (i + 1) * columnCount));
+    }
+    return rows;
+}
@@ -1,4 +1,25 @@
+let pageSize = 100;
+let rowsObserver = null;
+
+// Компактный формат /api/year-data: null — обычный JSON, 'json' или 'f32' —
+// колоночный (f32 меньше по размеру, но хранит около 7 значащих цифр)
+const YEAR_DATA_ENCODING = null;
+
 document.addEventListener('DOMContentLoaded', function() {
+    const tabsContent = document.getElementById('yearsTabsContent');
+    pageSize = parseInt(tabsContent.dataset.pageSize) || pageSize;
+
+    // Следующее окно строк запрашивается, когда низ таблицы подходит к экрану
+    rowsObserver = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                loadMoreRows(entry.target);
+            }
+        });
+    }, {rootMargin: '400px'});
+
+    document.querySelectorAll('.rows-sentinel').forEach(sentinel => observeSentinel(sentinel));
+
     const yearTabs = document.querySelectorAll('#yearsTabs button[data-year]');
 
     yearTabs.forEach(tab => {
@@ -13,14 +34,30 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
-function loadYearData(year, tabPane) {
-    fetch('/api/year-data/' + year)
+function fetchYearWindow(year, offset) {
+    let url = `/api/year-data/${year}?offset=${offset}&limit=${pageSize}`;
+    if (YEAR_DATA_ENCODING) {
+        url += `&format=columnar&encoding=${YEAR_DATA_ENCODING}`;
+    }
+    return fetch(url)
         .then(response => {
             if (!response.ok) {
                 throw new Error('Ошибка загрузки данных');
             }
             return response.json();
         })
+        .then(data => YEAR_DATA_ENCODING ? decodeYearData(data) : data);
+}
+
+// Колоночный ответ в вид {features: [{name, district_values}]}
+function decodeYearData(data) {
+    const rows = columnarRows(data, data.feature_names.length, data.district_names.length);
+    data.features = data.feature_names.map((name, i) => ({name: name, district_values: rows[i]}));
+    return data;
+}
+
+function loadYearData(year, tabPane) {
+    fetchYearWindow(year, 0)
         .then(data => {
             renderYearData(data, tabPane);
             tabPane.setAttribute('data-loaded', 'true');
@@ -35,6 +72,70 @@ function loadYearData(year, tabPane) {
         });
 }
 
+function loadMoreRows(sentinel) {
+    if (sentinel.dataset.loading === 'true' || sentinel.dataset.nextOffset === '') {
+        return;
+    }
+    const tabPane = sentinel.closest('.tab-pane');
+    const year = tabPane.id.replace('year-', '');
+    sentinel.dataset.loading = 'true';
+
+    fetchYearWindow(year, sentinel.dataset.nextOffset)
+        .then(data => {
+            tabPane.querySelector('.year-rows').insertAdjacentHTML('beforeend', renderRows(data.features));
+            setNextOffset(sentinel, data.next_offset);
+        })
+        .catch(error => {
+            // Сторож остаётся видимым с текстом ошибки, но больше не подгружает строки
+            sentinel.innerHTML = `<span class="text-danger">${error.message}</span>`;
+            sentinel.dataset.nextOffset = '';
+            rowsObserver.unobserve(sentinel);
+        })
+        .finally(() => {
+            sentinel.dataset.loading = 'false';
+        });
+}
+
+function setNextOffset(sentinel, nextOffset) {
+    sentinel.dataset.nextOffset = nextOffset === null ? '' : nextOffset;
+    if (nextOffset === null) {
+        sentinel.classList.add('d-none');
+        rowsObserver.unobserve(sentinel);
+    } else {
+        // Сторож мог остаться в зоне видимости: переподписка проверит его снова
+        rowsObserver.unobserve(sentinel);
+        rowsObserver.observe(sentinel);
+    }
+}
+
+function observeSentinel(sentinel) {
+    if (sentinel.dataset.nextOffset !== '') {
+        rowsObserver.observe(sentinel);
+    }
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function renderRows(features) {
+    let html = '';
+    features.forEach(feature => {
+        html += `<tr><td class="fw-bold">${escapeHtml(feature.name)}</td>`;
+        feature.district_values.forEach(value => {
+            if (value !== null) {
+                html += `<td class="text-end">${value.toFixed(2)}</td>`;
+            } else {
+                html += `<td class="text-end"><span class="text-muted">—</span></td>`;
+            }
+        });
+        html += `</tr>`;
+    });
+    return html;
+}
+
 function renderYearData(data, tabPane) {
     let html = `
         <h4 class="mb-3">Год: ${data.year}</h4>
@@ -46,38 +147,31 @@ function renderYearData(data, tabPane) {
     `;
 
     data.district_names.forEach(district => {
-        html += `<th class="text-center align-middle">${district}</th>`;
+        html += `<th class="text-center align-middle">${escapeHtml(district)}</th>`;
     });
 
     html += `
                     </tr>
                 </thead>
-                <tbody>
-    `;
-
-    data.features.forEach(feature => {
-        html += `<tr><td class="fw-bold">${feature.name}</td>`;
-        feature.district_values.forEach(value => {
-            if (value !== null) {
-                html += `<td class="text-end">${value.toFixed(2)}</td>`;
-            } else {
-                html += `<td class="text-end"><span class="text-muted">—</span></td>`;
-            }
-        });
-        html += `</tr>`;
-    });
-
-    html += `
+                <tbody class="year-rows">
+                    ${renderRows(data.features)}
                 </tbody>
             </table>
         </div>
+        <div class="rows-sentinel text-center py-3 ${data.next_offset === null ? 'd-none' : ''}"
+             data-next-offset="${data.next_offset === null ? '' : data.next_offset}">
+            <div class="spinner-border spinner-border-sm text-primary" role="status">
+                <span class="visually-hidden">Загрузка...</span>
+            </div>
+        </div>
         <div class="mt-3 text-muted">
             <small>
-                Признаков: <strong>${data.features.length}</strong> |
+                Признаков: <strong>${data.total}</strong> |
                 Районов: <strong>${data.district_names.length}</strong>
             </small>
         </div>
     `;
 
     tabPane.innerHTML = html;
+    observeSentinel(tabPane.querySelector('.rows-sentinel'));
 }
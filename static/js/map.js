@@ -82,8 +82,31 @@ function loadGeoJSON() {
     return fetch('/static/map.geojson').then(r => r.json());
 }
 
+// Компактный формат /api/crime-data: null — обычный JSON, 'json' или 'f32'
+const CRIME_DATA_ENCODING = null;
+
 function loadCrimeData() {
-    return fetch('/api/crime-data').then(r => r.json());
+    if (!CRIME_DATA_ENCODING) {
+        return fetch('/api/crime-data').then(r => r.json());
+    }
+    return fetch(`/api/crime-data?format=columnar&encoding=${CRIME_DATA_ENCODING}`)
+        .then(r => r.json())
+        .then(decodeCrimeData);
+}
+
+// Колоночный ответ в вид {year: {map_id: value}}
+function decodeCrimeData(data) {
+    const rows = columnarRows(data, data.years.length, data.map_ids.length);
+    const result = {};
+    data.years.forEach((year, i) => {
+        result[year] = {};
+        data.map_ids.forEach((mapId, j) => {
+            if (rows[i][j] !== null) {
+                result[year][mapId] = rows[i][j];
+            }
+        });
+    });
+    return result;
 }
 
 // Инициализация слоя районов
@@ -2,6 +2,10 @@ let currentDistrictId = null;
 let currentYearId = null;
 let currentCell = null;
 let modal = null;
+let gridMode = false;
+
+// Изменённые в режиме таблицы ячейки: "district:year" → {cell, value}
+const pendingChanges = new Map();
 
 document.addEventListener('DOMContentLoaded', function() {
     modal = new bootstrap.Modal(document.getElementById('editModal'));
@@ -9,6 +13,9 @@ document.addEventListener('DOMContentLoaded', function() {
     document.querySelectorAll('.population-cell').forEach(cell => {
         cell.style.cursor = 'pointer';
         cell.addEventListener('click', function() {
+            if (gridMode) {
+                return;
+            }
             currentCell = this;
             currentDistrictId = this.dataset.districtId;
             currentYearId = this.dataset.yearId;
@@ -30,8 +37,108 @@ document.addEventListener('DOMContentLoaded', function() {
 
     document.getElementById('save-btn').addEventListener('click', savePopulation);
     document.getElementById('delete-btn').addEventListener('click', deletePopulation);
+    document.getElementById('grid-mode').addEventListener('change', function() {
+        toggleGridMode(this.checked);
+    });
+    document.getElementById('save-grid-btn').addEventListener('click', saveGrid);
 });
 
+function cellValue(cell) {
+    const text = cell.querySelector('.population-value').textContent.trim();
+    return text === '-' ? '' : text;
+}
+
+function setCellValue(cell, value) {
+    const span = cell.querySelector('.population-value');
+    span.textContent = value === '' || value === null ? '-' : value;
+    span.classList.toggle('text-muted', value === '' || value === null);
+}
+
+function toggleGridMode(enabled) {
+    if (!enabled && pendingChanges.size && !confirm('Отменить несохранённые изменения?')) {
+        document.getElementById('grid-mode').checked = true;
+        return;
+    }
+    gridMode = enabled;
+    pendingChanges.clear();
+    updateChangedCount();
+    document.getElementById('save-grid-btn').classList.toggle('d-none', !enabled);
+
+    document.querySelectorAll('.population-cell').forEach(cell => {
+        const span = cell.querySelector('.population-value');
+        const existing = cell.querySelector('input');
+        if (existing) {
+            existing.remove();
+        }
+        span.classList.toggle('d-none', enabled);
+        cell.style.cursor = enabled ? 'default' : 'pointer';
+        if (!enabled) {
+            return;
+        }
+
+        const input = document.createElement('input');
+        input.type = 'number';
+        input.min = '0';
+        input.step = '1';
+        input.className = 'form-control form-control-sm text-center';
+        input.value = cellValue(cell);
+        input.addEventListener('input', function() {
+            const key = cell.dataset.districtId + ':' + cell.dataset.yearId;
+            if (this.value === cellValue(cell)) {
+                pendingChanges.delete(key);
+                this.classList.remove('border-warning');
+            } else {
+                pendingChanges.set(key, {cell: cell, value: this.value});
+                this.classList.add('border-warning');
+            }
+            updateChangedCount();
+        });
+        cell.appendChild(input);
+    });
+}
+
+function updateChangedCount() {
+    document.getElementById('changed-count').textContent = pendingChanges.size;
+    document.getElementById('save-grid-btn').disabled = pendingChanges.size === 0;
+}
+
+function saveGrid() {
+    // Все изменённые ячейки уходят одним запросом; пустое значение удаляет ячейку
+    const changes = Array.from(pendingChanges.values());
+    const cells = changes.map(change => ({
+        district_id: parseInt(change.cell.dataset.districtId),
+        year_id: parseInt(change.cell.dataset.yearId),
+        value: change.value === '' ? null : parseInt(change.value)
+    }));
+
+    const button = document.getElementById('save-grid-btn');
+    button.disabled = true;
+
+    fetch('/api/population/batch', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({cells: cells})
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            changes.forEach(change => {
+                setCellValue(change.cell, change.value);
+                change.cell.querySelector('input').classList.remove('border-warning');
+            });
+            pendingChanges.clear();
+            updateChangedCount();
+        } else {
+            alert('Ошибка: ' + data.message);
+            updateChangedCount();
+        }
+    })
+    .catch(error => {
+        alert('Ошибка при сохранении: ' + error);
+        updateChangedCount();
+    });
+}
+
 function savePopulation() {
     const value = document.getElementById('population-input').value;
 
@@ -52,8 +159,7 @@ function savePopulation() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            currentCell.querySelector('.population-value').textContent = value;
-            currentCell.querySelector('.population-value').classList.remove('text-muted');
+            setCellValue(currentCell, value);
             modal.hide();
         } else {
             alert('Ошибка: ' + data.message);
@@ -80,8 +186,7 @@ function deletePopulation() {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            currentCell.querySelector('.population-value').textContent = '-';
-            currentCell.querySelector('.population-value').classList.add('text-muted');
+            setCellValue(currentCell, null);
             modal.hide();
         } else {
             alert('Ошибка: ' + data.message);
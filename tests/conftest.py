@@ -0,0 +1,25 @@
+"""Общая настройка тестов"""
+
+import os
+
+# Settings требует обязательные переменные окружения; для тестов достаточно заглушек
+os.environ.setdefault('DB_USER', 'test')
+os.environ.setdefault('DB_PASSWORD', 'test')
+os.environ.setdefault('SECRET_KEY', 'test')
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def sqlite_db():
+    """Пустая in-memory SQLite БД с созданными таблицами"""
+    from models.entities import db
+    from services.cache_service import CacheService
+    from utils.db import init_database
+
+    init_database(provider='sqlite', database=':memory:', create_tables=True)
+    CacheService.invalidate()
+    yield db
+    CacheService.invalidate()
+    db.drop_all_tables(with_all_data=True)
@@ -0,0 +1,59 @@
+"""Тесты фабрики приложения"""
+
+from app import create_app
+from services.analysis_service import AnalysisService
+from settings import settings
+
+
+class TestCreateApp:
+    """Тесты create_app"""
+
+    def test_create_without_db(self):
+        """Приложение создаётся без подключения к БД"""
+        app = create_app({'DB_BIND': False, 'TESTING': True})
+
+        assert app.config['DB_BIND'] is False
+        assert {'main', 'data', 'analysis', 'map', 'population'} <= set(app.blueprints)
+
+    def test_index_page(self):
+        """Главная страница не требует БД"""
+        app = create_app({'DB_BIND': False, 'TESTING': True})
+
+        response = app.test_client().get('/')
+        assert response.status_code == 200
+
+    def test_config_overrides(self):
+        """Переопределения конфигурации применяются поверх settings"""
+        app = create_app({'DB_BIND': False, 'SECRET_KEY': 'override'})
+
+        assert app.config['SECRET_KEY'] == 'override'
+        assert app.config['WARM_CACHES'] is False
+
+    def test_healthz(self):
+        """Проверка живости не требует БД"""
+        app = create_app({'DB_BIND': False, 'TESTING': True})
+
+        response = app.test_client().get('/healthz')
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'ok'
+
+    def test_readyz_without_db(self):
+        """Без подключения к БД приложение не готово"""
+        app = create_app({'DB_BIND': False, 'TESTING': True})
+
+        response = app.test_client().get('/readyz')
+        assert response.status_code == 503
+
+    def test_preload_hook_runs_once(self, monkeypatch):
+        """Хук прогрева ML-стека срабатывает на первом запросе и снимается"""
+        calls = []
+        monkeypatch.setattr(settings, 'preload_analysis_stack', True)
+        monkeypatch.setattr(AnalysisService, 'preload_in_background', staticmethod(lambda: calls.append(1)))
+        app = create_app({'DB_BIND': False, 'TESTING': True})
+
+        client = app.test_client()
+        client.get('/healthz')
+        client.get('/healthz')
+
+        assert calls == [1]
+        assert all(func.__name__ != 'preload_analysis_stack' for func in app.before_request_funcs[None])
@@ -0,0 +1,108 @@
+"""Тесты страницы документов, окон данных года и компактных ответов"""
+
+import base64
+import gzip
+import json
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from pony.orm import db_session
+
+import controllers.data_controller as data_controller
+from app import create_app
+from models.entities import Document, Feature, District, Year, FeatureDistrictYear
+from repositories import DocumentRepository
+from settings import settings
+from utils import compression
+
+
+@pytest.fixture
+def client(sqlite_db):
+    with db_session:
+        document = Document(filename='full.xlsx', file_path='full.xlsx', file_type='full')
+        features = [Feature(name=f'Признак {i}') for i in range(5)]
+        districts = [District(name='Район 1'), District(name='Район 2')]
+        year = Year(year=2020)
+        for i, feature in enumerate(features):
+            FeatureDistrictYear(feature=feature, district=districts[0], year=year, value=Decimal(i), document=document)
+    return create_app({'DB_BIND': False, 'TESTING': True}).test_client()
+
+
+class TestYearDataWindow:
+    """Тесты /api/year-data с offset/limit"""
+
+    def test_windows_cover_all_features(self, client):
+        """Окна идут по порядку признаков, next_offset указывает на следующее"""
+        first = client.get('/api/year-data/2020?offset=0&limit=2').get_json()
+        last = client.get('/api/year-data/2020?offset=4&limit=2').get_json()
+
+        assert [f['name'] for f in first['features']] == ['Признак 0', 'Признак 1']
+        assert (first['total'], first['next_offset']) == (5, 2)
+        assert first['features'][1]['district_values'] == [1.0, None]
+        assert [f['name'] for f in last['features']] == ['Признак 4']
+        assert last['next_offset'] is None
+
+    def test_without_limit(self, client):
+        """Без limit отдаётся весь год"""
+        data = client.get('/api/year-data/2020').get_json()
+
+        assert len(data['features']) == data['total'] == 5
+        assert data['next_offset'] is None
+
+    def test_document_data_by_years(self, client):
+        """get_data_by_years группирует значения документа по годам"""
+        with db_session:
+            document_id = Document.select().first().id
+        data = DocumentRepository.get_data_by_years(document_id)
+
+        year = data['years'][0]
+        assert year['district_names'] == ['Район 1']
+        assert [f['name'] for f in year['features']] == [f'Признак {i}' for i in range(5)]
+        assert year['features'][1]['district_values'] == [1.0]
+
+
+class TestDocumentsPage:
+    """Тесты потоковой страницы документов"""
+
+    def test_first_window_streamed(self, client, monkeypatch):
+        """Страница отдаётся потоком и содержит только первое окно признаков"""
+        monkeypatch.setattr(data_controller, 'DOCUMENTS_PAGE_SIZE', 2)
+
+        response = client.get('/documents?data_type=crime')
+        html = response.get_data(as_text=True)
+
+        assert 'Content-Length' not in response.headers
+        assert 'Признак 1' in html and 'Признак 2' not in html
+        assert 'data-next-offset="2"' in html
+
+
+class TestCompactEncoding:
+    """Тесты колоночного формата и сжатия ответов"""
+
+    def test_columnar_json_and_f32(self, client):
+        """Матрица признаки × районы; f32 декодируется с NaN на месте пропусков"""
+        data = client.get('/api/year-data/2020?format=columnar').get_json()
+
+        assert data['feature_names'][:2] == ['Признак 0', 'Признак 1']
+        assert data['encoding'] == 'json'
+        assert data['values'][:4] == [0.0, None, 1.0, None]
+
+        packed = client.get('/api/year-data/2020?format=columnar&encoding=f32&offset=1&limit=2').get_json()
+        values = np.frombuffer(base64.b64decode(packed['values']), dtype='<f4')
+        assert values[0] == 1.0 and np.isnan(values[1]) and values[2] == 2.0
+        assert packed['next_offset'] == 3
+
+        assert client.get('/api/year-data/2020?encoding=f64').status_code == 400
+
+    def test_gzip(self, client, monkeypatch):
+        """Ответ больше порога сжимается, если клиент принимает gzip"""
+        monkeypatch.setattr(compression, 'brotli', None)
+        monkeypatch.setattr(settings, 'compress_min_size', 10)
+
+        response = client.get('/api/year-data/2020', headers={'Accept-Encoding': 'gzip'})
+        plain = client.get('/api/year-data/2020')
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(response.get_data())) == plain.get_json()
+        assert 'Content-Encoding' not in plain.headers
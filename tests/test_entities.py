@@ -2,9 +2,9 @@
 
 import pytest
 from decimal import Decimal
-from pony.orm import db_session, TransactionIntegrityError
+from pony.orm import db_session, flush, CacheIndexError
 from utils.db import init_database
-from models.entities import Feature, District, Year, FeatureDistrictYear
+from models.entities import db, Feature, District, Year, FeatureDistrictYear
 
 
 @pytest.fixture(scope='function')
@@ -12,6 +12,7 @@ def test_db():
     """Создать in-memory БД для теста"""
     init_database(provider='sqlite', database=':memory:', create_tables=True)
     yield
+    db.drop_all_tables(with_all_data=True)
 
 
 class TestFeature:
@@ -21,6 +22,7 @@ class TestFeature:
     def test_create_feature(self, test_db):
         """Создание признака"""
         feature = Feature(name='Уровень безработицы')
+        flush()
         assert feature.id is not None
         assert feature.name == 'Уровень безработицы'
 
@@ -29,7 +31,7 @@ class TestFeature:
         """Уникальность имени признака"""
         Feature(name='Уровень безработицы')
 
-        with pytest.raises(TransactionIntegrityError):
+        with pytest.raises(CacheIndexError):
             Feature(name='Уровень безработицы')
 
     @db_session
@@ -49,6 +51,7 @@ class TestDistrict:
     def test_create_district(self, test_db):
         """Создание района"""
         district = District(name='пункт 1')
+        flush()
         assert district.id is not None
         assert district.name == 'пункт 1'
 
@@ -57,7 +60,7 @@ class TestDistrict:
         """Уникальность имени района"""
         District(name='пункт 1')
 
-        with pytest.raises(TransactionIntegrityError):
+        with pytest.raises(CacheIndexError):
             District(name='пункт 1')
 
 
@@ -68,6 +71,7 @@ class TestYear:
     def test_create_year(self, test_db):
         """Создание года"""
         year = Year(year=2015)
+        flush()
         assert year.id is not None
         assert year.year == 2015
 
@@ -76,7 +80,7 @@ class TestYear:
         """Уникальность года"""
         Year(year=2015)
 
-        with pytest.raises(TransactionIntegrityError):
+        with pytest.raises(CacheIndexError):
             Year(year=2015)
 
 
@@ -97,6 +101,7 @@ class TestFeatureDistrictYear:
             value=Decimal('7.5')
         )
 
+        flush()
         assert value.id is not None
         assert value.feature.name == 'Уровень безработицы'
         assert value.district.name == 'пункт 1'
@@ -133,7 +138,7 @@ class TestFeatureDistrictYear:
             value=Decimal('7.5')
         )
 
-        with pytest.raises(TransactionIntegrityError):
+        with pytest.raises(CacheIndexError):
             FeatureDistrictYear(
                 feature=feature,
                 district=district,
@@ -156,4 +161,5 @@ class TestFeatureDistrictYear:
         v3 = FeatureDistrictYear(feature=feature2, district=district1, year=year1, value=Decimal('6.5'))
         v4 = FeatureDistrictYear(feature=feature1, district=district1, year=year2, value=Decimal('9.0'))
 
-        assert v1.id != v2.id != v3.id != v4.id
+        flush()
+        assert len({v1.id, v2.id, v3.id, v4.id}) == 4
@@ -0,0 +1,74 @@
+"""Тесты потоковой выгрузки /api/export"""
+
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from pony.orm import db_session
+
+from app import create_app
+from models.entities import Feature, District, Year, FeatureDistrictYear, CrimeType
+from services.export_service import ExportService
+
+
+@pytest.fixture
+def client(sqlite_db):
+    with db_session:
+        crime_type = CrimeType(name='Линия 1')
+        features = [Feature(name='Признак 1', crime_type=crime_type), Feature(name='Признак 2')]
+        districts = [District(name='Район 1'), District(name='Район 2')]
+        for year_value in (2020, 2021):
+            year = Year(year=year_value)
+            for feature in features:
+                for district in districts:
+                    FeatureDistrictYear(feature=feature, district=district, year=year, value=Decimal('1.25'))
+    return create_app({'DB_BIND': False, 'TESTING': True}).test_client()
+
+
+class TestExport:
+    """Тесты /api/export"""
+
+    def test_csv(self, client):
+        """CSV с заголовком, все строки при отсутствии фильтров"""
+        response = client.get('/api/export?format=csv')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True).lstrip('\ufeff'))))
+        assert rows[0] == ['year', 'district', 'feature', 'crime_type', 'value']
+        assert len(rows) == 1 + 8
+        assert rows[1] == ['2020', 'Район 1', 'Признак 1', 'Линия 1', '1.25']
+
+    def test_jsonl_with_filters(self, client):
+        """Фильтры по году и району"""
+        response = client.get('/api/export?format=jsonl&year=2021&district=Район 2')
+
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(lines) == 2
+        assert {line['feature'] for line in lines} == {'Признак 1', 'Признак 2'}
+        assert all(line['year'] == 2021 and line['value'] == 1.25 for line in lines)
+        assert lines[1]['crime_type'] is None
+
+    def test_parquet(self, client):
+        """Parquet читается pyarrow, каждая пачка — группа строк"""
+        pq = pytest.importorskip('pyarrow.parquet')
+        chunks = list(ExportService.stream('parquet', chunk_size=3))
+        table = pq.read_table(io.BytesIO(b''.join(chunks)))
+
+        assert table.num_rows == 8
+        assert pq.ParquetFile(io.BytesIO(b''.join(chunks))).num_row_groups == 3
+        assert table.column('value').to_pylist() == [1.25] * 8
+
+    def test_streams_in_chunks(self, client):
+        """Ответ формируется частями по chunk_size строк"""
+        chunks = list(ExportService.stream('jsonl', chunk_size=3))
+
+        assert [chunk.count(b'\n') for chunk in chunks] == [3, 3, 2]
+
+    def test_unknown_format(self, client):
+        """Неизвестный формат — 400"""
+        response = client.get('/api/export?format=xml')
+
+        assert response.status_code == 400
@@ -0,0 +1,88 @@
+"""Тесты разбора и загрузки финансовых расходов"""
+
+import pandas as pd
+import pytest
+from pony.orm import db_session, count
+from models.entities import District, FinancialExpenses
+from services.data_service import DataService
+
+
+def _write_workbook(path: str, sheets: dict) -> str:
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return path
+
+
+class TestFinancialLoader:
+    """Разбор и загрузка расходов по районам"""
+
+    def test_first_sheet_by_default(self, sqlite_db, tmp_path):
+        """Без district_sheets читается только первый лист — расходы ПМР"""
+        path = _write_workbook(str(tmp_path / 'fin.xlsx'), {
+            'Расходы': pd.DataFrame({'ПОКАЗАТЕЛЬ': ['Связь'], 2020: [1.5]}),
+            'Примечания': pd.DataFrame({'ПОКАЗАТЕЛЬ': ['Источник'], 2020: [1]}),
+        })
+
+        expenses = DataService.parse_financial_expenses_from_excel(path)
+
+        assert expenses.values.tolist() == [['ПМР', 'Связь', 2020, 1.5]]
+
+    def test_sheet_per_district_and_upsert(self, sqlite_db, tmp_path):
+        """Лист на район, колонка РАЙОН; повторная загрузка обновляет суммы"""
+        with db_session:
+            District(name='Район 1')
+            District(name='Район 2')
+        path = _write_workbook(str(tmp_path / 'fin.xlsx'), {
+            'Район 1': pd.DataFrame({'ПОКАЗАТЕЛЬ': ['Связь', 'Транспорт'], 2020: [1.5, None], '2021': [2, 3]}),
+            'ПМР': pd.DataFrame({'ПОКАЗАТЕЛЬ': ['Связь', 'Связь'], 'РАЙОН': ['Район 2', None], 2020: [4, 5]}),
+        })
+
+        expenses = DataService.parse_financial_expenses_from_excel(path, district_sheets=True)
+        assert sorted(map(tuple, expenses.values.tolist())) == sorted([
+            ('Район 1', 'Связь', 2020, 1.5), ('Район 1', 'Связь', 2021, 2.0),
+            ('Район 1', 'Транспорт', 2021, 3.0),
+            ('Район 2', 'Связь', 2020, 4.0), ('ПМР', 'Связь', 2020, 5.0),
+        ])
+
+        assert DataService.load_financial_expenses(expenses) == {'districts': 1, 'years': 2, 'records': 5}
+
+        expenses.loc[0, 'amount'] = 10
+        stats = DataService.load_financial_expenses(expenses)
+        assert (stats['districts'], stats['years']) == (0, 0)
+        with db_session:
+            assert count(fe for fe in FinancialExpenses) == 5
+            assert sum(fe.amount for fe in FinancialExpenses.select()) == 24
+
+    def test_unknown_district_sheet_rejected(self, sqlite_db, tmp_path):
+        """Лист с неизвестным районом не превращается в новый район"""
+        with db_session:
+            District(name='Район 1')
+        path = _write_workbook(str(tmp_path / 'fin.xlsx'), {
+            'Район 1': pd.DataFrame({'ПОКАЗАТЕЛЬ': ['Связь'], 2020: [1.5]}),
+            'Примечания': pd.DataFrame({'ПОКАЗАТЕЛЬ': ['Источник'], 2020: [1]}),
+        })
+
+        with pytest.raises(ValueError, match='Примечания'):
+            DataService.parse_financial_expenses_from_excel(path, district_sheets=True)
+        with db_session:
+            assert count(d for d in District) == 1
+
+    def test_financial_grid(self, sqlite_db):
+        """Сетка показатель × год: суммы районов, пропуски — None"""
+        from controllers.data_controller import get_financial_data
+
+        DataService.load_financial_expenses([
+            {'district': 'Район 1', 'name': 'Связь', 'year': 2020, 'amount': 1.5},
+            {'district': 'Район 2', 'name': 'Связь', 'year': 2020, 'amount': 1.5},
+            {'district': 'ПМР', 'name': 'Связь', 'year': 2021, 'amount': 2},
+            {'district': 'ПМР', 'name': 'Аренда', 'year': 2021, 'amount': 4},
+        ])
+
+        assert get_financial_data() == {
+            'years': [2020, 2021],
+            'indicators': [
+                {'name': 'Аренда', 'year_values': [None, 4.0]},
+                {'name': 'Связь', 'year_values': [3.0, 2.0]},
+            ]
+        }
@@ -0,0 +1,53 @@
+"""Тесты времени импорта приложения"""
+
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджет на импорт всех контроллеров (секунды)
+IMPORT_BUDGET_SECONDS = 3.0
+
+HEAVY_MODULES = ['sklearn', 'matplotlib', 'matplotlib.pyplot']
+
+
+def _import_in_subprocess(module: str) -> dict:
+    """Импортировать модуль в чистом интерпретаторе и вернуть время и список тяжёлых модулей"""
+    code = (
+        'import json, sys, time\n'
+        't = time.perf_counter()\n'
+        f'import {module}\n'
+        'elapsed = time.perf_counter() - t\n'
+        f'heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n'
+        'print(json.dumps({"elapsed": elapsed, "heavy": heavy}))\n'
+    )
+    env = dict(os.environ)
+    env.setdefault('DB_USER', 'test')
+    env.setdefault('DB_PASSWORD', 'test')
+    env.setdefault('SECRET_KEY', 'test')
+
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestImportBudget:
+    """Тесты ленивой загрузки ML-стека"""
+
+    def test_controllers_do_not_import_ml_stack(self):
+        """Импорт контроллеров не тянет sklearn и matplotlib"""
+        result = _import_in_subprocess('controllers')
+        assert result['heavy'] == []
+
+    def test_controllers_import_time(self):
+        """Импорт контроллеров укладывается в бюджет"""
+        result = _import_in_subprocess('controllers')
+        assert result['elapsed'] < IMPORT_BUDGET_SECONDS
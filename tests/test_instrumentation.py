@@ -0,0 +1,61 @@
+"""Тесты измерения запросов и метрик"""
+
+import pytest
+from app import create_app
+from utils.instrumentation import track_job
+from utils.metrics import Histogram, registry
+
+
+@pytest.fixture
+def client():
+    app = create_app({'DB_BIND': False, 'TESTING': True})
+    return app.test_client()
+
+
+class TestRequestInstrumentation:
+    """Тесты middleware"""
+
+    def test_server_timing_header(self, client):
+        """Ответ содержит Server-Timing с временем приложения и БД"""
+        response = client.get('/')
+
+        header = response.headers['Server-Timing']
+        assert header.startswith('app;dur=')
+        assert 'db;dur=' in header
+        assert 'queries' in header
+
+    def test_metrics_endpoint(self, client):
+        """Гистограммы запросов доступны в формате Prometheus"""
+        client.get('/')
+        response = client.get('/metrics')
+
+        body = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert '# TYPE http_request_duration_seconds histogram' in body
+        assert 'endpoint="main.index"' in body
+        assert 'http_request_sql_queries_count{endpoint="main.index"}' in body
+
+
+class TestMetrics:
+    """Тесты гистограмм"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Корзины накапливаются, +Inf равна количеству"""
+        histogram = Histogram('test_seconds', 'Тест', ('job',), buckets=(1, 5))
+        histogram.observe(0.5, job='a')
+        histogram.observe(3, job='a')
+        histogram.observe(10, job='a')
+
+        lines = histogram.render()
+        assert 'test_seconds_bucket{job="a",le="1"} 1' in lines
+        assert 'test_seconds_bucket{job="a",le="5"} 2' in lines
+        assert 'test_seconds_bucket{job="a",le="+Inf"} 3' in lines
+        assert 'test_seconds_count{job="a"} 3' in lines
+
+    def test_track_job_records_errors(self):
+        """Длительность операции пишется и при ошибке"""
+        with pytest.raises(ValueError):
+            with track_job('test_job'):
+                raise ValueError()
+
+        assert 'job_duration_seconds_count{job="test_job",status="error"} 1' in registry.render()
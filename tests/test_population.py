@@ -0,0 +1,177 @@
+"""Тесты пакетного редактирования и импорта населения"""
+
+import io
+
+import pandas as pd
+import pytest
+from pony.orm import db_session, select
+
+from app import create_app
+from models.entities import District, Year, Population, CrimeStatistics
+from services.cache_service import CacheService
+from services.crime_calculation_service import CrimeCalculationService
+from services.population_service import PopulationService
+from settings import settings
+
+
+def _seed():
+    with db_session:
+        districts = [District(name=f'Район {i}') for i in range(2)]
+        years = [Year(year=2020), Year(year=2021)]
+        Population(district=districts[0], year=years[0], value=100)
+    return [d.id for d in districts], [y.id for y in years]
+
+
+def _population():
+    with db_session:
+        return {(name, year): value for name, year, value in select(
+            (p.district.name, p.year.year, p.value) for p in Population
+        )}
+
+
+@pytest.fixture
+def client(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'upload_folder', str(tmp_path / 'files'))
+    return create_app({'DB_BIND': False, 'TESTING': True}).test_client()
+
+
+class TestPayload:
+    """Тесты разбора запроса /api/population/batch"""
+
+    def test_cells_and_matrix(self):
+        """Список ячеек и матрица дают одинаковый набор"""
+        cells = PopulationService.cells_from_payload({'cells': [
+            {'district_id': 1, 'year_id': 5, 'value': 10},
+            {'district_id': 2, 'year_id': 5, 'value': None},
+        ]})
+        matrix = PopulationService.cells_from_payload({
+            'district_ids': [1, 2], 'year_ids': [5], 'values': [[10], [None]]
+        })
+
+        assert cells == matrix == [(1, 5, 10), (2, 5, None)]
+
+    def test_matrix_shape(self):
+        """Размер матрицы проверяется"""
+        with pytest.raises(ValueError):
+            PopulationService.cells_from_payload({'district_ids': [1, 2], 'year_ids': [5], 'values': [[10]]})
+
+
+class TestSaveBatch:
+    """Тесты save_batch"""
+
+    def test_upsert_delete_and_recalculate_touched_years(self, sqlite_db):
+        """Значения вставляются и обновляются, null удаляет, пересчитываются только затронутые годы"""
+        districts, years = _seed()
+
+        stats = PopulationService.save_batch([
+            (districts[0], years[0], 200),
+            (districts[1], years[0], 300),
+        ])
+
+        assert stats == {'saved': 2, 'deleted': 0, 'recalculated_years': 1}
+        assert _population() == {('Район 0', 2020): 200, ('Район 1', 2020): 300}
+        with db_session:
+            assert set(select(s.year.year for s in CrimeStatistics)) == {2020}
+
+        stats = PopulationService.save_batch([(districts[0], years[0], None), (districts[0], years[1], None)])
+
+        assert stats['deleted'] == 1 and stats['recalculated_years'] == 2
+        assert _population() == {('Район 1', 2020): 300}
+
+    def test_failed_recalculation_rolls_back(self, sqlite_db, monkeypatch):
+        """Ошибка пересчёта откатывает всю правку и не меняет версию данных"""
+        districts, years = _seed()
+        with db_session:
+            version = CacheService.data_version()
+
+        def fail(year_value):
+            raise RuntimeError('расчёт не удался')
+        monkeypatch.setattr(CrimeCalculationService, 'calculate_for_year', staticmethod(fail))
+
+        with pytest.raises(RuntimeError):
+            PopulationService.save_batch([(districts[0], years[0], 200), (districts[1], years[0], 300)])
+
+        assert _population() == {('Район 0', 2020): 100}
+        with db_session:
+            assert CacheService.data_version() == version
+
+    def test_validation(self, sqlite_db):
+        """Отрицательные значения и неизвестные ID отклоняются без записи"""
+        districts, years = _seed()
+
+        with pytest.raises(ValueError):
+            PopulationService.save_batch([(districts[0], years[0], -1)])
+        with pytest.raises(ValueError):
+            PopulationService.save_batch([(districts[0], years[0], 1000.7)])
+        with pytest.raises(ValueError):
+            PopulationService.save_batch([(districts[0], years[0], float('inf'))])
+        with pytest.raises(LookupError):
+            PopulationService.save_batch([(districts[0], 999, 1)])
+        assert _population() == {('Район 0', 2020): 100}
+
+
+class TestBatchEndpoint:
+    """Тесты /api/population/batch и импорта из Excel"""
+
+    def test_batch_endpoint(self, client):
+        """Матрица сохраняется одним запросом"""
+        districts, years = _seed()
+
+        response = client.post('/api/population/batch', json={
+            'district_ids': districts, 'year_ids': years, 'values': [[1, 2], [3, None]]
+        })
+
+        assert response.status_code == 200 and response.get_json()['saved'] == 3
+        assert _population() == {('Район 0', 2020): 1, ('Район 0', 2021): 2, ('Район 1', 2020): 3}
+        assert client.post('/api/population/batch', json={'cells': [{'district_id': 1}]}).status_code == 400
+
+    def test_batch_rejects_non_integer_values(self, client):
+        """Дробные значения и Infinity дают 400, а не усечение или 500"""
+        districts, years = _seed()
+        cells = f'[{{"district_id": {districts[0]}, "year_id": {years[0]}, "value": %s}}]'
+
+        for value in ('1000.7', 'Infinity'):
+            response = client.post('/api/population/batch', data='{"cells": %s}' % (cells % value),
+                                   content_type='application/json')
+            assert response.status_code == 400, value
+        assert _population() == {('Район 0', 2020): 100}
+
+    def test_import_excel(self, client):
+        """Районы и годы из файла создаются, пустые ячейки пропускаются"""
+        _seed()
+        buffer = io.BytesIO()
+        pd.DataFrame({
+            'РАЙОН': ['Район 0', 'Новый район'],
+            2020: [150, 50],
+            '2022': [None, 70],
+        }).to_excel(buffer, index=False)
+        buffer.seek(0)
+
+        response = client.post(
+            '/population/import',
+            data={'file': (buffer, 'population.xlsx')},
+            content_type='multipart/form-data',
+            follow_redirects=True
+        )
+
+        assert 'Население из' in response.get_data(as_text=True)
+        assert _population() == {
+            ('Район 0', 2020): 150,
+            ('Новый район', 2020): 50,
+            ('Новый район', 2022): 70,
+        }
+
+
+class TestPopulationPage:
+    """Тесты страницы населения"""
+
+    def test_grid_cached_by_data_version(self, client):
+        """Сетка строится одной проекцией и обновляется после изменения данных"""
+        districts, years = _seed()
+
+        html = client.get('/population').get_data(as_text=True)
+        assert html.index('Район 0') < html.index('Район 1')
+        assert '>100<' in html
+
+        client.post('/api/population/save', json={'district_id': districts[1], 'year_id': years[1], 'value': 777})
+        assert '>777<' in client.get('/population').get_data(as_text=True)
@@ -0,0 +1,100 @@
+"""Тесты слоя SQL запросов models.queries"""
+
+import numpy as np
+import pytest
+from pony.orm import db_session
+
+from models import queries
+from models.entities import CrimeType, Feature, District, Year, FeatureDistrictYear
+from services.data_service import DataService
+
+
+@pytest.fixture
+def values(sqlite_db):
+    with db_session:
+        line = CrimeType(name='Кражи')
+        features = [Feature(name='Б', crime_type=line), Feature(name='А')]
+        districts = [District(name='Район 2'), District(name='Район 1')]
+        years = [Year(year=2020), Year(year=2021)]
+        for y, year in enumerate(years):
+            for f, feature in enumerate(features):
+                for d, district in enumerate(districts):
+                    value = None if (f, d) == (1, 1) else 100 * y + 10 * f + d
+                    FeatureDistrictYear(feature=feature, district=district, year=year, value=value)
+
+
+class TestGetValuesWithFilter:
+    """Тесты get_values_with_filter"""
+
+    def test_columns_and_nan(self, values):
+        """Колонки numpy; NULL — NaN; линия без признака — None"""
+        with db_session:
+            data = queries.get_values_with_filter(year=2020)
+
+        assert set(data) == set(queries.VALUE_COLUMNS)
+        assert data['value'].dtype == np.float64
+        assert np.isnan(data['value']).sum() == 1
+        assert data['year'].tolist() == [2020] * 4
+        assert list(data['crime_type']).count(None) == 2
+
+    def test_filter_pushdown(self, values):
+        """Фильтры по району, признаку и линии; exclude_null"""
+        with db_session:
+            data = queries.get_values_with_filter(district_name='Район 1', crime_type_name='Кражи')
+            assert data['value'].tolist() == [1.0, 101.0]
+
+            assert len(queries.get_values_with_filter(feature_name='А', exclude_null=True)['value']) == 2
+
+    def test_sql_compiled_once_per_filter_set(self, values):
+        """Текст запроса зависит только от набора фильтров"""
+        first, params = queries.build_values_query(year=2020, district_name='Район 1')
+        second, _ = queries.build_values_query(year=2021, district_name='Район 2')
+
+        assert first is second
+        assert params == [2020, 'Район 1']
+
+
+class TestPivot:
+    """Тесты сводной таблицы"""
+
+    def test_pivot(self, values):
+        """Признаки × районы с NaN для пустых ячеек"""
+        pivot = DataService.get_pivot_table(year=2021)
+
+        assert list(pivot.index) == ['А', 'Б']
+        assert list(pivot.columns) == ['Район 1', 'Район 2']
+        assert pivot.loc['Б', 'Район 2'] == 100
+        assert np.isnan(pivot.loc['А', 'Район 1'])
+
+    def test_first_value_on_repeats(self, values):
+        """Без фильтра по году берётся первое значение пары"""
+        pivot = DataService.get_pivot_table(index='признак', columns='район')
+
+        assert pivot.loc['Б', 'Район 1'] == 1
+
+    def test_first_non_null_on_repeats(self, values):
+        """Пустое первое значение пропускается, как в pivot_table(aggfunc='first')"""
+        with db_session:
+            feature = Feature(name='В')
+            district = District.get(name='Район 1')
+            FeatureDistrictYear(feature=feature, district=district, year=Year.get(year=2020), value=None)
+            FeatureDistrictYear(feature=feature, district=district, year=Year.get(year=2021), value=5)
+            FeatureDistrictYear(feature=Feature(name='Г'), district=district, year=Year.get(year=2020), value=None)
+
+        pivot = DataService.get_pivot_table()
+
+        assert pivot.loc['В', 'Район 1'] == 5
+        assert 'Г' not in pivot.index
+
+    def test_other_columns_fall_back_to_pandas(self, values):
+        """Сочетания колонок вне быстрого пути работают, как раньше"""
+        pivot = DataService.get_pivot_table(index='признак', columns='район', values='год')
+
+        assert pivot.loc['Б', 'Район 1'] == 2020
+
+    def test_data_for_analysis(self, values):
+        """DataFrame для анализа без NULL"""
+        df = DataService.get_data_for_analysis(district='Район 1')
+
+        assert list(df.columns) == ['признак', 'район', 'год', 'значение']
+        assert len(df) == 2
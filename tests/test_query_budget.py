@@ -0,0 +1,155 @@
+"""
+Регрессионные тесты бюджета SQL запросов
+
+Каждый эндпоинт объявляет максимальное число SQL запросов (@query_budget).
+Запросы выполняются на двух наборах данных разного размера: число запросов
+не должно превышать бюджет и не должно расти вместе с числом признаков,
+районов и лет (защита от N+1).
+"""
+
+import re
+import pytest
+from decimal import Decimal
+from pony.orm import db_session
+from app import create_app
+from models.entities import (
+    db, Feature, District, Year, FeatureDistrictYear, CrimeType, Population,
+    CrimeStatistics, FinancialExpenses, AnalysisResult
+)
+from services.cache_service import CacheService
+from utils.db import init_database
+
+# (features, districts, years)
+SMALL = (2, 2, 2)
+LARGE = (8, 6, 5)
+
+
+@db_session
+def seed(n_features: int, n_districts: int, n_years: int) -> dict:
+    """Заполнить БД синтетическими данными"""
+    crime_types = [CrimeType(name=f'Линия {i}') for i in range(2)]
+    features = [
+        Feature(name=f'Признак {i}', crime_type=crime_types[i % 2])
+        for i in range(n_features)
+    ]
+    districts = [District(name=f'Район {i}') for i in range(n_districts)]
+    pmr = District(name='ПМР')
+    years = [Year(year=2010 + i) for i in range(n_years)]
+
+    for year in years:
+        for district in districts:
+            Population(district=district, year=year, value=10000)
+            CrimeStatistics(
+                district=district, year=year, total_crimes=10, population=10000,
+                coefficient=Decimal('100'), normalized=Decimal('3.5')
+            )
+            for feature in features:
+                FeatureDistrictYear(feature=feature, district=district, year=year, value=Decimal('1.5'))
+        for i in range(n_features):
+            FinancialExpenses(district=pmr, year=year, name=f'Расход {i}', amount=100.0)
+
+    AnalysisResult(crime_type=crime_types[0], selected_indicators='Расход 0')
+    db.flush()
+
+    return {
+        'year': years[0].year,
+        'district_id': districts[0].id,
+        'year_id': years[0].id,
+        'crime_type_id': crime_types[0].id
+    }
+
+
+def requests_to_check(ids: dict) -> list:
+    """(method, url, json) для проверки; охватывают все эндпоинты с бюджетом"""
+    return [
+        ('GET', '/', None),
+        ('GET', '/healthz', None),
+        ('GET', '/readyz', None),
+        ('GET', '/metrics', None),
+        ('GET', '/map', None),
+        ('GET', '/api/crime-data', None),
+        ('GET', '/api/crime-data?format=columnar', None),
+        ('GET', '/documents', None),
+        ('GET', '/documents?data_type=crime', None),
+        ('GET', '/documents?data_type=financial', None),
+        ('GET', f'/api/year-data/{ids["year"]}', None),
+        ('GET', f'/api/year-data/{ids["year"]}?offset=1&limit=2', None),
+        ('GET', f'/api/year-data/{ids["year"]}?format=columnar&encoding=f32', None),
+        ('GET', f'/api/export?format=jsonl&year={ids["year"]}', None),
+        ('GET', '/population', None),
+        ('POST', '/api/population/save', {'district_id': ids['district_id'], 'year_id': ids['year_id'], 'value': 12345}),
+        ('POST', '/api/population/delete', {'district_id': ids['district_id'], 'year_id': ids['year_id']}),
+        ('GET', '/analysis', None),
+        ('POST', '/analysis/select-indicators', {'crime_type_id': ids['crime_type_id']}),
+        ('GET', f'/analysis/results/{ids["crime_type_id"]}', None),
+    ]
+
+
+@pytest.fixture
+def app():
+    init_database(provider='sqlite', database=':memory:', create_tables=True)
+    CacheService.invalidate()
+    yield create_app({'DB_BIND': False, 'TESTING': True})
+    CacheService.invalidate()
+    db.drop_all_tables(with_all_data=True)
+
+
+def count_queries(app, method: str, url: str, payload) -> int:
+    """Выполнить запрос с холодным кэшем и вернуть число SQL запросов"""
+    CacheService.invalidate()
+    client = app.test_client()
+    if method == 'GET':
+        response = client.get(url)
+    elif url.startswith('/api/'):
+        response = client.post(url, json=payload)
+    else:
+        response = client.post(url, data=payload)
+
+    assert response.status_code != 500, f'{method} {url}: {response.status_code}'
+    match = re.search(r'desc="(\d+) queries"', response.headers['Server-Timing'])
+    return int(match.group(1))
+
+
+def measure(app, size: tuple) -> dict:
+    ids = seed(*size)
+    return {
+        (method, re.sub(r'\d+', '<id>', url)): (count_queries(app, method, url, payload), url)
+        for method, url, payload in requests_to_check(ids)
+    }
+
+
+def budget_for(app, method: str, url: str):
+    adapter = app.url_map.bind('localhost')
+    endpoint, _ = adapter.match(url.split('?')[0], method=method)
+    return app.view_functions[endpoint].query_budget
+
+
+class TestQueryBudget:
+    """Бюджет SQL запросов эндпоинтов"""
+
+    def test_every_route_declares_budget(self, app):
+        """Каждый эндпоинт объявляет бюджет через @query_budget"""
+        missing = [
+            rule.endpoint for rule in app.url_map.iter_rules()
+            if rule.endpoint != 'static'
+            and not hasattr(app.view_functions[rule.endpoint], 'query_budget')
+        ]
+        assert missing == []
+
+    @pytest.mark.parametrize('size', [SMALL, LARGE], ids=['small', 'large'])
+    def test_within_budget(self, app, size):
+        """Число запросов не превышает объявленный бюджет"""
+        for (method, _), (count, url) in measure(app, size).items():
+            budget = budget_for(app, method, url)
+            assert budget is not None, f'{method} {url} не должен быть job-эндпоинтом'
+            assert count <= budget, f'{method} {url}: {count} SQL запросов > бюджета {budget}'
+
+    def test_independent_of_data_size(self, app):
+        """Число запросов не растёт с количеством признаков, районов и лет"""
+        small = measure(app, SMALL)
+        db.drop_all_tables(with_all_data=True)
+        db.create_tables()
+        large = measure(app, LARGE)
+
+        for key, (count, url) in small.items():
+            assert large[key][0] == count, f'{key}: {count} -> {large[key][0]} SQL запросов'
@@ -0,0 +1,336 @@
+"""Тесты пакетных операций репозиториев"""
+
+import json
+import os
+import subprocess
+import sys
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from pony.orm import db_session, select, count
+
+from models.entities import CrimeType, Feature, District, Year, FeatureDistrictYear, FinancialExpenses
+from repositories import (
+    YearRepository, FeatureRepository, FeatureDistrictYearRepository, CrimeTypeRepository,
+    FinancialExpensesRepository, DistrictRepository
+)
+from repositories.base_repository import decode_cursor
+from services.data_service import DataService
+from utils.db import insert_or_select
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Два потока в своих db_session создают один район; подменённый get ждёт,
+# пока оба не убедятся, что района нет, — обе вставки идут одновременно
+RACE_SCRIPT = """
+import json, sys, threading
+from pony.orm import db_session
+from models.entities import District
+from repositories import DistrictRepository
+from utils.db import init_database
+
+init_database(provider='sqlite', database=sys.argv[1], create_tables=True)
+barrier = threading.Barrier(2, timeout=10)
+get = District.get
+District.get = classmethod(lambda cls, **key: (get(**key), barrier.wait())[0])
+results, errors = [], []
+
+def create():
+    try:
+        with db_session:
+            district, created = DistrictRepository.get_or_create(name='Район 1')
+            results.append([district.id, created])
+    except Exception as e:
+        errors.append(repr(e))
+
+threads = [threading.Thread(target=create) for _ in range(2)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+print(json.dumps({'results': results, 'errors': errors}))
+"""
+
+
+def _seed_dimensions():
+    with db_session:
+        features = [Feature(name=f'Признак {i}') for i in range(3)]
+        districts = [District(name=f'Район {i}') for i in range(2)]
+        year = Year(year=2020)
+    return [f.id for f in features], [d.id for d in districts], year.id
+
+
+class TestBulkCreate:
+    """Тесты bulk_create"""
+
+    def test_dicts_and_tuples(self, sqlite_db):
+        """Строки принимаются словарями и кортежами"""
+        assert YearRepository.bulk_create([{'year': 2020}, {'year': 2021}]) == 2
+        assert YearRepository.bulk_create([(2022,), (2023,)], fields=['year'], chunk_size=1) == 2
+
+        with db_session:
+            assert sorted(select(y.year for y in Year)) == [2020, 2021, 2022, 2023]
+
+    def test_empty(self, sqlite_db):
+        """Пустой набор строк не выполняет запросов"""
+        assert YearRepository.bulk_create([]) == 0
+
+    def test_relations_defaults_and_nan(self, sqlite_db):
+        """Связи передаются ID, NaN становится NULL, значения по умолчанию подставляются"""
+        features, districts, year_id = _seed_dimensions()
+        FeatureDistrictYearRepository.bulk_create(
+            [(features[0], districts[0], year_id, 1.5), (features[1], districts[0], year_id, np.float64('nan'))],
+            fields=['feature', 'district', 'year', 'value']
+        )
+        FinancialExpensesRepository.bulk_create([
+            {'district': districts[0], 'year': year_id, 'amount': 10.0, 'name': 'Расходы'}
+        ])
+
+        with db_session:
+            values = dict(select((v.feature.id, v.value) for v in FeatureDistrictYear))
+            assert values == {features[0]: Decimal('1.50'), features[1]: None}
+            assert FinancialExpenses.select().first().include_in_analysis is True
+
+
+class TestBulkUpsert:
+    """Тесты bulk_upsert"""
+
+    def test_upsert_by_composite_key(self, sqlite_db):
+        """Конфликт по composite_key обновляет значение"""
+        features, districts, year_id = _seed_dimensions()
+        fields = ['feature', 'district', 'year', 'value']
+        FeatureDistrictYearRepository.bulk_upsert([(features[0], districts[0], year_id, 1)], fields=fields)
+        FeatureDistrictYearRepository.bulk_upsert(
+            [(features[0], districts[0], year_id, 2), (features[1], districts[0], year_id, 3)],
+            fields=fields
+        )
+
+        with db_session:
+            assert count(v for v in FeatureDistrictYear) == 2
+            assert dict(select((v.feature.id, v.value) for v in FeatureDistrictYear)) == {
+                features[0]: Decimal('2.00'), features[1]: Decimal('3.00')
+            }
+
+    def test_defaults_not_updated_on_conflict(self, sqlite_db):
+        """Поля по умолчанию заполняются только у новых строк: флаг пользователя сохраняется"""
+        _, districts, year_id = _seed_dimensions()
+        fields = ['district', 'year', 'name', 'amount']
+        FinancialExpensesRepository.bulk_upsert([(districts[0], year_id, 'Связь', 1.0)], fields=fields)
+        with db_session:
+            FinancialExpenses.select().first().include_in_analysis = False
+
+        FinancialExpensesRepository.bulk_upsert(
+            [(districts[0], year_id, 'Связь', 2.0), (districts[1], year_id, 'Связь', 3.0)], fields=fields
+        )
+
+        with db_session:
+            assert dict(select((e.district.id, e.include_in_analysis) for e in FinancialExpenses)) == {
+                districts[0]: False, districts[1]: True
+            }
+            assert sorted(select(e.amount for e in FinancialExpenses)) == [2.0, 3.0]
+
+    def test_bulk_create_or_get_keeps_existing(self, sqlite_db):
+        """bulk_create_or_get не перезаписывает существующие значения"""
+        features, districts, year_id = _seed_dimensions()
+        rows = [(f, d, year_id, 5) for f in features for d in districts]
+        assert FeatureDistrictYearRepository.bulk_create_or_get(rows[:2]) == 2
+        assert FeatureDistrictYearRepository.bulk_create_or_get([(f, d, y, 7) for f, d, y, _ in rows]) == 4
+
+        with db_session:
+            assert count(v for v in FeatureDistrictYear) == 6
+            assert count(v for v in FeatureDistrictYear if v.value == 5) == 2
+
+
+class TestBulkUpdateDelete:
+    """Тесты bulk_update и bulk_delete"""
+
+    def test_bulk_update(self, sqlite_db):
+        """Обновление по ID и по составному ключу"""
+        features, districts, year_id = _seed_dimensions()
+        FeatureDistrictYearRepository.bulk_create(
+            [(f, districts[0], year_id, 0) for f in features],
+            fields=['feature', 'district', 'year', 'value']
+        )
+        with db_session:
+            ids = select(v.id for v in FeatureDistrictYear).order_by(1)[:]
+
+        assert FeatureDistrictYearRepository.bulk_update([{'id': ids[0], 'value': 10}]) == 1
+        updated = FeatureDistrictYearRepository.bulk_update(
+            [(features[1], districts[0], year_id, 20), (features[2], districts[1], year_id, 30)],
+            fields=['feature', 'district', 'year', 'value'],
+            key=['feature', 'district', 'year']
+        )
+        assert updated == 1
+
+        with db_session:
+            assert sorted(select(v.value for v in FeatureDistrictYear)) == [0, 10, 20]
+
+    def test_bulk_delete(self, sqlite_db):
+        """Удаление по фильтру возвращает количество строк"""
+        YearRepository.bulk_create([{'year': y} for y in range(2015, 2025)])
+
+        assert YearRepository.bulk_delete(lambda y: y.year < 2020) == 5
+        with db_session:
+            assert count(y for y in Year) == 5
+
+
+class TestProjectionAndPagination:
+    """Тесты проекций и keyset-пагинации get_list/get_page"""
+
+    def test_projection_keeps_filter_and_order(self, sqlite_db):
+        """Проекция возвращает кортежи с учётом фильтра, сортировки и limit"""
+        YearRepository.bulk_create([{'year': y} for y in range(2015, 2025)])
+
+        rows = YearRepository.get_list(
+            filter_func=lambda y: y.year > 2018,
+            order_by_func=lambda y: -y.year,
+            columns=['year'],
+            limit=3
+        )
+        assert rows == [(2024,), (2023,), (2022,)]
+
+    def test_projection_through_relations_as_numpy(self, sqlite_db):
+        """Пути через связи и колонки numpy; NULL становится NaN"""
+        features, districts, year_id = _seed_dimensions()
+        FeatureDistrictYearRepository.bulk_create(
+            [(features[0], districts[0], year_id, 1.5), (features[1], districts[0], year_id, None)],
+            fields=['feature', 'district', 'year', 'value']
+        )
+
+        result = FeatureDistrictYearRepository.get_list(
+            columns=['feature.name', 'year.year', 'value'],
+            order_by_func=lambda v: v.feature.name,
+            as_numpy=True
+        )
+        assert list(result['feature.name']) == ['Признак 0', 'Признак 1']
+        assert result['year.year'].tolist() == [2020, 2020]
+        assert result['value'][0] == 1.5 and np.isnan(result['value'][1])
+
+    def test_invalid_column(self, sqlite_db):
+        """Имя колонки проверяется до построения запроса"""
+        with pytest.raises(ValueError):
+            YearRepository.get_list(columns=['year) for e in query if (1'])
+
+    def test_get_page_walks_all_rows(self, sqlite_db):
+        """Страницы по курсору покрывают все строки без повторов"""
+        FeatureRepository.bulk_create([{'name': f'П{i:02d}'} for i in range(25)])
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            page = FeatureRepository.get_page(columns=['name'], limit=10, cursor=cursor)
+            seen.extend(name for (name,) in page.items)
+            pages += 1
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+        assert pages == 3
+        assert seen == [f'П{i:02d}' for i in range(25)]
+        assert decode_cursor(FeatureRepository.get_page(limit=10).next_cursor) == 10
+
+    def test_iter_with_filter(self, sqlite_db):
+        """iter_with_filter перебирает отфильтрованные значения страницами"""
+        features, districts, year_id = _seed_dimensions()
+        FeatureDistrictYearRepository.bulk_create(
+            [(f, d, year_id, 1) for f in features for d in districts],
+            fields=['feature', 'district', 'year', 'value']
+        )
+
+        rows = list(FeatureDistrictYearRepository.iter_with_filter(
+            district_name='Район 1', columns=['feature.name', 'value'], page_size=2
+        ))
+        assert [name for name, _ in rows] == ['Признак 0', 'Признак 1', 'Признак 2']
+        assert len(FeatureDistrictYearRepository.get_with_filter(year=2020, exclude_null=True)) == 6
+
+    def test_invalid_cursor(self, sqlite_db):
+        """Некорректный курсор — ValueError"""
+        with pytest.raises(ValueError):
+            YearRepository.get_page(cursor='не-курсор')
+
+
+class TestCrimeTypeBackfill:
+    """Тесты пакетного заполнения линий преступлений"""
+
+    def test_get_ids_or_create(self, sqlite_db):
+        """Существующие линии не дублируются"""
+        with db_session:
+            existing = CrimeType(name='Кражи')
+        ids, created = CrimeTypeRepository.get_ids_or_create('name', ['Кражи', 'Грабежи', 'Грабежи'])
+
+        assert created == 1
+        assert ids['Кражи'] == existing.id
+        assert set(ids) == {'Кражи', 'Грабежи'}
+
+    def test_update_features_in_chunks(self, sqlite_db):
+        """Линия извлекается из названия, признаки с линией не меняются"""
+        with db_session:
+            manual = CrimeType(name='Ручная')
+            Feature(name='Кражи (Число краж)')
+            Feature(name='Грабежи  (Раскрыто)')
+            Feature(name='Без линии')
+            Feature(name='Кражи (Раскрыто)')
+            Feature(name='Угоны (Число)', crime_type=manual)
+
+        stats = DataService.update_existing_features_with_crime_types(chunk_size=2)
+
+        assert stats == {'updated': 3, 'crime_types_created': 2}
+        with db_session:
+            lines = dict(select((f.name, f.crime_type.name) for f in Feature if f.crime_type))
+        assert lines == {
+            'Кражи (Число краж)': 'Кражи',
+            'Грабежи  (Раскрыто)': 'Грабежи',
+            'Кражи (Раскрыто)': 'Кражи',
+            'Угоны (Число)': 'Ручная',
+        }
+        assert DataService.update_existing_features_with_crime_types() == {'updated': 0, 'crime_types_created': 0}
+
+
+class TestGetOrCreate:
+    """Тесты get_or_create без гонки при вставке"""
+
+    def test_insert_or_select(self, sqlite_db):
+        """Повторная вставка того же ключа возвращает существующий ID"""
+        with db_session:
+            first = insert_or_select('districts', ['name'], ('Район 1',), conflict_columns=['name'])
+            second = insert_or_select('districts', ['name'], ('Район 1',), conflict_columns=['name'])
+
+            assert first[1] is True and second == (first[0], False)
+            assert count(d for d in District) == 1
+
+    def test_concurrent_get_or_create(self, tmp_path):
+        """Два потока создают один ключ в файловой SQLite: один ID, без IntegrityError"""
+        result = subprocess.run(
+            [sys.executable, '-c', RACE_SCRIPT, str(tmp_path / 'race.db')],
+            cwd=PROJECT_ROOT,
+            env=dict(os.environ, PYTHONPATH=PROJECT_ROOT),
+            capture_output=True,
+            text=True,
+            timeout=60,
+            check=True
+        )
+        outcome = json.loads(result.stdout.strip().splitlines()[-1])
+
+        assert outcome['errors'] == []
+        ids = {district_id for district_id, _ in outcome['results']}
+        assert len(outcome['results']) == 2 and len(ids) == 1
+        assert sorted(created for _, created in outcome['results']) == [False, True]
+
+    def test_get_or_create(self, sqlite_db):
+        """Сущность создаётся один раз; defaults и значения по умолчанию применяются к новой"""
+        with db_session:
+            district, created = DistrictRepository.get_or_create(name='ПМР')
+            year, _ = YearRepository.get_or_create(year=2020)
+            expense, created_expense = FinancialExpensesRepository.get_or_create(
+                defaults={'amount': 10}, district=district, year=year, name='Расходы'
+            )
+            again, created_again = FinancialExpensesRepository.get_or_create(
+                defaults={'amount': 99}, district=district, year=year, name='Расходы'
+            )
+
+            assert created and created_expense and not created_again
+            assert again is expense
+            assert expense.amount == 10 and expense.include_in_analysis is True
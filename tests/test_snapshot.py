@@ -0,0 +1,93 @@
+"""Тесты экспорта и импорта снимка данных"""
+
+import io
+from decimal import Decimal
+
+import pytest
+from pony.orm import db_session, select, count, flush
+
+from app import create_app
+from benchmarks.workbook_generator import generate_full_workbook
+from models.entities import (
+    CrimeType, Feature, District, Year, FeatureDistrictYear, Population,
+    FinancialExpenses, CrimeStatistics, Document, AnalysisResult
+)
+from services.snapshot_service import SnapshotService
+from settings import settings
+
+pytest.importorskip('pyarrow')
+
+
+@db_session
+def seed():
+    crime_type = CrimeType(name='Линия 1')
+    features = [Feature(name='Признак 1', crime_type=crime_type), Feature(name='Признак 2')]
+    districts = [District(name='Район 1'), District(name='Район 2')]
+    document = Document(filename='full.xlsx', file_path='files/full.xlsx', file_type='FULL')
+    AnalysisResult(crime_type=crime_type, most_important='Признак 1')
+    for year_value in (2020, 2021):
+        year = Year(year=year_value)
+        for district in districts:
+            Population(district=district, year=year, value=10000)
+            CrimeStatistics(district=district, year=year, total_crimes=7, population=10000,
+                            coefficient=Decimal('70.00'), normalized=Decimal('3.25'))
+            FinancialExpenses(district=district, year=year, name='Расходы', amount=1.5, include_in_analysis=False)
+            for i, feature in enumerate(features):
+                FeatureDistrictYear(feature=feature, district=district, year=year,
+                                    document=document, value=Decimal(i) if i else None)
+
+
+class TestSnapshot:
+    """Тесты SnapshotService"""
+
+    def test_roundtrip(self, sqlite_db, tmp_path):
+        """Экспорт → очистка → импорт восстанавливает данные и связи"""
+        seed()
+        exported = SnapshotService.export_snapshot(str(tmp_path))
+        assert exported['feature_district_year'] == 8
+        assert (tmp_path / 'manifest.json').exists()
+
+        imported = SnapshotService.import_snapshot(str(tmp_path))
+        assert imported == exported
+
+        with db_session:
+            assert count(v for v in FeatureDistrictYear) == 8
+            assert count(v for v in FeatureDistrictYear if v.document is None) == 8
+            assert Feature.get(name='Признак 1').crime_type.name == 'Линия 1'
+            assert select(s.normalized for s in CrimeStatistics).first() == Decimal('3.25')
+            assert select(e.include_in_analysis for e in FinancialExpenses).first() is False
+            assert AnalysisResult.select().first().crime_type.name == 'Линия 1'
+            one = Decimal(1)
+            assert count(v for v in FeatureDistrictYear if v.value == one) == 4
+
+            # Новые записи получают id после загруженных
+            year = Year(year=2022)
+            flush()
+            assert year.id == 3
+
+    def test_missing_manifest(self, sqlite_db, tmp_path):
+        """Каталог без manifest.json не импортируется"""
+        with pytest.raises(FileNotFoundError):
+            SnapshotService.import_snapshot(str(tmp_path))
+
+    def test_reupload_after_import(self, sqlite_db, tmp_path, monkeypatch):
+        """После импорта тот же файл загружается заново, а не считается уже загруженным"""
+        monkeypatch.setattr(settings, 'upload_folder', str(tmp_path / 'files'))
+        client = create_app({'DB_BIND': False, 'TESTING': True}).test_client()
+        path = generate_full_workbook(str(tmp_path / 'full.xlsx'), years=2, districts=3, features=4)
+        with open(path, 'rb') as f:
+            workbook = f.read()
+
+        def upload():
+            return client.post('/upload', data={'file': (io.BytesIO(workbook), 'full.xlsx')},
+                               content_type='multipart/form-data', follow_redirects=True)
+
+        SnapshotService.export_snapshot(str(tmp_path / 'empty'))
+        upload()
+        SnapshotService.import_snapshot(str(tmp_path / 'empty'))
+        with db_session:
+            assert count(v for v in FeatureDistrictYear) == 0
+
+        assert 'загружен и обработан' in upload().get_data(as_text=True)
+        with db_session:
+            assert count(v for v in FeatureDistrictYear) == 24
@@ -0,0 +1,183 @@
+"""Тесты режима SQLite: настройки соединения, пакетная вставка, миграции"""
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+from pony.orm import db_session, count, select
+
+from models.entities import DataVersion, Year
+from services.cache_service import CacheService
+from utils.db import _track_raw_sql, bulk_insert
+from utils.migrations import MigrationManager
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestSqlitePragmas:
+    """Тесты PRAGMA для файловой БД"""
+
+    def test_wal_and_pragmas(self, tmp_path):
+        """Соединения открываются в WAL с настройками SQLITE_PRAGMAS"""
+        code = (
+            'import json, sys\n'
+            'from pony.orm import db_session\n'
+            'from utils.db import init_database\n'
+            'from models.entities import db\n'
+            'init_database(provider="sqlite", database=sys.argv[1], create_tables=True)\n'
+            'with db_session:\n'
+            '    pragmas = {name: db.execute(f"PRAGMA {name}").fetchone()[0]\n'
+            '               for name in ("journal_mode", "synchronous", "temp_store", "busy_timeout")}\n'
+            'print(json.dumps(pragmas))\n'
+        )
+        env = dict(os.environ, DB_USER='test', DB_PASSWORD='test', SECRET_KEY='test')
+        result = subprocess.run(
+            [sys.executable, '-c', code, str(tmp_path / 'test.sqlite')],
+            cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+        )
+        pragmas = json.loads(result.stdout.strip().splitlines()[-1])
+
+        assert pragmas['journal_mode'] == 'wal'
+        assert pragmas['synchronous'] == 1   # NORMAL
+        assert pragmas['temp_store'] == 2    # MEMORY
+        assert pragmas['busy_timeout'] == 5000
+
+
+class TestBulkInsert:
+    """Тесты bulk_insert"""
+
+    def test_insert_in_chunks(self, sqlite_db):
+        """Строки вставляются пачками и видны ORM в той же сессии"""
+        with db_session:
+            inserted = bulk_insert('years', ['year'], ((y,) for y in range(2000, 2025)), chunk_size=10)
+
+            assert inserted == 25
+            assert count(y for y in Year) == 25
+
+    def test_on_conflict_do_nothing(self, sqlite_db):
+        """Существующие строки пропускаются"""
+        with db_session:
+            Year(year=2020)
+            inserted = bulk_insert('years', ['year'], [(2020,), (2021,)], conflict_columns=['year'])
+
+            assert inserted == 1
+            assert sorted(select(y.year for y in Year)) == [2020, 2021]
+
+    def test_on_conflict_do_update(self, sqlite_db):
+        """Колонки update_columns обновляются при конфликте"""
+        with db_session:
+            Year(year=2020)
+            Year(year=2021)
+            bulk_insert('years', ['id', 'year'], [(1, 2030)], conflict_columns=['id'], update_columns=['year'])
+
+            assert sorted(select(y.year for y in Year)) == [2021, 2030]
+
+
+class TestPonyInternals:
+    """Внутренние методы Pony, на которые опирается utils.db._track_raw_sql"""
+
+    def test_internals_exist(self, sqlite_db):
+        """Учёт запроса в local_stats и сброс кэша запросов сессии"""
+        with db_session:
+            assert callable(getattr(sqlite_db, '_update_local_stat', None))
+            query_results = sqlite_db._get_cache().query_results
+            query_results['ключ'] = 'значение'
+
+            _track_raw_sql('SELECT 1 -- internals', time.time())
+
+            assert 'SELECT 1 -- internals' in sqlite_db.local_stats
+            assert 'ключ' not in query_results
+
+
+class TestDataVersion:
+    """Тесты счётчика версии данных"""
+
+    def test_bump_creates_and_increments(self, sqlite_db):
+        """Первый вызов создаёт строку upsert'ом, следующие увеличивают версию"""
+        with db_session:
+            assert CacheService.data_version() == 0
+            assert CacheService.bump_version() == 1
+            assert CacheService.bump_version() == 2
+            assert CacheService.data_version() == 2
+
+        with db_session:
+            assert DataVersion[1].version == 2
+
+
+class TestSqliteMigrations:
+    """Тесты миграций на SQLite"""
+
+    def test_migrate_financial_expenses(self, tmp_path):
+        """Старая схема financial_expenses получает колонку name и новый уникальный ключ"""
+        path = str(tmp_path / 'legacy.sqlite')
+        conn = sqlite3.connect(path)
+        conn.execute(
+            'CREATE TABLE financial_expenses (id INTEGER PRIMARY KEY, district INTEGER, '
+            'year INTEGER, amount REAL, include_in_analysis BOOLEAN)'
+        )
+        conn.execute('INSERT INTO financial_expenses (district, year, amount) VALUES (1, 1, 10.0)')
+        conn.commit()
+        conn.close()
+
+        config = {'provider': 'sqlite', 'database': path}
+        try:
+            MigrationManager.run_all_migrations(config)
+            # Повторный запуск ничего не меняет
+            MigrationManager.run_all_migrations(config)
+
+            assert MigrationManager.check_column_exists('financial_expenses', 'name')
+        finally:
+            MigrationManager._config = None
+
+        conn = sqlite3.connect(path)
+        assert conn.execute('SELECT name FROM financial_expenses').fetchone() == ('Общие расходы',)
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list('financial_expenses')")]
+        conn.close()
+        assert 'idx_financial_expenses__district_year_name' in indexes
+
+    def test_migrate_documents_content_hash(self, tmp_path):
+        """documents без content_hash получает колонку и индекс"""
+        path = str(tmp_path / 'legacy.sqlite')
+        conn = sqlite3.connect(path)
+        conn.execute(
+            'CREATE TABLE documents (id INTEGER PRIMARY KEY, filename TEXT, file_path TEXT, '
+            'file_type TEXT, created_at DATETIME)'
+        )
+        conn.close()
+
+        try:
+            MigrationManager.run_all_migrations({'provider': 'sqlite', 'database': path})
+            assert MigrationManager.check_column_exists('documents', 'content_hash')
+        finally:
+            MigrationManager._config = None
+
+        conn = sqlite3.connect(path)
+        indexes = [row[1] for row in conn.execute("PRAGMA index_list('documents')")]
+        conn.close()
+        assert 'idx_documents__content_hash' in indexes
+
+    def test_migrate_documents_checkpoint(self, tmp_path):
+        """Существующие документы получают статус loaded и колонку last_sheet"""
+        path = str(tmp_path / 'legacy.sqlite')
+        conn = sqlite3.connect(path)
+        conn.execute(
+            'CREATE TABLE documents (id INTEGER PRIMARY KEY, filename TEXT, file_path TEXT, '
+            'file_type TEXT, created_at DATETIME)'
+        )
+        conn.execute("INSERT INTO documents (filename, file_path, file_type) VALUES ('a.xlsx', 'a.xlsx', 'full')")
+        conn.commit()
+        conn.close()
+
+        try:
+            MigrationManager.run_all_migrations({'provider': 'sqlite', 'database': path})
+            assert MigrationManager.check_column_exists('documents', 'last_sheet')
+            assert MigrationManager.check_column_exists('documents', 'part_year')
+        finally:
+            MigrationManager._config = None
+
+        conn = sqlite3.connect(path)
+        assert conn.execute('SELECT status, last_sheet FROM documents').fetchone() == ('loaded', None)
+        conn.close()
@@ -0,0 +1,323 @@
+"""Тесты загрузки FULL файлов"""
+
+import hashlib
+import io
+import os
+
+import pandas as pd
+import pytest
+from pony.orm import db_session, count, select
+
+from werkzeug.datastructures import FileStorage
+
+from app import create_app
+from benchmarks.workbook_generator import generate_full_workbook
+from models.entities import Document, Feature, FeatureDistrictYear, District, Year, Population, CrimeStatistics
+from models.excel_enum import LoadMode, DocumentStatus
+from repositories import FeatureDistrictYearRepository
+from services.cache_service import CacheService
+from services.data_service import DataService
+from services.file_service import FileService
+from settings import settings
+
+
+@pytest.fixture
+def client(sqlite_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'upload_folder', str(tmp_path / 'files'))
+    return create_app({'DB_BIND': False, 'TESTING': True}).test_client()
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = generate_full_workbook(str(tmp_path / 'full.xlsx'), years=2, districts=3, features=4)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def upload(client, content: bytes, filename: str):
+    return client.post(
+        '/upload',
+        data={'file': (io.BytesIO(content), filename)},
+        content_type='multipart/form-data',
+        follow_redirects=True
+    )
+
+
+class TestUploadDeduplication:
+    """Повторная загрузка того же файла"""
+
+    def test_hash_saved_while_writing(self, tmp_path, monkeypatch, workbook):
+        """SHA-256 считается при сохранении"""
+        monkeypatch.setattr(settings, 'upload_folder', str(tmp_path))
+
+        _, filepath, content_hash = FileService.save_uploaded_file(FileStorage(io.BytesIO(workbook), 'a.xlsx'))
+
+        assert content_hash == hashlib.sha256(workbook).hexdigest()
+        with open(filepath, 'rb') as f:
+            assert f.read() == workbook
+
+    def test_duplicate_is_not_parsed(self, client, workbook):
+        """Второй файл с тем же содержимым не создаёт документ и не разбирается"""
+        first = upload(client, workbook, 'full.xlsx')
+        assert 'загружен и обработан' in first.get_data(as_text=True)
+
+        second = upload(client, workbook, 'copy.xlsx')
+        html = second.get_data(as_text=True)
+        assert 'уже загружен ранее как' in html
+        assert '24 значений' in html
+
+        with db_session:
+            assert count(d for d in Document) == 1
+            assert Document.select().first().content_hash is not None
+            assert count(v for v in FeatureDistrictYear) == 24
+        files = os.listdir(settings.upload_folder)
+        assert len(files) == 1 and files[0].endswith('_full.xlsx')
+
+    def test_different_content_is_loaded(self, client, workbook, tmp_path):
+        """Файл с другим содержимым загружается как обычно"""
+        other = generate_full_workbook(str(tmp_path / 'other.xlsx'), years=2, districts=3, features=4, seed=1)
+        upload(client, workbook, 'full.xlsx')
+        with open(other, 'rb') as f:
+            upload(client, f.read(), 'other.xlsx')
+
+        with db_session:
+            assert count(d for d in Document) == 2
+
+
+def write_full(path, sheets: dict) -> str:
+    """FULL файл из {год: {признак: [значение по районам]}}"""
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for year, rows in sheets.items():
+            df = pd.DataFrame(list(rows.values()), columns=['Район 1', 'Район 2'])
+            df.insert(0, 'ПОКАЗАТЕЛЬ', list(rows.keys()))
+            df.to_excel(writer, sheet_name=str(year), index=False)
+    return str(path)
+
+
+class TestDeltaUpload:
+    """Загрузка исправленного файла в режиме DELTA"""
+
+    def test_only_changed_cells_are_written(self, sqlite_db, tmp_path):
+        """Изменённые ячейки обновляются, лишние удаляются, пересчитываются только затронутые годы"""
+        original = write_full(tmp_path / 'v1.xlsx', {
+            2020: {'А': [1, 2], 'Б': [3, 4]},
+            2021: {'А': [5, 6]},
+        })
+        DataService.load_full_data(original)
+        with db_session:
+            for district in select(d for d in District):
+                for year in select(y for y in Year):
+                    Population(district=district, year=year, value=1000)
+
+        corrected = write_full(tmp_path / 'v2.xlsx', {
+            2020: {'А': [1, 20], 'В': [7, None]},
+            2021: {'А': [5, 6]},
+        })
+        stats = DataService.load_full_data(corrected, mode=LoadMode.DELTA)
+
+        assert (stats['inserted'], stats['updated'], stats['deleted']) == (2, 1, 2)
+        assert stats['recalculated_years'] == 1
+        with db_session:
+            values = {
+                (v.feature.name, v.district.name, v.year.year): v.value
+                for v in FeatureDistrictYear.select()
+            }
+            assert values == {
+                ('А', 'Район 1', 2020): 1, ('А', 'Район 2', 2020): 20,
+                ('В', 'Район 1', 2020): 7, ('В', 'Район 2', 2020): None,
+                ('А', 'Район 1', 2021): 5, ('А', 'Район 2', 2021): 6,
+            }
+            assert set(select(s.year.year for s in CrimeStatistics)) == {2020}
+
+    def test_same_content_changes_nothing(self, sqlite_db, tmp_path):
+        """Повторная сверка без изменений ничего не пишет и не пересчитывает"""
+        path = write_full(tmp_path / 'v1.xlsx', {2020: {'А': [1.5, None]}})
+        DataService.load_full_data(path)
+
+        stats = DataService.load_full_data(path, mode='delta')
+
+        assert (stats['inserted'], stats['updated'], stats['deleted'], stats['recalculated_years']) == (0, 0, 0, 0)
+
+    def test_upload_form_mode(self, client, workbook):
+        """Режим передаётся полем mode формы загрузки"""
+        response = client.post(
+            '/upload',
+            data={'file': (io.BytesIO(workbook), 'full.xlsx'), 'mode': 'delta'},
+            content_type='multipart/form-data',
+            follow_redirects=True
+        )
+
+        assert 'сверен с базой' in response.get_data(as_text=True)
+        with db_session:
+            assert count(v for v in FeatureDistrictYear) == 24
+
+    def test_delta_reverts_to_previously_loaded_file(self, client, tmp_path):
+        """Повторная сверка с ранее загруженным файлом откатывает правку, а не отсекается по хешу"""
+        def post(path, mode):
+            with open(path, 'rb') as f:
+                return client.post(
+                    '/upload',
+                    data={'file': (io.BytesIO(f.read()), 'full.xlsx'), 'mode': mode},
+                    content_type='multipart/form-data',
+                    follow_redirects=True
+                ).get_data(as_text=True)
+
+        v1 = write_full(tmp_path / 'v1.xlsx', {2020: {'А': [1, 2]}})
+        v2 = write_full(tmp_path / 'v2.xlsx', {2020: {'А': [1, 20]}})
+        post(v1, 'append')
+        post(v2, 'delta')
+        html = post(v1, 'delta')
+
+        assert 'сверен с базой' in html and 'уже загружен ранее' not in html
+        with db_session:
+            assert sorted(select(v.value for v in FeatureDistrictYear)) == [1, 2]
+
+
+class TestChunkedUpload:
+    """Фиксация загрузки по частям и продолжение прерванной загрузки"""
+
+    def test_chunk_rows_give_same_result(self, sqlite_db, tmp_path):
+        """Фиксация каждые N значений не меняет результат и отмечает документ загруженным"""
+        path = generate_full_workbook(str(tmp_path / 'full.xlsx'), years=2, districts=3, features=4)
+        with db_session:
+            document = Document(filename='full.xlsx', file_path=path, file_type='full',
+                                status=DocumentStatus.LOADING.value)
+        document_id = document.id
+
+        stats = DataService.load_full_data(path, document_id, chunk_rows=5)
+
+        assert stats['values'] == 24
+        with db_session:
+            document = Document[document_id]
+            assert (document.status, document.last_sheet) == ('loaded', '2001')
+            assert count(v for v in FeatureDistrictYear if v.document == document) == 24
+
+    def test_failed_upload_resumes_from_last_sheet(self, client, workbook, monkeypatch):
+        """После ошибки во втором листе повторная загрузка того же файла дозагружает только его"""
+        original = FeatureDistrictYearRepository.bulk_create_or_get.__func__
+        calls = []
+
+        def failing(cls, values, document=None, update=False):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('обрыв соединения')
+            return original(cls, values, document, update)
+
+        monkeypatch.setattr(FeatureDistrictYearRepository, 'bulk_create_or_get', classmethod(failing))
+        html = upload(client, workbook, 'full.xlsx').get_data(as_text=True)
+        assert 'обрыв соединения' in html
+        with db_session:
+            document = Document.select().first()
+            assert (document.status, document.last_sheet) == ('failed', '2000')
+            assert count(v for v in FeatureDistrictYear) == 12
+
+        html = upload(client, workbook, 'full.xlsx').get_data(as_text=True)
+        assert 'загружен и обработан' in html
+        assert len(calls) == 3
+        with db_session:
+            assert count(d for d in Document) == 1
+            assert Document.select().first().status == 'loaded'
+            assert count(v for v in FeatureDistrictYear) == 24
+
+    def test_version_bumped_once_per_load(self, sqlite_db, tmp_path, monkeypatch):
+        """Фиксация листов и частей не поднимает версию данных, окончание загрузки — один раз"""
+        path = generate_full_workbook(str(tmp_path / 'full.xlsx'), years=3, districts=2, features=3)
+        bumps = []
+        original = CacheService.bump_version
+        monkeypatch.setattr(CacheService, 'bump_version', staticmethod(lambda: bumps.append(1) or original()))
+
+        DataService.load_full_data(path, chunk_rows=2)
+
+        assert len(bumps) == 1
+
+    def test_loading_document_is_not_resumed(self, client, workbook):
+        """Идущая загрузка (LOADING) не продолжается вторым запросом; FAILED захватывается один раз"""
+        content_hash = hashlib.sha256(workbook).hexdigest()
+        with db_session:
+            running = Document(filename='full.xlsx', file_path='full.xlsx', file_type='full',
+                               content_hash=content_hash, status=DocumentStatus.LOADING.value)
+        assert DataService.find_unfinished_document(content_hash) is None
+        assert DataService.claim_document(running.id) is False
+
+        with db_session:
+            Document[running.id].status = DocumentStatus.FAILED.value
+        assert DataService.claim_document(running.id) is True
+        assert DataService.claim_document(running.id) is False
+
+    def test_same_name_gets_unique_path(self, tmp_path, monkeypatch):
+        """Файлы с одинаковым именем не перезаписывают друг друга"""
+        monkeypatch.setattr(settings, 'upload_folder', str(tmp_path))
+
+        first = FileService.save_uploaded_file(FileStorage(io.BytesIO(b'1'), 'a.xlsx'))
+        second = FileService.save_uploaded_file(FileStorage(io.BytesIO(b'2'), 'a.xlsx'))
+
+        assert first[0] == second[0] == 'a.xlsx'
+        assert first[1] != second[1]
+        with open(first[1], 'rb') as f:
+            assert f.read() == b'1'
+
+
+class TestPartUpload:
+    """Загрузка PART файла за один год"""
+
+    def test_appends_single_year(self, sqlite_db, tmp_path):
+        """Добавляются только новые значения года, пересчитывается только он"""
+        DataService.load_full_data(write_full(tmp_path / 'full.xlsx', {2020: {'А': [1, 2]}}))
+        with db_session:
+            for district in select(d for d in District):
+                Population(district=district, year=Year.get(year=2020), value=1000)
+
+        part = write_full(tmp_path / 'part.xlsx', {2021: {'А': [3, 4], 'Б': [5, None]}})
+        stats = DataService.load_part_data(part, 2021)
+
+        assert stats == {'features': 1, 'districts': 0, 'years': 1, 'values': 4}
+        again = DataService.load_part_data(write_full(tmp_path / 'again.xlsx', {2021: {'А': [30, 40]}}), 2021)
+        assert again['values'] == 0
+        with db_session:
+            assert count(v for v in FeatureDistrictYear if v.year.year == 2021) == 4
+            assert FeatureDistrictYear.get(feature=Feature.get(name='А'), district=District.get(name='Район 1'),
+                                           year=Year.get(year=2021)).value == 3
+            # Населения за 2021 нет, а 2020 не затронут загрузкой
+            assert count(s for s in CrimeStatistics) == 0
+
+    def test_upload_form_requires_year(self, client, tmp_path):
+        """Форма: PART без года отклоняется, с годом — загружается"""
+        with open(write_full(tmp_path / 'part.xlsx', {'Лист1': {'А': [1, 2]}}), 'rb') as f:
+            content = f.read()
+
+        response = client.post(
+            '/upload', data={'file': (io.BytesIO(content), 'part.xlsx'), 'file_type': 'part'},
+            content_type='multipart/form-data', follow_redirects=True
+        )
+        assert 'укажите год' in response.get_data(as_text=True)
+
+        response = client.post(
+            '/upload', data={'file': (io.BytesIO(content), 'part.xlsx'), 'file_type': 'part', 'year': '2022'},
+            content_type='multipart/form-data', follow_redirects=True
+        )
+        assert 'загружен и обработан' in response.get_data(as_text=True)
+        with db_session:
+            assert Document.select().first().file_type == 'part'
+            assert set(select(v.year.year for v in FeatureDistrictYear)) == {2022}
+
+    def test_same_part_bytes_for_two_years(self, client, tmp_path):
+        """Тот же PART файл за другой год загружается; за тот же год и как FULL — по своему ключу"""
+        with open(write_full(tmp_path / 'part.xlsx', {'Лист1': {'А': [1, 2]}}), 'rb') as f:
+            content = f.read()
+
+        def post(**form):
+            return client.post(
+                '/upload', data={'file': (io.BytesIO(content), 'part.xlsx'), **form},
+                content_type='multipart/form-data', follow_redirects=True
+            ).get_data(as_text=True)
+
+        assert 'загружен и обработан' in post(file_type='part', year='2020')
+        assert 'загружен и обработан' in post(file_type='part', year='2021')
+        assert 'уже загружен ранее' in post(file_type='part', year='2021')
+        assert 'уже загружен ранее' not in post(file_type='full')
+
+        with db_session:
+            assert {(d.file_type, d.part_year) for d in Document.select()} == {
+                ('part', 2020), ('part', 2021), ('full', None)
+            }
+            assert set(select(v.year.year for v in FeatureDistrictYear if v.document.file_type == 'part')) == {2020, 2021}
@@ -0,0 +1,36 @@
+"""Тесты генератора синтетических файлов для бенчмарков"""
+
+from pony.orm import db_session, count
+from benchmarks.workbook_generator import generate_full_workbook, generate_financial_workbook
+from models.entities import Feature, District, Year, FeatureDistrictYear, CrimeType, FinancialExpenses
+from services.data_service import DataService
+
+
+class TestWorkbookGenerator:
+    """Сгенерированные файлы читаются штатными загрузчиками"""
+
+    def test_full_workbook_loads(self, sqlite_db, tmp_path):
+        """FULL файл: лист на год, районы в столбцах, признаки в строках"""
+        path = generate_full_workbook(str(tmp_path / 'full.xlsx'), years=2, districts=3, features=4)
+
+        stats = DataService.load_full_data(path)
+
+        assert stats == {'features': 4, 'districts': 3, 'years': 2, 'values': 24}
+        with db_session:
+            assert count(f for f in Feature) == 4
+            assert count(d for d in District) == 3
+            assert count(y for y in Year) == 2
+            assert count(v for v in FeatureDistrictYear) == 24
+            assert count(ct for ct in CrimeType) == 2
+
+    def test_financial_workbook_loads(self, sqlite_db, tmp_path):
+        """Файл расходов: показатели в строках, годы в столбцах"""
+        path = generate_financial_workbook(str(tmp_path / 'fin.xlsx'), years=3, indicators=2)
+
+        expenses = DataService.parse_financial_expenses_from_excel(path)
+        stats = DataService.load_financial_expenses(expenses)
+
+        assert stats['records'] == 6
+        with db_session:
+            assert count(fe for fe in FinancialExpenses) == 6
+
@@ -1,6 +1,6 @@
 """
 Утилиты для работы с базой данных
 """
-from .db import init_database, init_from_env, clear_database
+from .db import init_database, init_from_env, clear_database, is_bound
 
-__all__ = ['init_database', 'init_from_env', 'clear_database']
+__all__ = ['init_database', 'init_from_env', 'clear_database', 'is_bound']
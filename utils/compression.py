@@ -0,0 +1,60 @@
+"""Сжатие ответов gzip/brotli"""
+
+import gzip
+from flask import Flask, request
+
+from settings import settings
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'text/html',
+    'text/csv',
+    'text/css',
+    'text/javascript',
+    'application/javascript',
+}
+
+
+def init_app(app: Flask) -> None:
+    """Подключить сжатие ответов (COMPRESS_MIN_SIZE = 0 отключает его)"""
+    if settings.compress_min_size > 0:
+        app.after_request(_compress_response)
+
+
+def _choose_encoding() -> str:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return ''
+
+
+def _compress_response(response):
+    # Потоковые ответы и файлы (static, send_file) отдаются как есть
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if not encoding:
+        return response
+
+    data = response.get_data()
+    if len(data) < settings.compress_min_size:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    return response
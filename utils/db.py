@@ -1,8 +1,35 @@
+import csv
+import io
+import time
+import uuid
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
 from pony.orm import db_session, set_sql_debug
 from models.entities import db
 from settings import settings
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.extras import execute_values
+
+# Настройки SQLite для однопроцессного режима: WAL позволяет читать во время
+# записи, synchronous=NORMAL безопасен в WAL и заметно ускоряет запись
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -65536,       # 64 МБ страничного кэша
+    'mmap_size': 268435456,     # 256 МБ memory-mapped I/O
+    'busy_timeout': 5000,       # мс ожидания блокировки другим процессом
+}
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+@db.on_connect(provider='sqlite')
+def _configure_sqlite(database, connection):
+    """Применить SQLITE_PRAGMAS к каждому новому соединению"""
+    cursor = connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
 
 
 def create_database_if_not_exists(config: dict):
@@ -46,12 +73,25 @@ def init_database(
     port: int = 5432,
     database: str = 'crime_analysis',
     create_tables: bool = True,
-    sql_debug: bool = False
+    sql_debug: bool = False,
+    migrations: Optional[Callable[[], None]] = None
 ):
-    """Инициализировать подключение к БД и создать таблицы"""
+    """
+    Инициализировать подключение к БД и создать таблицы
+
+    Для provider='sqlite' database — путь к файлу БД (или ':memory:').
+    migrations вызывается после подключения и до построения маппинга,
+    чтобы проверка таблиц Pony видела уже обновлённую схему.
+    """
     if sql_debug:
         set_sql_debug(True)
 
+    if is_bound():
+        # Повторный вызов в том же процессе (несколько create_app, тесты)
+        if create_tables:
+            db.create_tables()
+        return
+
     if provider == 'postgres':
         if not user or not password:
             raise ValueError("Для PostgreSQL требуются user и password")
@@ -64,27 +104,54 @@ def init_database(
             port=port,
             database=database
         )
+    elif provider == 'sqlite':
+        db.bind(provider='sqlite', filename=database, create_db=True)
     else:
         raise ValueError(f"Неподдерживаемый провайдер БД: {provider}")
 
+    if migrations:
+        migrations()
+
     db.generate_mapping(create_tables=create_tables)
     print(f"✓ База данных инициализирована: {provider} - {database}")
 
 
-def init_from_env(create_tables: bool = True, sql_debug: bool = False):
-    """Инициализировать БД из Settings (создает БД если не существует)"""
-    config = settings.db_config
-    create_database_if_not_exists(config)
+def is_bound() -> bool:
+    """Привязана ли Pony ORM к БД и построен ли маппинг"""
+    return db.provider is not None and db.schema is not None
+
+
+def init_from_env(
+    create_tables: bool = True,
+    sql_debug: bool = False,
+    config: dict = None,
+    create_database: bool = True,
+    migrations: Optional[Callable[[], None]] = None
+):
+    """
+    Инициализировать БД из Settings (создает БД если не существует)
+
+    Args:
+        create_tables: Выполнять DDL (создание недостающих таблиц)
+        sql_debug: Выводить SQL запросы
+        config: Параметры подключения вместо settings.db_config
+        create_database: Создать БД в PostgreSQL, если её нет
+        migrations: Миграции, выполняемые до построения маппинга
+    """
+    config = config or settings.db_config
+    if create_database and config['provider'] == 'postgres' and not is_bound():
+        create_database_if_not_exists(config)
 
     init_database(
         provider=config['provider'],
-        user=config['user'],
-        password=config['password'],
-        host=config['host'],
-        port=config['port'],
+        user=config.get('user'),
+        password=config.get('password'),
+        host=config.get('host', 'localhost'),
+        port=config.get('port', 5432),
         database=config['database'],
         create_tables=create_tables,
-        sql_debug=sql_debug
+        sql_debug=sql_debug,
+        migrations=migrations
     )
 
 
@@ -94,6 +161,11 @@ def init_for_migrations(sql_debug: bool = False):
         set_sql_debug(True)
 
     config = settings.db_config
+    if config['provider'] == 'sqlite':
+        db.bind(provider='sqlite', filename=config['database'], create_db=True)
+        print(f"✓ База данных подключена для миграций: {config['database']}")
+        return
+
     create_database_if_not_exists(config)
 
     db.bind(
@@ -107,6 +179,312 @@ def init_for_migrations(sql_debug: bool = False):
     print(f"✓ База данных подключена для миграций: {config['database']}")
 
 
+def is_sqlite() -> bool:
+    """Подключена ли ORM к SQLite"""
+    return db.provider_name == 'sqlite'
+
+
+def param_placeholder() -> str:
+    """Плейсхолдер параметра DB-API для текущего провайдера"""
+    return '?' if is_sqlite() else '%s'
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _track_raw_sql(sql: str, started: float, modified: bool = True) -> None:
+    """
+    Учесть SQL, выполненный мимо ORM, в состоянии Pony
+
+    Запрос попадает в db.local_stats (Server-Timing, /metrics), а после
+    изменяющего запроса сбрасывается кэш результатов запросов сессии.
+    Единственное место, где используются внутренние методы Pony
+    (_update_local_stat, _get_cache().query_results): проверено на
+    pony 0.7.20, tests/test_sqlite.py::TestPonyInternals падает, если
+    они изменятся.
+    """
+    db._update_local_stat(sql, started)
+    if modified:
+        db._get_cache().query_results.clear()
+
+
+def execute_sql(sql: str, params: Sequence = (), many: bool = False):
+    """
+    Выполнить SQL в соединении текущего db_session
+
+    Запрос учитывается в статистике Pony (db.local_stats), поэтому виден
+    в Server-Timing и /metrics наравне с запросами ORM. Кэш результатов
+    запросов сессии сбрасывается: данные могли измениться в обход ORM.
+    """
+    db.flush()
+    cursor = db.get_connection().cursor()
+    started = time.time()
+    if many:
+        cursor.executemany(sql, params)
+    else:
+        cursor.execute(sql, params)
+    _track_raw_sql(sql, started)
+    return cursor
+
+
+def fetch_all(sql: str, params: Sequence = ()) -> List[tuple]:
+    """
+    Выполнить SELECT в соединении текущего db_session и вернуть все строки
+
+    Как и execute_sql, запрос учитывается в db.local_stats; кэш сессии
+    не сбрасывается — запрос только читает.
+    """
+    db.flush()
+    cursor = db.get_connection().cursor()
+    started = time.time()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        _track_raw_sql(sql, started, modified=False)
+
+
+def stream_query(sql: str, params: Sequence = (), chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """
+    Выполнить SELECT и отдавать строки пачками по chunk_size
+
+    PostgreSQL: именованный (server-side) курсор — результат остаётся на
+    сервере и передаётся по chunk_size строк, память клиента не зависит
+    от размера выборки. SQLite: обычный курсор, он и так читает строки
+    по мере fetchmany. Вызывать внутри db_session.
+    """
+    db.flush()
+    connection = db.get_connection()
+    if is_sqlite():
+        cursor = connection.cursor()
+    else:
+        cursor = connection.cursor(name=f'stream_{uuid.uuid4().hex}')
+        cursor.itersize = chunk_size
+
+    started = time.time()
+    try:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+        _track_raw_sql(sql, started, modified=False)
+
+
+def _chunks(rows: Iterable[Sequence], chunk_size: int) -> Iterable[List[Sequence]]:
+    chunk = []
+    for row in rows:
+        chunk.append(tuple(row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_insert(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence],
+    conflict_columns: Optional[Sequence[str]] = None,
+    update_columns: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Вставить строки пачками в рамках текущего db_session
+
+    PostgreSQL: многострочный INSERT ... VALUES через execute_values,
+    SQLite: executemany одного подготовленного INSERT.
+
+    Args:
+        table: Имя таблицы
+        columns: Колонки вставки
+        rows: Итерируемый набор кортежей в порядке columns
+        conflict_columns: Колонки уникального ключа для ON CONFLICT
+        update_columns: Колонки, обновляемые при конфликте (иначе DO NOTHING)
+        chunk_size: Размер пачки
+
+    Returns: Количество вставленных (и обновлённых) строк
+    """
+    column_list = ', '.join(_quote(c) for c in columns)
+    conflict = ''
+    if conflict_columns:
+        conflict = f" ON CONFLICT ({', '.join(_quote(c) for c in conflict_columns)})"
+        if update_columns:
+            assignments = ', '.join(f'{_quote(c)} = excluded.{_quote(c)}' for c in update_columns)
+            conflict += f' DO UPDATE SET {assignments}'
+        else:
+            conflict += ' DO NOTHING'
+
+    key_indexes = [list(columns).index(c) for c in conflict_columns or ()]
+
+    total = 0
+    for chunk in _chunks(rows, chunk_size):
+        if update_columns:
+            # DO UPDATE не может изменить одну строку дважды в одном запросе:
+            # из повторов ключа внутри пачки остаётся последний
+            chunk = list({tuple(row[i] for i in key_indexes): row for row in chunk}.values())
+        if is_sqlite():
+            values = ', '.join('?' for _ in columns)
+            sql = f'INSERT INTO {_quote(table)} ({column_list}) VALUES ({values}){conflict}'
+            cursor = execute_sql(sql, chunk, many=True)
+        else:
+            sql = f'INSERT INTO {_quote(table)} ({column_list}) VALUES %s{conflict}'
+            db.flush()
+            cursor = db.get_connection().cursor()
+            started = time.time()
+            execute_values(cursor, sql, chunk, page_size=len(chunk))
+            _track_raw_sql(sql, started)
+        total += max(cursor.rowcount, 0)
+    return total
+
+
+def insert_or_select(
+    table: str,
+    columns: Sequence[str],
+    row: Sequence,
+    conflict_columns: Sequence[str],
+    returning: str = 'id'
+) -> Tuple[object, bool]:
+    """
+    Вставить строку или найти существующую по уникальному ключу без гонки
+
+    INSERT ... ON CONFLICT DO NOTHING RETURNING не падает на нарушении
+    уникальности, если ту же строку одновременно вставляет другая
+    транзакция (PostgreSQL дожидается её завершения). Если строка уже
+    была, RETURNING пуст и она читается повторным SELECT по ключу.
+
+    Returns: (значение returning, создана ли строка)
+    """
+    p = param_placeholder()
+    column_list = ', '.join(_quote(c) for c in columns)
+    values = ', '.join(p for _ in columns)
+    conflict = ', '.join(_quote(c) for c in conflict_columns)
+    sql = (
+        f'INSERT INTO {_quote(table)} ({column_list}) VALUES ({values}) '
+        f'ON CONFLICT ({conflict}) DO NOTHING RETURNING {_quote(returning)}'
+    )
+    cursor = execute_sql(sql, tuple(row))
+    inserted = cursor.fetchone()
+    if inserted:
+        return inserted[0], True
+
+    key = [row[list(columns).index(c)] for c in conflict_columns]
+    where = ' AND '.join(f'{_quote(c)} = {p}' for c in conflict_columns)
+    found = fetch_all(f'SELECT {_quote(returning)} FROM {_quote(table)} WHERE {where}', key)
+    if not found:
+        # Конфликтующую строку успели удалить — вставить заново
+        return insert_or_select(table, columns, row, conflict_columns, returning)
+    return found[0][0], False
+
+
+def bulk_update(
+    table: str,
+    key_columns: Sequence[str],
+    columns: Sequence[str],
+    rows: Iterable[Sequence],
+    sql_types: Optional[Sequence[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> int:
+    """
+    Обновить строки пачками по ключу в рамках текущего db_session
+
+    PostgreSQL: UPDATE ... FROM (VALUES ...) одним запросом на пачку,
+    SQLite: executemany одного подготовленного UPDATE.
+
+    Args:
+        table: Имя таблицы
+        key_columns: Колонки ключа для WHERE
+        columns: Обновляемые колонки
+        rows: Кортежи значений в порядке key_columns + columns
+        sql_types: SQL типы колонок в том же порядке (нужны PostgreSQL
+            для приведения типов в VALUES)
+        chunk_size: Размер пачки
+
+    Returns: Количество обновлённых строк
+    """
+    key_count = len(key_columns)
+    assignments = ', '.join(f'{_quote(c)} = ?' for c in columns)
+    where = ' AND '.join(f'{_quote(c)} = ?' for c in key_columns)
+
+    total = 0
+    for chunk in _chunks(rows, chunk_size):
+        if is_sqlite():
+            sql = f'UPDATE {_quote(table)} SET {assignments} WHERE {where}'
+            params = [row[key_count:] + row[:key_count] for row in chunk]
+            cursor = execute_sql(sql, params, many=True)
+        else:
+            all_columns = list(key_columns) + list(columns)
+            aliases = ', '.join(_quote(c) for c in all_columns)
+            pg_assignments = ', '.join(f'{_quote(c)} = v.{_quote(c)}' for c in columns)
+            pg_where = ' AND '.join(f't.{_quote(c)} = v.{_quote(c)}' for c in key_columns)
+            template = None
+            if sql_types:
+                template = '(' + ', '.join(f'%s::{t}' for t in sql_types) + ')'
+            sql = (f'UPDATE {_quote(table)} AS t SET {pg_assignments} '
+                   f'FROM (VALUES %s) AS v ({aliases}) WHERE {pg_where}')
+            db.flush()
+            cursor = db.get_connection().cursor()
+            started = time.time()
+            execute_values(cursor, sql, chunk, template=template, page_size=len(chunk))
+            _track_raw_sql(sql, started)
+        total += max(cursor.rowcount, 0)
+    return total
+
+
+def bulk_copy(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence],
+    chunk_size: int = 10000
+) -> int:
+    """
+    Загрузить строки в таблицу самым быстрым путём провайдера
+
+    PostgreSQL: COPY ... FROM STDIN (CSV) пачками по chunk_size строк,
+    SQLite: bulk_insert. Конфликты ключей не обрабатываются — таблица
+    должна быть пустой или не содержать загружаемых ключей.
+
+    Returns: Количество загруженных строк
+    """
+    if is_sqlite():
+        return bulk_insert(table, columns, rows, chunk_size=chunk_size)
+
+    column_list = ', '.join(_quote(c) for c in columns)
+    sql = f"COPY {_quote(table)} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    total = 0
+    for chunk in _chunks(rows, chunk_size):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(tuple('\\N' if v is None else v for v in row) for row in chunk)
+        buffer.seek(0)
+
+        db.flush()
+        cursor = db.get_connection().cursor()
+        started = time.time()
+        cursor.copy_expert(sql, buffer)
+        _track_raw_sql(sql, started)
+        total += len(chunk)
+    return total
+
+
+def reset_sequence(table: str, column: str = 'id') -> None:
+    """Продолжить автоинкремент после максимального id (после загрузки с явными id)"""
+    if is_sqlite():
+        # SQLite берёт следующий id из max(rowid) / sqlite_sequence
+        return
+    execute_sql(
+        f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+        f"COALESCE((SELECT MAX({_quote(column)}) FROM {_quote(table)}), 0) + 1, false)",
+        [table, column]
+    )
+
+
 def clear_database():
     """Удалить все таблицы (УДАЛЯЕТ ВСЕ ДАННЫЕ И СТРУКТУРУ!)"""
     try:
@@ -0,0 +1,63 @@
+"""Компактное кодирование сеток в JSON и быстрый JSON-провайдер"""
+
+import base64
+from typing import Optional
+
+import numpy as np
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость
+    orjson = None
+
+# Кодировки значений колоночного формата
+ENCODINGS = ('json', 'f32')
+
+
+def encode_matrix(matrix: np.ndarray, encoding: Optional[str] = None) -> dict:
+    """
+    Значения матрицы построчно одним массивом
+
+    json — список чисел, пропуски null; f32 — base64 от Float32 little-endian,
+    пропуски NaN. f32 хранит около 7 значащих цифр: это компактнее, но
+    большие значения с копейками округляются.
+
+    Returns: {'values': ..., 'encoding': ...}
+    """
+    encoding = encoding or 'json'
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Неподдерживаемая кодировка: {encoding}")
+
+    flat = np.asarray(matrix, dtype=float).ravel()
+    if encoding == 'f32':
+        values = base64.b64encode(flat.astype('<f4').tobytes()).decode('ascii')
+    else:
+        values = [None if np.isnan(value) else value for value in flat.tolist()]
+    return {'values': values, 'encoding': encoding}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON-провайдер Flask на orjson; типы вне JSON — как у стандартного"""
+
+    option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+
+def init_app(app: Flask) -> None:
+    """Подключить orjson, если он установлен"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
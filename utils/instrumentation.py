@@ -0,0 +1,119 @@
+"""Измерение времени запросов, количества SQL запросов и длительности операций"""
+
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+from flask import Flask, current_app, g, request
+from models.entities import db
+from settings import settings
+from utils.metrics import REQUEST_DURATION, REQUEST_SQL_QUERIES, REQUEST_SQL_DURATION, JOB_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+def sql_totals() -> Tuple[int, float]:
+    """
+    Количество SQL запросов и их суммарное время в текущем потоке
+
+    Pony ORM ведёт статистику по каждому потоку (db.local_stats),
+    поэтому разность двух снимков даёт запросы одного HTTP запроса.
+    """
+    count = 0
+    duration = 0.0
+    for sql, stat in list(db.local_stats.items()):
+        if sql is None:
+            # Служебная запись Pony, дублирует время остальных запросов
+            continue
+        count += stat.db_count
+        duration += stat.sum_time or 0.0
+    return count, duration
+
+
+def query_budget(max_queries: Optional[int]):
+    """
+    Объявить максимальное число SQL запросов для эндпоинта
+
+    Бюджет не должен зависеть от количества признаков, районов и лет;
+    tests/test_query_budget.py проверяет его на данных разного размера.
+    None — эндпоинт-операция, объём работы которой пропорционален входным
+    данным (загрузка файла, расчёт); их длительность видна в job-метриках.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def init_app(app: Flask) -> None:
+    """Подключить измерение запросов к приложению"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_started = sql_totals()
+
+
+def _finish_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+
+    elapsed = time.perf_counter() - started
+    sql_count_start, sql_time_start = g.pop('sql_started')
+    sql_count, sql_time = sql_totals()
+    sql_count -= sql_count_start
+    sql_time -= sql_time_start
+
+    g.sql_queries = sql_count
+    endpoint = request.endpoint or 'unknown'
+
+    REQUEST_DURATION.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+    REQUEST_SQL_QUERIES.observe(sql_count, endpoint=endpoint)
+    REQUEST_SQL_DURATION.observe(sql_time, endpoint=endpoint)
+
+    response.headers['Server-Timing'] = (
+        f'app;dur={elapsed * 1000:.1f}, '
+        f'db;dur={sql_time * 1000:.1f};desc="{sql_count} queries"'
+    )
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    if budget is not None and sql_count > budget:
+        logger.warning('Превышен бюджет SQL запросов %s: %d > %d', endpoint, sql_count, budget)
+
+    if elapsed * 1000 >= settings.slow_request_ms:
+        logger.warning(
+            'Медленный запрос %s %s: %.0f мс, SQL: %d запросов / %.0f мс',
+            request.method, request.path, elapsed * 1000, sql_count, sql_time * 1000
+        )
+
+    return response
+
+
+@contextmanager
+def track_job(name: str):
+    """Измерить длительность операции (загрузка файла, расчёт, анализ)"""
+    started = time.perf_counter()
+    status = 'error'
+    try:
+        yield
+        status = 'ok'
+    finally:
+        elapsed = time.perf_counter() - started
+        JOB_DURATION.observe(elapsed, job=name, status=status)
+        logger.info('Операция %s завершена (%s) за %.2f с', name, status, elapsed)
+
+
+def timed_job(name: str):
+    """Декоратор для track_job"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track_job(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
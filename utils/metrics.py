@@ -0,0 +1,114 @@
+"""Простые метрики процесса в формате Prometheus"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами и произвольными метками"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Добавить наблюдение"""
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [счётчики по корзинам (+Inf в конце), сумма, количество]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        """Строки в текстовом формате Prometheus"""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram'
+        ]
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _format_number(bound)
+                bucket_labels = ','.join(labels + [f'le="{le}"'])
+                lines.append(f'{self.name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_str = f'{{{",".join(labels)}}}' if labels else ''
+            lines.append(f'{self.name}_sum{label_str} {_format_number(total)}')
+            lines.append(f'{self.name}_count{label_str} {count}')
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Получить или зарегистрировать гистограмму"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+            return metric
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds',
+    'Время обработки HTTP запроса',
+    ('endpoint', 'method', 'status')
+)
+REQUEST_SQL_QUERIES = registry.histogram(
+    'http_request_sql_queries',
+    'Количество SQL запросов на HTTP запрос',
+    ('endpoint',),
+    COUNT_BUCKETS
+)
+REQUEST_SQL_DURATION = registry.histogram(
+    'http_request_sql_duration_seconds',
+    'Суммарное время SQL запросов на HTTP запрос',
+    ('endpoint',)
+)
+JOB_DURATION = registry.histogram(
+    'job_duration_seconds',
+    'Длительность фоновых и тяжёлых операций (загрузка, расчёт, анализ)',
+    ('job', 'status')
+)
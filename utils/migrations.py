@@ -1,15 +1,29 @@
 """Автоматические миграции базы данных"""
 
+import sqlite3
 import psycopg2
 from settings import settings
 
 
 class MigrationManager:
 
+    # Параметры подключения текущего запуска (по умолчанию settings.db_config)
+    _config = None
+
+    @staticmethod
+    def _get_config() -> dict:
+        return MigrationManager._config or settings.db_config
+
+    @staticmethod
+    def _is_sqlite() -> bool:
+        return MigrationManager._get_config()['provider'] == 'sqlite'
+
     @staticmethod
     def _get_connection():
         """Получить подключение к БД"""
-        config = settings.db_config
+        config = MigrationManager._get_config()
+        if config['provider'] == 'sqlite':
+            return sqlite3.connect(config['database'])
         return psycopg2.connect(
             host=config['host'],
             port=config['port'],
@@ -23,11 +37,17 @@ class MigrationManager:
         """Проверить существование таблицы"""
         conn = MigrationManager._get_connection()
         cursor = conn.cursor()
-        cursor.execute(
-            "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = %s)",
-            [table_name]
-        )
-        result = cursor.fetchone()[0]
+        if MigrationManager._is_sqlite():
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?)",
+                [table_name]
+            )
+        else:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = %s)",
+                [table_name]
+            )
+        result = bool(cursor.fetchone()[0])
         cursor.close()
         conn.close()
         return result
@@ -38,15 +58,19 @@ class MigrationManager:
         conn = MigrationManager._get_connection()
         cursor = conn.cursor()
 
-        query = """
-            SELECT EXISTS (
-                SELECT 1
-                FROM information_schema.columns
-                WHERE table_name = %s AND column_name = %s
-            )
-        """
-        cursor.execute(query, [table_name, column_name])
-        result = cursor.fetchone()[0]
+        if MigrationManager._is_sqlite():
+            cursor.execute(f'PRAGMA table_info("{table_name}")')
+            result = any(row[1] == column_name for row in cursor.fetchall())
+        else:
+            query = """
+                SELECT EXISTS (
+                    SELECT 1
+                    FROM information_schema.columns
+                    WHERE table_name = %s AND column_name = %s
+                )
+            """
+            cursor.execute(query, [table_name, column_name])
+            result = cursor.fetchone()[0]
 
         cursor.close()
         conn.close()
@@ -55,11 +79,18 @@ class MigrationManager:
     @staticmethod
     def add_column(table_name: str, column_name: str, column_type: str, nullable: bool = True):
         """Добавить колонку в таблицу"""
+        if MigrationManager._is_sqlite() and MigrationManager.check_column_exists(table_name, column_name):
+            # В SQLite нет ADD COLUMN IF NOT EXISTS
+            return
+
         conn = MigrationManager._get_connection()
         cursor = conn.cursor()
 
         null_constraint = "NULL" if nullable else "NOT NULL"
-        query = f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_type} {null_constraint}'
+        if MigrationManager._is_sqlite():
+            query = f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type} {null_constraint}'
+        else:
+            query = f'ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_type} {null_constraint}'
         cursor.execute(query)
         conn.commit()
 
@@ -73,10 +104,11 @@ class MigrationManager:
         conn = MigrationManager._get_connection()
         cursor = conn.cursor()
 
+        placeholder = '?' if MigrationManager._is_sqlite() else '%s'
         if condition:
-            query = f'UPDATE {table_name} SET {column_name} = %s WHERE {condition}'
+            query = f'UPDATE {table_name} SET {column_name} = {placeholder} WHERE {condition}'
         else:
-            query = f'UPDATE {table_name} SET {column_name} = %s'
+            query = f'UPDATE {table_name} SET {column_name} = {placeholder}'
         cursor.execute(query, [value])
         conn.commit()
 
@@ -87,6 +119,11 @@ class MigrationManager:
     @staticmethod
     def set_column_not_null(table_name: str, column_name: str):
         """Сделать колонку NOT NULL"""
+        if MigrationManager._is_sqlite():
+            # SQLite не меняет ограничения существующих колонок без пересоздания таблицы
+            print(f'  SQLite: NOT NULL для {column_name} не применяется')
+            return
+
         conn = MigrationManager._get_connection()
         cursor = conn.cursor()
 
@@ -104,7 +141,11 @@ class MigrationManager:
         conn = MigrationManager._get_connection()
         cursor = conn.cursor()
 
-        query = f'ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {constraint_name}'
+        if MigrationManager._is_sqlite():
+            # Составные ключи в SQLite — уникальные индексы
+            query = f'DROP INDEX IF EXISTS {constraint_name}'
+        else:
+            query = f'ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {constraint_name}'
         cursor.execute(query)
         conn.commit()
 
@@ -119,7 +160,10 @@ class MigrationManager:
         cursor = conn.cursor()
 
         columns_str = ', '.join(columns)
-        query = f'ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} UNIQUE ({columns_str})'
+        if MigrationManager._is_sqlite():
+            query = f'CREATE UNIQUE INDEX IF NOT EXISTS {constraint_name} ON {table_name} ({columns_str})'
+        else:
+            query = f'ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} UNIQUE ({columns_str})'
         try:
             cursor.execute(query)
             conn.commit()
@@ -133,6 +177,20 @@ class MigrationManager:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    def add_index(table_name: str, index_name: str, columns: list):
+        """Добавить индекс, если его нет"""
+        conn = MigrationManager._get_connection()
+        cursor = conn.cursor()
+
+        columns_str = ', '.join(columns)
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns_str})')
+        conn.commit()
+
+        cursor.close()
+        conn.close()
+        print(f'✓ Добавлен индекс {index_name} на колонки ({columns_str})')
+
     @staticmethod
     def migrate_financial_expenses():
         """Миграция для добавления колонки name в financial_expenses"""
@@ -157,10 +215,67 @@ class MigrationManager:
             print('✓ Колонка name уже существует, миграция не требуется\n')
 
     @staticmethod
-    def run_all_migrations():
-        """Запустить все миграции"""
+    def migrate_documents_content_hash():
+        """Миграция для добавления колонки content_hash в documents"""
+        print('\n=== Миграция: добавление колонки content_hash в documents ===')
+
+        if not MigrationManager.check_table_exists('documents'):
+            print('✓ Таблица documents ещё не создана, миграция пропущена\n')
+            return
+
+        if not MigrationManager.check_column_exists('documents', 'content_hash'):
+            MigrationManager.add_column('documents', 'content_hash', 'VARCHAR(64)', nullable=True)
+            MigrationManager.add_index('documents', 'idx_documents__content_hash', ['content_hash'])
+            print('✓ Миграция завершена успешно\n')
+        else:
+            print('✓ Колонка content_hash уже существует, миграция не требуется\n')
+
+    @staticmethod
+    def migrate_documents_checkpoint():
+        """Миграция для добавления колонок status и last_sheet в documents"""
+        print('\n=== Миграция: добавление колонок status и last_sheet в documents ===')
+
+        if not MigrationManager.check_table_exists('documents'):
+            print('✓ Таблица documents ещё не создана, миграция пропущена\n')
+            return
+
+        if not MigrationManager.check_column_exists('documents', 'status'):
+            MigrationManager.add_column('documents', 'status', 'VARCHAR(20)', nullable=True)
+            # Документы до появления статусов загружались одной транзакцией
+            MigrationManager.update_column_value('documents', 'status', 'loaded', 'status IS NULL')
+        if not MigrationManager.check_column_exists('documents', 'last_sheet'):
+            MigrationManager.add_column('documents', 'last_sheet', 'VARCHAR(100)', nullable=True)
+        print('✓ Миграция завершена успешно\n')
+
+    @staticmethod
+    def migrate_documents_part_year():
+        """Миграция для добавления колонки part_year в documents"""
+        print('\n=== Миграция: добавление колонки part_year в documents ===')
+
+        if not MigrationManager.check_table_exists('documents'):
+            print('✓ Таблица documents ещё не создана, миграция пропущена\n')
+            return
+
+        if not MigrationManager.check_column_exists('documents', 'part_year'):
+            MigrationManager.add_column('documents', 'part_year', 'INTEGER', nullable=True)
+            print('✓ Миграция завершена успешно\n')
+        else:
+            print('✓ Колонка part_year уже существует, миграция не требуется\n')
+
+    @staticmethod
+    def run_all_migrations(config: dict = None):
+        """
+        Запустить все миграции
+
+        Args:
+            config: Параметры подключения вместо settings.db_config
+        """
+        MigrationManager._config = config
         print('Запуск всех миграций...')
         MigrationManager.migrate_financial_expenses()
+        MigrationManager.migrate_documents_content_hash()
+        MigrationManager.migrate_documents_checkpoint()
+        MigrationManager.migrate_documents_part_year()
         print('Все миграции выполнены!')
 
 
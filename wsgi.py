@@ -0,0 +1,7 @@
+"""Точка входа для production WSGI-сервера (gunicorn -c gunicorn.conf.py wsgi:app)"""
+
+from app import create_app
+
+# При preload_app=True выполняется один раз в мастер-процессе до fork:
+# воркеры получают привязанную ORM и прогретые кэши через copy-on-write
+app = create_app({'WARM_CACHES': True})